@@ -0,0 +1,46 @@
+"""
+Benchmark: per-layer projection loop vs fused all-layer projection.
+
+Compares ``collect_logit_lens(..., fused=False)`` with ``fused=True`` on a
+small local model across prompt lengths and layer counts.
+
+Usage (from ``python/``)::
+
+    python benchmarks/bench_fused_projection.py
+"""
+
+import argparse
+
+from common import build_tiny_model, make_prompt, time_call
+from logitlenskit.collect import collect_logit_lens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--layers", type=int, nargs="+", default=[12, 24, 48])
+    parser.add_argument("--positions", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--vocab", type=int, default=8192)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'layers':>6} {'n_pos':>6} {'loop ms':>9} {'fused ms':>9} {'speedup':>8}")
+    for n_layers in args.layers:
+        model = build_tiny_model(n_layers=n_layers, vocab_size=args.vocab)
+        for n_pos in args.positions:
+            prompt = make_prompt(n_pos)
+            loop = time_call(
+                lambda: collect_logit_lens(prompt, model, remote=False),
+                repeat=args.repeat,
+            )
+            fused = time_call(
+                lambda: collect_logit_lens(prompt, model, remote=False, fused=True),
+                repeat=args.repeat,
+            )
+            print(
+                f"{n_layers:>6} {n_pos:>6} {loop['best'] * 1e3:>9.1f} "
+                f"{fused['best'] * 1e3:>9.1f} {loop['best'] / fused['best']:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Benchmark suite: collection and display pipeline over a parameter grid.
+
+Times ``collect_logit_lens``, ``to_js_format`` and ``show_logit_lens`` HTML
+generation on randomly initialized gpt2, llama and gpt_neox models across a
+grid of prompt length, layer count, vocabulary size and k. Each case records
+wall time (best and mean of ``--repeat``), peak memory added during one call
+and payload bytes:
+
+    collect   tensor bytes of the result (topk, tracked, probs)
+    to_js     compact JSON bytes of the V2 widget data
+    html      bytes of the widget HTML
+
+Results are written as JSON. Given ``--baseline``, cases are compared with a
+stored run and regressions are listed; the exit status is 1 if there are any.
+Times and peaks regress when they grow by more than ``--tolerance`` and
+by more than ``--min-seconds`` / ``--min-bytes`` (timer and page-size
+noise); payload sizes are deterministic and regress on any growth.
+
+Usage (from ``python/``)::
+
+    python benchmarks/bench_suite.py --out baseline.json
+    python benchmarks/bench_suite.py --baseline baseline.json --out current.json
+    python benchmarks/bench_suite.py --quick --baseline baseline.json
+"""
+
+import argparse
+import datetime
+import functools
+import itertools
+import json
+import platform
+import sys
+from typing import Dict, List
+
+import torch
+
+from common import ARCHS, build_arch_model, make_prompt, measure_peak, time_call
+from logitlenskit import __version__
+from logitlenskit.collect import collect_logit_lens
+from logitlenskit.display import show_logit_lens, to_js_format
+
+
+GRID = {
+    "arch": list(ARCHS),
+    "n_layers": [4, 16],
+    "n_pos": [16, 128],
+    "vocab": [4096, 32000],
+    "k": [5, 20],
+}
+QUICK_GRID = {
+    "arch": list(ARCHS),
+    "n_layers": [4],
+    "n_pos": [16],
+    "vocab": [4096],
+    "k": [5],
+}
+METRICS = ("seconds", "peak_bytes", "payload_bytes")
+
+
+def run_suite(grid: Dict[str, List], repeat: int = 3, d_model: int = 128,
+              log=sys.stderr) -> List[Dict]:
+    """
+    Run every case in the grid.
+
+    Returns:
+        List of result dicts, one per (stage, case)
+    """
+    results = []
+    keys = ("arch", "n_layers", "n_pos", "vocab", "k")
+    for arch, n_layers, vocab in itertools.product(
+        grid["arch"], grid["n_layers"], grid["vocab"]
+    ):
+        model = build_arch_model(arch, n_layers=n_layers, d_model=d_model, vocab_size=vocab)
+        for n_pos, k in itertools.product(grid["n_pos"], grid["k"]):
+            case = dict(zip(keys, (arch, n_layers, n_pos, vocab, k)))
+            prompt = make_prompt(n_pos)
+
+            # Bind arguments now: model is deleted at the end of the outer loop
+            collect = functools.partial(collect_logit_lens, prompt, model, k=k, remote=False)
+            with torch.no_grad():
+                data = collect()
+            stages = {
+                "collect": collect,
+                "to_js": functools.partial(to_js_format, data),
+                "html": functools.partial(show_logit_lens, data, inline_js=False),
+            }
+
+            for stage, fn in stages.items():
+                with torch.no_grad():
+                    timing = time_call(fn, repeat=repeat)
+                    output, peak = measure_peak(fn)
+                result = {
+                    "name": case_name(stage, case),
+                    "stage": stage,
+                    **case,
+                    "seconds": timing["best"],
+                    "mean_seconds": timing["mean"],
+                    "peak_bytes": peak,
+                    "payload_bytes": payload_bytes(stage, output),
+                }
+                results.append(result)
+                print(
+                    f"{result['name']:<40} {result['seconds'] * 1e3:>9.2f} ms "
+                    f"{_mb(peak):>9} MB peak {result['payload_bytes'] / 1e3:>10.1f} KB",
+                    file=log, flush=True,
+                )
+        del model, collect, stages
+    return results
+
+
+def case_name(stage: str, case: Dict) -> str:
+    return (f"{stage}/{case['arch']}/L{case['n_layers']}/P{case['n_pos']}"
+            f"/V{case['vocab']}/k{case['k']}")
+
+
+def payload_bytes(stage: str, output) -> int:
+    """Size of a stage's output as it would be sent or embedded."""
+    if stage == "collect":
+        tensors = [output["topk"]] + list(output["tracked"]) + list(output["probs"])
+        return sum(t.numel() * t.element_size() for t in tensors)
+    if stage == "to_js":
+        return len(json.dumps(output, separators=(",", ":")).encode("utf-8"))
+    return len(output.data.encode("utf-8"))
+
+
+def compare(current: List[Dict], baseline: List[Dict], tolerance: float = 0.25,
+            min_seconds: float = 0.005, min_bytes: int = 1 << 20) -> List[str]:
+    """
+    Compare a run with a baseline run.
+
+    Returns:
+        One message per regressed metric (cases missing from either run are
+        skipped)
+    """
+    previous = {result["name"]: result for result in baseline}
+    regressions = []
+    for result in current:
+        before = previous.get(result["name"])
+        if before is None:
+            continue
+        for metric in METRICS:
+            old, new = before.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            if metric == "payload_bytes":
+                regressed = new > old
+            else:
+                floor = min_seconds if metric == "seconds" else min_bytes
+                regressed = new > old * (1 + tolerance) and new - old > floor
+            if regressed:
+                change = f"+{(new / old - 1) * 100:.0f}%" if old else "new"
+                regressions.append(f"{result['name']} {metric}: {old:.4g} -> {new:.4g} ({change})")
+    return regressions
+
+
+def _mb(value) -> str:
+    return "-" if value is None else f"{value / 1e6:.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--out", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with results in this JSON file")
+    parser.add_argument("--quick", action="store_true", help="Smallest grid only")
+    parser.add_argument("--arch", nargs="+", choices=list(ARCHS))
+    parser.add_argument("--layers", type=int, nargs="+")
+    parser.add_argument("--positions", type=int, nargs="+")
+    parser.add_argument("--vocab", type=int, nargs="+")
+    parser.add_argument("-k", type=int, nargs="+")
+    parser.add_argument("--d-model", type=int, default=128)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative growth in time and peak memory")
+    parser.add_argument("--min-seconds", type=float, default=0.005,
+                        help="Ignore time growth smaller than this")
+    parser.add_argument("--min-bytes", type=int, default=1 << 20,
+                        help="Ignore peak memory growth smaller than this")
+    args = parser.parse_args()
+
+    grid = dict(QUICK_GRID if args.quick else GRID)
+    for key, value in (("arch", args.arch), ("n_layers", args.layers),
+                       ("n_pos", args.positions), ("vocab", args.vocab), ("k", args.k)):
+        if value:
+            grid[key] = value
+
+    results = run_suite(grid, repeat=args.repeat, d_model=args.d_model)
+    report = {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "logitlenskit": __version__,
+            "torch": torch.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "d_model": args.d_model,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f"Wrote {len(results)} results to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.tolerance,
+                              args.min_seconds, args.min_bytes)
+        if regressions:
+            print(f"{len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
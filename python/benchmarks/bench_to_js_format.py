@@ -0,0 +1,68 @@
+"""
+Benchmark: to_js_format conversion time vs n_layers x n_pos x k.
+
+Compares the vectorized ``to_js_format`` with the previous per-element
+implementation (``.item()`` lookups and ``round()`` per value) and checks
+that both produce the same JSON.
+
+Usage (from ``python/``)::
+
+    python benchmarks/bench_to_js_format.py
+"""
+
+import argparse
+import json
+
+from common import make_synthetic_data, time_call
+from logitlenskit.display import to_js_format
+
+
+def legacy_to_js_format(data):
+    """Per-element conversion used before vectorization."""
+    vocab = data["vocab"]
+    n_layers = len(data["layers"])
+    n_pos = len(data["input"])
+    topk_js = [
+        [[vocab[idx.item()] for idx in data["topk"][li, pos]]
+         for pos in range(n_pos)]
+        for li in range(n_layers)
+    ]
+    tracked_js = [
+        {
+            vocab[idx.item()]: [round(p, 5) for p in data["probs"][pos][:, i].tolist()]
+            for i, idx in enumerate(data["tracked"][pos])
+        }
+        for pos in range(n_pos)
+    ]
+    return {
+        "meta": {"version": 2, "model": data["model"]},
+        "input": data["input"],
+        "layers": data["layers"],
+        "topk": topk_js,
+        "tracked": tracked_js,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--grid", type=str, nargs="+",
+                        default=["12x16x5", "28x64x5", "80x14x5", "80x100x5",
+                                 "80x100x10", "80x400x5"],
+                        help="n_layers x n_pos x k triples")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'L x P x k':>12} {'cells':>9} {'legacy ms':>10} {'new ms':>9} {'speedup':>8}")
+    for spec in args.grid:
+        n_layers, n_pos, k = (int(x) for x in spec.split("x"))
+        data = make_synthetic_data(n_layers, n_pos, k)
+        assert json.dumps(to_js_format(data)) == json.dumps(legacy_to_js_format(data))
+
+        legacy = time_call(lambda: legacy_to_js_format(data), repeat=args.repeat)
+        new = time_call(lambda: to_js_format(data), repeat=args.repeat)
+        print(f"{spec:>12} {n_layers * n_pos * k:>9,} {legacy['best'] * 1e3:>10.1f} "
+              f"{new['best'] * 1e3:>9.1f} {legacy['best'] / new['best']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: notebook HTML size and render cost for widgets.
+
+Renders N ``show_logit_lens`` widgets as one notebook session would, with
+the widget script handled three ways:
+
+    url      no script inlined; the page fetches it from GitHub Pages
+             (previous behaviour; fails offline)
+    every    bundled script inlined in every widget
+    once     bundled script inlined in the first widget only (default)
+
+and reports total HTML bytes and the Python time to build them. The browser
+parses and evaluates the script once per inlined copy; if ``node`` is on the
+PATH, that cost is measured by evaluating the bundled script in a fresh V8
+context, and the total script cost per mode is reported.
+
+It then compares plain and compressed (base64 zlib) data embedding for one
+widget per ``--sizes`` shape: HTML bytes and Python build time. Compressed
+sizes are for the first widget of a session, which also carries the decoder
+(inlined once per session, like the widget script).
+
+Usage (from ``python/``)::
+
+    python benchmarks/bench_widget_html.py
+    python benchmarks/bench_widget_html.py --widgets 1 20 --shape 80x100x5
+    python benchmarks/bench_widget_html.py --sizes 80x100x5 80x400x5
+"""
+
+import argparse
+import json
+import shutil
+import subprocess
+import time
+
+from common import make_synthetic_data, time_call
+from logitlenskit import display
+from logitlenskit.display import reset_widget_js, show_logit_lens
+
+MODES = {"url": False, "every": True, "once": None}
+
+_NODE_EVAL = """
+const vm = require("vm");
+const source = require("fs").readFileSync(0, "utf8");
+const times = [];
+for (let i = 0; i < %d; i++) {
+    const start = process.hrtime.bigint();
+    const context = vm.createContext({});
+    vm.runInContext(source, context);
+    if (typeof context.LogitLensWidget !== "function") throw new Error("no widget");
+    times.push(Number(process.hrtime.bigint() - start) / 1e6);
+}
+console.log(JSON.stringify(Math.min(...times)));
+"""
+
+
+def render_session(data, n_widgets: int, inline_js):
+    """Build n_widgets widgets in a fresh session; returns (bytes, seconds, copies)."""
+    reset_widget_js()
+    script = display._widget_js()
+    start = time.perf_counter()
+    pages = [show_logit_lens(data, inline_js=inline_js).data for _ in range(n_widgets)]
+    seconds = time.perf_counter() - start
+    copies = sum(script in page for page in pages)
+    return sum(len(page.encode("utf-8")) for page in pages), seconds, copies
+
+
+def compare_embedding(shape: str, repeat: int = 3):
+    """Plain vs compressed HTML for one widget: ((bytes, seconds), (bytes, seconds))."""
+    n_layers, n_pos, k = (int(x) for x in shape.split("x"))
+    data = display.to_js_format(make_synthetic_data(n_layers, n_pos, k))
+    results = []
+    for compress in (False, True):
+        reset_widget_js()
+        html = show_logit_lens(data, inline_js=False, compress=compress).data
+        timing = time_call(lambda: show_logit_lens(data, inline_js=False, compress=compress),
+                           repeat=repeat)
+        results.append((len(html.encode("utf-8")), timing["best"]))
+    reset_widget_js()
+    return results
+
+
+def script_eval_ms(repeat: int = 5):
+    """Best time to parse and evaluate the bundled script in node, or None."""
+    node = shutil.which("node")
+    if node is None:
+        return None
+    out = subprocess.run([node, "-e", _NODE_EVAL % repeat], input=display._widget_js(),
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--widgets", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--shape", default="28x16x5", help="n_layers x n_pos x k")
+    parser.add_argument("--sizes", nargs="+", default=["12x16x5", "28x64x5", "80x100x5"],
+                        help="n_layers x n_pos x k shapes for the embedding comparison")
+    args = parser.parse_args()
+
+    n_layers, n_pos, k = (int(x) for x in args.shape.split("x"))
+    data = make_synthetic_data(n_layers, n_pos, k)
+    script_kb = len(display._widget_js().encode("utf-8")) / 1e3
+    eval_ms = script_eval_ms()
+    print(f"bundled script: {script_kb:.1f} KB, evaluation "
+          + ("n/a (no node)" if eval_ms is None else f"{eval_ms:.1f} ms"))
+
+    print(f"{'widgets':>8} {'mode':>6} {'html KB':>9} {'build ms':>9} {'copies':>7} "
+          f"{'script ms':>10}")
+    for n_widgets in args.widgets:
+        for mode, inline_js in MODES.items():
+            size, seconds, copies = render_session(data, n_widgets, inline_js)
+            script_ms = "-" if eval_ms is None else f"{copies * eval_ms:.1f}"
+            print(f"{n_widgets:>8} {mode:>6} {size / 1e3:>9.1f} {seconds * 1e3:>9.1f} "
+                  f"{copies:>7} {script_ms:>10}")
+    reset_widget_js()
+
+    print(f"\n{'L x P x k':>12} {'plain KB':>9} {'ms':>6} {'compressed KB':>14} {'ms':>6} "
+          f"{'ratio':>6}")
+    for shape in args.sizes:
+        (plain, plain_s), (packed, packed_s) = compare_embedding(shape)
+        print(f"{shape:>12} {plain / 1e3:>9.1f} {plain_s * 1e3:>6.1f} {packed / 1e3:>14.1f} "
+              f"{packed_s * 1e3:>6.1f} {plain / packed:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
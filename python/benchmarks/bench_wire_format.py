@@ -0,0 +1,63 @@
+"""
+Benchmark: V2 JSON vs binary V3 payload sizes on the preview datasets.
+
+Loads the JSONP preview files (Llama-3.1-70B and GPT-J-6B), re-encodes them
+as V3 with each trajectory quantization, and reports raw and gzipped sizes
+plus the worst trajectory error introduced by quantization.
+
+Usage (from ``python/``)::
+
+    python benchmarks/bench_wire_format.py
+"""
+
+import gzip
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+
+from logitlenskit.binary import QUANTIZATIONS, decode_v3, encode_v3
+from logitlenskit.display import to_js_format
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+DATASETS = ["preview_data.js", "preview_data_gptj.js"]
+
+
+def load_jsonp(path: Path) -> dict:
+    """Strip the ``var NAME = ...;`` wrapper and parse the V2 JSON."""
+    text = path.read_text()
+    return json.loads(re.sub(r"^var \w+ = ", "", text).rstrip().rstrip(";"))
+
+
+def max_trajectory_error(v2: dict, restored: dict) -> float:
+    """Largest absolute difference between V2 and decoded trajectories."""
+    decoded = to_js_format(restored)["tracked"]
+    worst = 0.0
+    for expected, got in zip(v2["tracked"], decoded):
+        for token, traj in expected.items():
+            diff = np.abs(np.asarray(traj) - np.asarray(got[token]))
+            worst = max(worst, float(diff.max()))
+    return worst
+
+
+def main():
+    for name in DATASETS:
+        v2 = load_jsonp(REPO_ROOT / name)
+        v2_bytes = json.dumps(v2).encode("utf-8")
+        print(f"\n{name}: {v2['meta']['model']}, "
+              f"{len(v2['layers'])} layers x {len(v2['input'])} tokens")
+        print(f"{'format':<16} {'bytes':>10} {'gzip':>10} {'vs V2':>8} {'max err':>9}")
+        print(f"{'V2 JSON':<16} {len(v2_bytes):>10,} "
+              f"{len(gzip.compress(v2_bytes)):>10,} {'1.0x':>8} {'-':>9}")
+        for quantization in QUANTIZATIONS:
+            blob = encode_v3(v2, quantization=quantization)
+            error = max_trajectory_error(v2, decode_v3(blob))
+            print(f"{'V3 ' + quantization:<16} {len(blob):>10,} "
+                  f"{len(gzip.compress(blob)):>10,} "
+                  f"{len(v2_bytes) / len(blob):>7.1f}x {error:>9.2g}")
+
+
+if __name__ == "__main__":
+    main()
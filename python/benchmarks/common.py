@@ -0,0 +1,197 @@
+"""
+Shared helpers for offline benchmarks.
+
+Benchmarks run on CPU against randomly initialized models, so they need no
+network access or NDIF key. Run them from the ``python/`` directory, e.g.::
+
+    python benchmarks/bench_fused_projection.py
+"""
+
+import ctypes
+import sys
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+# Tiny-model constructors for MODEL_CONFIGS architectures: (config, model) classes
+ARCHS = {
+    "gpt2": ("GPT2Config", "GPT2LMHeadModel"),
+    "llama": ("LlamaConfig", "LlamaForCausalLM"),
+    "gpt_neox": ("GPTNeoXConfig", "GPTNeoXForCausalLM"),
+}
+
+
+def build_tiny_model(
+    n_layers: int = 12,
+    d_model: int = 128,
+    vocab_size: int = 4096,
+    n_heads: int = 4,
+    max_positions: int = 1024,
+):
+    """
+    Build a randomly initialized GPT-2 wrapped in nnterp.
+
+    The tokenizer is word-level over tokens "t2".."t{vocab_size - 1}" (ids 0
+    and 1 are special), so a prompt of n words is exactly n tokens; see
+    ``make_prompt``.
+    """
+    import torch
+    from transformers import GPT2Config, GPT2LMHeadModel
+    from nnterp import StandardizedTransformer
+
+    torch.manual_seed(0)
+    config = GPT2Config(
+        n_layer=n_layers, n_embd=d_model, n_head=n_heads, vocab_size=vocab_size,
+        n_positions=max_positions, bos_token_id=1, eos_token_id=1,
+    )
+    hf_model = GPT2LMHeadModel(config).eval()
+    return StandardizedTransformer(
+        hf_model, tokenizer=make_tokenizer(vocab_size), check_attn_probs_with_trace=False
+    )
+
+
+def build_arch_model(
+    arch: str,
+    n_layers: int = 12,
+    d_model: int = 128,
+    vocab_size: int = 4096,
+    n_heads: int = 4,
+    max_positions: int = 1024,
+):
+    """
+    Build a randomly initialized model of one ``ARCHS`` architecture.
+
+    The model is wrapped as a raw nnsight LanguageModel, so collection goes
+    through its ``MODEL_CONFIGS`` entry. Uses the same word-level tokenizer
+    as ``build_tiny_model``.
+    """
+    import torch
+    import transformers
+    from nnsight import LanguageModel
+
+    config_cls, model_cls = (getattr(transformers, name) for name in ARCHS[arch])
+    torch.manual_seed(0)
+    if arch == "gpt2":
+        config = config_cls(
+            n_layer=n_layers, n_embd=d_model, n_head=n_heads, vocab_size=vocab_size,
+            n_positions=max_positions, bos_token_id=1, eos_token_id=1,
+        )
+    else:
+        config = config_cls(
+            num_hidden_layers=n_layers, hidden_size=d_model, intermediate_size=4 * d_model,
+            num_attention_heads=n_heads, num_key_value_heads=n_heads,
+            vocab_size=vocab_size, max_position_embeddings=max_positions,
+            bos_token_id=1, eos_token_id=1, tie_word_embeddings=False,
+        )
+    hf_model = model_cls(config).eval()
+    return LanguageModel(hf_model, tokenizer=make_tokenizer(vocab_size))
+
+
+def make_tokenizer(vocab_size: int):
+    """Word-level tokenizer over "t2".."t{vocab_size - 1}"; ids 0 and 1 are special."""
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import PreTrainedTokenizerFast
+
+    vocab = {"<unk>": 0, "<eos>": 1}
+    vocab.update({f"t{i}": i for i in range(2, vocab_size)})
+    word_level = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    word_level.pre_tokenizer = pre_tokenizers.Whitespace()
+    return PreTrainedTokenizerFast(
+        tokenizer_object=word_level,
+        unk_token="<unk>", pad_token="<unk>", bos_token="<eos>", eos_token="<eos>",
+    )
+
+
+def make_prompt(n_tokens: int, offset: int = 2) -> str:
+    """Prompt of exactly ``n_tokens`` tokens for a ``build_tiny_model`` model."""
+    return " ".join(f"t{offset + i % 90}" for i in range(n_tokens))
+
+
+def time_call(fn: Callable, repeat: int = 5, warmup: int = 1) -> Dict[str, float]:
+    """Time ``fn()``; returns best and mean wall time in seconds."""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"best": min(times), "mean": sum(times) / len(times)}
+
+
+def measure_peak(fn: Callable) -> Tuple[Any, Optional[int]]:
+    """
+    Run ``fn()`` and measure the peak memory it adds to the process.
+
+    On Linux the kernel's resident-set high-water mark is reset before the
+    call (``/proc/self/clear_refs``) and read after it, after returning
+    freed heap to the OS so earlier calls do not mask the peak. Elsewhere
+    the peak is not measured.
+
+    Returns:
+        Tuple (fn's return value, peak bytes above the starting RSS or None)
+    """
+    if not sys.platform.startswith("linux"):
+        return fn(), None
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except OSError:
+        pass
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return fn(), None
+    start = _proc_status("VmRSS")
+    result = fn()
+    return result, max(0, _proc_status("VmHWM") - start)
+
+
+def _proc_status(field: str) -> int:
+    """A memory field of /proc/self/status, in bytes."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024
+    raise KeyError(field)
+
+
+def make_synthetic_data(
+    n_layers: int,
+    n_pos: int,
+    k: int = 5,
+    vocab_size: int = 32000,
+    seed: int = 0,
+) -> Dict:
+    """
+    Random data in the collect_logit_lens() format, without running a model.
+
+    Top-k sets drift slowly across layers, like real logit lens output, so
+    each position tracks a realistic 2-4k unique tokens rather than
+    n_layers * k.
+    """
+    import torch
+
+    gen = torch.Generator().manual_seed(seed)
+    base = torch.randint(0, vocab_size, (n_pos, 4 * k), generator=gen)
+    choice = torch.stack([
+        torch.randperm(4 * k, generator=gen)[:k] for _ in range(n_layers * n_pos)
+    ]).reshape(n_layers, n_pos, k)
+    topk = base.unsqueeze(0).expand(n_layers, -1, -1).gather(2, choice).to(torch.int32)
+
+    tracked, probs = [], []
+    for pos in range(n_pos):
+        unique = torch.unique(topk[:, pos]).to(torch.int32)
+        tracked.append(unique)
+        probs.append(torch.rand(n_layers, len(unique), generator=gen) ** 4)
+
+    ids = set(topk.flatten().tolist())
+    return {
+        "model": "synthetic",
+        "input": [f" w{i}" for i in range(n_pos)],
+        "layers": list(range(n_layers)),
+        "topk": topk,
+        "tracked": tracked,
+        "probs": probs,
+        "vocab": {i: f" tok{i}" for i in ids},
+    }
@@ -13,14 +13,46 @@ Example:
     >>> show_logit_lens(data)
 """
 
-from .collect import collect_logit_lens
-from .display import show_logit_lens, display_logit_lens, to_js_format
+from .collect import (
+    collect_logit_lens,
+    collect_logit_lens_batch,
+    generate_logit_lens,
+    iter_logit_lens,
+    merge_logit_lens,
+)
+from .display import (
+    show_logit_lens,
+    display_logit_lens,
+    reset_widget_js,
+    to_js_format,
+    write_logit_lens,
+)
+from .vocab import get_vocab_cache
+from .cache import ResultCache
+from .prefix import PrefixCache
+from .planner import plan_for_prompt, plan_payload
+from .store import LensStore
+from .aio import acollect_logit_lens, acollect_many
 
 __version__ = "0.2.0"
 
 __all__ = [
     "collect_logit_lens",
+    "collect_logit_lens_batch",
+    "generate_logit_lens",
+    "iter_logit_lens",
+    "merge_logit_lens",
     "show_logit_lens",
     "display_logit_lens",
+    "reset_widget_js",
     "to_js_format",
+    "write_logit_lens",
+    "get_vocab_cache",
+    "ResultCache",
+    "PrefixCache",
+    "plan_payload",
+    "plan_for_prompt",
+    "LensStore",
+    "acollect_logit_lens",
+    "acollect_many",
 ]
@@ -0,0 +1,195 @@
+"""
+asyncio API for concurrent logit lens collection.
+
+collect_logit_lens(..., remote=True) blocks its thread for the whole NDIF
+round-trip. The coroutines here run each collection in a worker thread so an
+event loop (a notebook or a service) can keep many requests in flight, with a
+concurrency limit, retries with exponential backoff, and backpressure: no new
+request is submitted while the consumer is not asking for results.
+
+Local traces (``remote=False``) are not designed to run concurrently on one
+model; use ``concurrency=1`` for them.
+"""
+
+import asyncio
+import functools
+import random
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import (
+    AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Optional, Tuple, Type, Union,
+)
+
+from .collect import collect_logit_lens
+
+
+# Transient failures only: other OSErrors (missing files, permissions) are not
+# retried. The default retry_on adds the transport errors below.
+DEFAULT_RETRY_ON: Tuple[Type[BaseException], ...] = (ConnectionError, TimeoutError)
+
+
+@functools.lru_cache(maxsize=None)
+def _transport_errors() -> Tuple[Type[BaseException], ...]:
+    """Network errors raised by nnsight's remote backend (httpx, socket.io), if installed."""
+    errors = []
+    try:
+        import httpx
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    try:
+        import socketio
+        errors.append(socketio.exceptions.ConnectionError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+async def acollect_logit_lens(
+    prompt: str,
+    model,
+    *,
+    retries: int = 2,
+    backoff: float = 1.0,
+    retry_on: Optional[Tuple[Type[BaseException], ...]] = None,
+    executor: Optional[Executor] = None,
+    collect: Callable[..., Dict] = collect_logit_lens,
+    **kwargs,
+) -> Dict:
+    """
+    Awaitable collect_logit_lens() that runs the trace in a worker thread.
+
+    Args:
+        prompt: Input text to analyze
+        model: nnterp StandardizedTransformer or nnsight LanguageModel
+        retries: Extra attempts after a failure in ``retry_on`` (default: 2)
+        backoff: Delay before the first retry in seconds, doubled (with
+            jitter) for each further retry (default: 1.0)
+        retry_on: Exception types that trigger a retry (default:
+            DEFAULT_RETRY_ON plus httpx and socket.io transport errors, imported
+            on first use); anything else is raised immediately
+        executor: Executor to run the blocking call in (default: the event
+            loop's default executor)
+        collect: Blocking collection function, called as
+            ``collect(prompt, model, **kwargs)`` (default: collect_logit_lens)
+        **kwargs: Passed to ``collect`` (k, layers, remote, cache, ...)
+
+    Returns:
+        Result in collect_logit_lens() format
+
+    Example:
+        >>> data = await acollect_logit_lens("The capital of France is", model, k=10)
+    """
+    if retries < 0:
+        raise ValueError(f"retries must be >= 0, got {retries}")
+    if retry_on is None:
+        retry_on = DEFAULT_RETRY_ON + _transport_errors()
+
+    loop = asyncio.get_running_loop()
+    for attempt in range(retries + 1):
+        try:
+            return await loop.run_in_executor(
+                executor, lambda: collect(prompt, model, **kwargs)
+            )
+        except retry_on:
+            if attempt == retries:
+                raise
+            delay = backoff * (2 ** attempt)
+            await asyncio.sleep(delay * (0.5 + random.random() / 2))
+
+
+async def acollect_many(
+    prompts: Union[Iterable[str], AsyncIterable[str]],
+    model,
+    *,
+    concurrency: int = 4,
+    retries: int = 2,
+    backoff: float = 1.0,
+    retry_on: Optional[Tuple[Type[BaseException], ...]] = None,
+    return_exceptions: bool = False,
+    collect: Callable[..., Dict] = collect_logit_lens,
+    **kwargs,
+) -> AsyncIterator[Tuple[int, Dict]]:
+    """
+    Collect many prompts concurrently, yielding results as they complete.
+
+    At most ``concurrency`` requests are in flight. Prompts are pulled from
+    ``prompts`` (which may be a lazy or async iterable) only as slots free
+    up, and no new request starts while the consumer is busy with a yielded
+    result, so a slow consumer throttles submission.
+
+    Args:
+        prompts: Prompts to analyze
+        model: nnterp StandardizedTransformer or nnsight LanguageModel
+        concurrency: Maximum requests in flight (default: 4)
+        retries: Extra attempts per prompt; see acollect_logit_lens()
+        backoff: Initial retry delay in seconds; see acollect_logit_lens()
+        retry_on: Exception types that trigger a retry; see acollect_logit_lens()
+        return_exceptions: Yield ``(index, exception)`` for prompts that
+            still fail after retries instead of raising (default: False).
+            When raising, requests still in flight are cancelled.
+        collect: Blocking collection function; see acollect_logit_lens()
+        **kwargs: Passed to ``collect`` (k, layers, remote, cache, ...)
+
+    Yields:
+        Tuples ``(index, result)`` in completion order, where ``index`` is
+        the prompt's position in ``prompts``
+
+    Example:
+        >>> results = [None] * len(prompts)
+        >>> async for i, data in acollect_many(prompts, model, concurrency=8):
+        ...     results[i] = data
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be >= 1, got {concurrency}")
+
+    source = _aiter_indexed(prompts)
+    pending: Dict[asyncio.Task, int] = {}
+    exhausted = False
+
+    # Own pool sized to the limit: the default executor may have fewer threads
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    index, prompt = await source.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                task = asyncio.ensure_future(acollect_logit_lens(
+                    prompt, model, retries=retries, backoff=backoff,
+                    retry_on=retry_on, executor=executor, collect=collect, **kwargs,
+                ))
+                pending[task] = index
+            if not pending:
+                return
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=pending.__getitem__):
+                index = pending.pop(task)
+                if task.exception() is None:
+                    yield index, task.result()
+                elif return_exceptions:
+                    yield index, task.exception()
+                else:
+                    raise task.exception()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        # Threads still running finish in the background
+        executor.shutdown(wait=False)
+
+
+async def _aiter_indexed(prompts) -> AsyncIterator[Tuple[int, str]]:
+    """Enumerate a sync or async iterable of prompts."""
+    if hasattr(prompts, "__aiter__"):
+        index = 0
+        async for prompt in prompts:
+            yield index, prompt
+            index += 1
+    else:
+        for index, prompt in enumerate(prompts):
+            yield index, prompt
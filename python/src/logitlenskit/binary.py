@@ -0,0 +1,314 @@
+"""
+Compact binary V3 wire format for logit lens data.
+
+V2 JSON (see docs/DATA_FORMAT.md) repeats decoded token strings in every
+``topk`` cell and ``tracked`` key and writes each probability as decimal
+text. V3 stores each token string once in a string table, refers to it by
+int32 index, keeps tracked tokens as a ragged array with offsets, and
+quantizes trajectories.
+
+Layout (all integers little-endian)::
+
+    b"LLV3"                      magic
+    uint32                       header length in bytes
+    header                       UTF-8 JSON: version, model, layers, input,
+                                 quantization and section table
+    sections                     raw arrays, each aligned to 8 bytes
+
+Sections:
+    strings_offsets  uint32 [n_strings + 1]   byte offsets into strings_blob
+    strings_blob     uint8  [...]             concatenated UTF-8 strings
+    vocab_ids        int32  [n_strings]       tokenizer ids (optional)
+    topk             int32  [n_layers, n_pos, k]      string-table indices,
+                                                      -1 pads short cells
+    tracked          int32  [n_tracked_total]         string-table indices
+    tracked_offsets  uint32 [n_pos + 1]
+    trajectories     float32 | float16 | uint8 [n_layers, n_tracked_total]
+
+Quantization schemes for ``trajectories``:
+    "float32": exact copy
+    "float16": IEEE half precision
+    "uint8-log": code 0 is probability 0 (anything below ``floor``); codes
+        1..255 are log-spaced over [floor, 1]
+"""
+
+import json
+import struct
+from typing import Dict
+
+import numpy as np
+import torch
+
+from .display import _is_js_format, _is_python_format
+from .utils import split_ragged
+
+
+MAGIC = b"LLV3"
+QUANTIZATIONS = ("float32", "float16", "uint8-log")
+DEFAULT_LOG_FLOOR = 1e-6
+_ALIGN = 8
+
+
+def encode_v3(
+    data: Dict,
+    quantization: str = "float16",
+    log_floor: float = DEFAULT_LOG_FLOOR,
+) -> bytes:
+    """
+    Encode logit lens data to the binary V3 format.
+
+    Args:
+        data: Data from collect_logit_lens() (Python format) or
+              to_js_format() (JavaScript V2 format)
+        quantization: Trajectory encoding: "float32", "float16" (default) or
+            "uint8-log"
+        log_floor: Smallest nonzero probability for "uint8-log"
+
+    Returns:
+        Encoded bytes
+
+    Example:
+        >>> blob = encode_v3(data, quantization="uint8-log")
+        >>> restored = decode_v3(blob)
+    """
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(
+            f"Unknown quantization: {quantization}. Supported: {list(QUANTIZATIONS)}"
+        )
+
+    if _is_python_format(data):
+        columns = _columns_from_python(data)
+    elif _is_js_format(data):
+        columns = _columns_from_js(data)
+    else:
+        raise ValueError(
+            "Unrecognized data format. Expected output from collect_logit_lens() "
+            "or to_js_format()."
+        )
+
+    header = {
+        "version": 3,
+        "model": columns["model"],
+        "layers": list(columns["layers"]),
+        "input": list(columns["input"]),
+        "quantization": {"scheme": quantization},
+    }
+    if quantization == "uint8-log":
+        header["quantization"]["floor"] = log_floor
+
+    strings = [s.encode("utf-8") for s in columns["strings"]]
+    sections = {
+        "strings_offsets": np.cumsum([0] + [len(s) for s in strings], dtype=np.uint32),
+        "strings_blob": np.frombuffer(b"".join(strings), dtype=np.uint8),
+        "topk": columns["topk"].astype(np.int32),
+        "tracked": columns["tracked"].astype(np.int32),
+        "tracked_offsets": columns["offsets"].astype(np.uint32),
+        "trajectories": _quantize(columns["trajectories"], quantization, log_floor),
+    }
+    if columns["vocab_ids"] is not None:
+        sections["vocab_ids"] = columns["vocab_ids"].astype(np.int32)
+    sections = {
+        name: np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+        for name, array in sections.items()
+    }
+
+    # Section table: offsets are relative to the end of the header
+    table = []
+    offset = 0
+    for name, array in sections.items():
+        offset = _aligned(offset)
+        table.append({
+            "name": name,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+        })
+        offset += array.nbytes
+    header["sections"] = table
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    # Pad the header so the first section starts 8-byte aligned
+    header_bytes += b" " * (_aligned(8 + len(header_bytes)) - 8 - len(header_bytes))
+
+    out = bytearray(MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+    body_start = len(out)
+    for entry, array in zip(table, sections.values()):
+        out += b"\0" * (body_start + entry["offset"] - len(out))
+        out += array.tobytes()
+    return bytes(out)
+
+
+def decode_v3(buf: bytes) -> Dict:
+    """
+    Decode binary V3 data to the Python API format.
+
+    Token ids in the result are the original tokenizer ids when the data was
+    encoded from collect_logit_lens() output, or string-table indices when
+    it was encoded from V2 JSON. Either way, ``vocab`` maps them to strings
+    and the result can be passed to to_js_format() or show_logit_lens().
+    Top-k cells that were shorter than k in V2 input are padded with -1.
+
+    Args:
+        buf: Bytes produced by encode_v3()
+
+    Returns:
+        Dict with model, input, layers, topk, tracked, probs, vocab (as from
+        collect_logit_lens()), plus ``quantization`` from the header
+    """
+    header, arrays = read_v3(buf)
+
+    offsets = arrays["strings_offsets"]
+    blob = arrays["strings_blob"].tobytes()
+    strings = [
+        blob[offsets[i]:offsets[i + 1]].decode("utf-8")
+        for i in range(len(offsets) - 1)
+    ]
+    if "vocab_ids" in arrays:
+        ids = arrays["vocab_ids"].astype(np.int64)
+    else:
+        ids = np.arange(len(strings), dtype=np.int64)
+
+    trajectories = _dequantize(arrays["trajectories"], header["quantization"])
+    tracked, probs = split_ragged(
+        torch.from_numpy(ids[arrays["tracked"]].astype(np.int32)),
+        torch.from_numpy(trajectories),
+        arrays["tracked_offsets"].astype(np.int64),
+    )
+
+    return {
+        "model": header["model"],
+        "input": header["input"],
+        "layers": header["layers"],
+        "topk": torch.from_numpy(
+            np.where(arrays["topk"] < 0, -1, ids[np.maximum(arrays["topk"], 0)]).astype(np.int32)
+        ),
+        "tracked": tracked,
+        "probs": probs,
+        "vocab": {int(i): s for i, s in zip(ids, strings)},
+        "quantization": header["quantization"],
+    }
+
+
+def read_v3(buf: bytes):
+    """
+    Parse a V3 buffer into its header and zero-copy numpy section views.
+
+    Args:
+        buf: Bytes produced by encode_v3()
+
+    Returns:
+        Tuple (header, arrays): the header dict and a dict of section name
+        to read-only numpy array backed by ``buf``
+    """
+    if bytes(buf[:4]) != MAGIC:
+        raise ValueError("Not a logit lens V3 buffer (bad magic)")
+    (header_len,) = struct.unpack("<I", buf[4:8])
+    header = json.loads(bytes(buf[8:8 + header_len]).decode("utf-8"))
+
+    body_start = 8 + header_len
+    arrays = {}
+    for entry in header["sections"]:
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"], dtype=np.int64))
+        arrays[entry["name"]] = np.frombuffer(
+            buf, dtype=dtype, count=count, offset=body_start + entry["offset"]
+        ).reshape(entry["shape"])
+    return header, arrays
+
+
+def _columns_from_python(data: Dict) -> Dict:
+    """Flatten collect_logit_lens() output into V3 columns."""
+    vocab_ids = sorted(data["vocab"])
+    lookup = np.zeros(max(vocab_ids, default=-1) + 1, dtype=np.int64)
+    lookup[vocab_ids] = np.arange(len(vocab_ids))
+
+    n_layers = len(data["layers"])
+    tracked = [t.detach().cpu().numpy().astype(np.int64) for t in data["tracked"]]
+    counts = [len(t) for t in tracked]
+    trajectories = [p.detach().cpu().float().numpy() for p in data["probs"]]
+    # -1 marks an unselected cell (positions=); keep it rather than index with it
+    topk = data["topk"].detach().cpu().numpy().astype(np.int64)
+
+    return {
+        "model": data["model"],
+        "layers": data["layers"],
+        "input": data["input"],
+        "strings": [data["vocab"][i] for i in vocab_ids],
+        "vocab_ids": np.asarray(vocab_ids, dtype=np.int64),
+        "topk": np.where(topk < 0, -1, lookup[np.maximum(topk, 0)]) if lookup.size else topk,
+        "tracked": lookup[np.concatenate(tracked)] if tracked else np.zeros(0, np.int64),
+        "offsets": np.cumsum([0] + counts),
+        "trajectories": (
+            np.concatenate(trajectories, axis=1) if trajectories
+            else np.zeros((n_layers, 0), dtype=np.float32)
+        ),
+    }
+
+
+def _columns_from_js(data: Dict) -> Dict:
+    """Flatten V2 JSON data into V3 columns, interning token strings."""
+    strings = []
+    index = {}
+
+    def intern(token):
+        if token not in index:
+            index[token] = len(strings)
+            strings.append(token)
+        return index[token]
+
+    # V2 cells may hold fewer than k tokens; pad with -1
+    k = max((len(cell) for layer in data["topk"] for cell in layer), default=0)
+    topk = np.asarray(
+        [[[intern(t) for t in cell] + [-1] * (k - len(cell)) for cell in layer]
+         for layer in data["topk"]],
+        dtype=np.int64,
+    )
+    tracked = [intern(t) for pos in data["tracked"] for t in pos]
+    counts = [len(pos) for pos in data["tracked"]]
+    trajectories = np.asarray(
+        [traj for pos in data["tracked"] for traj in pos.values()],
+        dtype=np.float32,
+    ).reshape(len(tracked), len(data["layers"])).T
+
+    return {
+        "model": data["meta"].get("model", "unknown"),
+        "layers": data["layers"],
+        "input": data["input"],
+        "strings": strings,
+        "vocab_ids": None,
+        "topk": topk.reshape(len(data["layers"]), len(data["input"]), -1),
+        "tracked": np.asarray(tracked, dtype=np.int64),
+        "offsets": np.cumsum([0] + counts),
+        "trajectories": trajectories,
+    }
+
+
+def _quantize(values: np.ndarray, scheme: str, log_floor: float) -> np.ndarray:
+    """Quantize trajectory values with the given scheme."""
+    values = np.asarray(values, dtype=np.float32)
+    if scheme == "float32":
+        return values
+    if scheme == "float16":
+        return values.astype(np.float16)
+
+    log_floor = np.log(log_floor)
+    with np.errstate(divide="ignore"):
+        scaled = (np.log(np.clip(values, 0.0, 1.0)) - log_floor) / -log_floor
+    codes = np.rint(1 + scaled * 254)
+    return np.where(values >= np.exp(log_floor), codes, 0).clip(0, 255).astype(np.uint8)
+
+
+def _dequantize(values: np.ndarray, quantization: Dict) -> np.ndarray:
+    """Invert _quantize() to float32 trajectories."""
+    scheme = quantization["scheme"]
+    if scheme in ("float32", "float16"):
+        return values.astype(np.float32)
+
+    log_floor = np.log(quantization["floor"])
+    probs = np.exp(log_floor + (values.astype(np.float32) - 1) / 254 * -log_floor)
+    return np.where(values == 0, 0.0, probs).astype(np.float32)
+
+
+def _aligned(offset: int) -> int:
+    """Round offset up to the section alignment."""
+    return -(-offset // _ALIGN) * _ALIGN
@@ -0,0 +1,199 @@
+"""
+On-disk, content-addressed cache of collect_logit_lens() results.
+
+Remote runs are slow and bandwidth-bound, and notebooks rerun the same
+(model, prompt, k, layers) combinations over and over. A ResultCache stores
+each result under a hash of everything that determines it, so a repeat call
+returns from disk without running ``model.trace``.
+
+Entries are binary V3 files (see binary.py) with float32 trajectories, or
+float16 ones for ``probs_dtype="float16"`` results, so they round-trip
+losslessly and keep their dtype. The cache is bounded in bytes; when it grows
+past ``max_bytes`` the least recently used entries (by file modification
+time, refreshed on every hit) are deleted. Several processes may share one
+directory: writes are atomic renames.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import torch
+
+from .binary import decode_v3, encode_v3
+
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "logitlenskit" / "results"
+_SUFFIX = ".llv3"
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of logit lens results on disk.
+
+    Args:
+        directory: Cache directory (default: ~/.cache/logitlenskit/results)
+        max_bytes: Total size bound; least recently used entries are evicted
+            beyond it (default: 1 GB)
+
+    Example:
+        >>> cache = ResultCache(max_bytes=500_000_000)
+        >>> data = collect_logit_lens(prompt, model, cache=cache)  # miss
+        >>> data = collect_logit_lens(prompt, model, cache=cache)  # hit, no trace
+        >>> cache.stats()["hits"]
+        1
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Union[str, os.PathLike]] = None,
+        max_bytes: int = 1 << 30,
+    ):
+        self.directory = (
+            Path(directory).expanduser() if directory is not None else DEFAULT_CACHE_DIR
+        )
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._total = None  # Directory size, scanned on the first put
+
+    def key(self, model_name: str, token_ids: List[int], k: int, layers: List[int],
+            **params: Any) -> str:
+        """
+        Content hash for a collection request.
+
+        Args:
+            model_name: Model ``_name_or_path``
+            token_ids: Prompt token ids
+            k: Top-k size
+            layers: Layer indices
+            **params: Any other options that change the result
+
+        Returns:
+            Hex digest identifying the result
+        """
+        from . import __version__
+
+        payload = json.dumps({
+            "version": __version__,
+            "model": model_name,
+            "token_ids": [int(t) for t in token_ids],
+            "k": int(k),
+            "layers": [int(li) for li in layers],
+            "params": params,
+        }, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up a result, marking it most recently used.
+
+        Returns:
+            The cached result in collect_logit_lens() format, or None
+        """
+        path = self._path(key)
+        try:
+            blob = path.read_bytes()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # Evicted by another process after we read it
+        self.hits += 1
+        self.bytes_read += len(blob)
+        result = decode_v3(blob)
+        if result.pop("quantization")["scheme"] == "float16":
+            result["probs"] = [p.half() for p in result["probs"]]
+        return result
+
+    def put(self, key: str, result: Dict) -> int:
+        """
+        Store a result, then evict least recently used entries over the bound.
+
+        Returns:
+            Bytes written
+        """
+        half = any(p.dtype == torch.float16 for p in result["probs"])
+        blob = encode_v3(result, quantization="float16" if half else "float32")
+        if self._total is None:
+            self._total = sum(_size(path) for path in self._entries())
+        replaced = _size(self._path(key))
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, self._path(key))
+        self.bytes_written += len(blob)
+        self._total += len(blob) - replaced
+        if self._total > self.max_bytes:
+            self._evict()
+        return len(blob)
+
+    def clear(self):
+        """Delete all entries."""
+        for path in self._entries():
+            path.unlink(missing_ok=True)
+        self._total = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Cache statistics for this instance, plus the directory's current size.
+
+        Returns:
+            Dict with hits, misses, evictions, bytes_read, bytes_written,
+            entries and size_bytes
+        """
+        sizes = [_size(path) for path in self._entries()]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "entries": len(sizes),
+            "size_bytes": sum(sizes),
+        }
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (key + _SUFFIX)
+
+    def _entries(self) -> List[Path]:
+        return list(self.directory.glob("*" + _SUFFIX))
+
+    def _evict(self):
+        """
+        Delete least recently used entries until under max_bytes.
+
+        Rescans the directory, so the running total also picks up entries
+        written or evicted by other processes sharing it.
+        """
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.evictions += 1
+        self._total = total
+
+
+def _size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
@@ -0,0 +1,301 @@
+"""
+Command-line entry point: resumable corpus runs.
+
+    logitlenskit run prompts.jsonl --model openai-community/gpt2 --out corpus.lens
+
+Each line of the prompts file is a JSON object with a ``prompt`` (or
+``text``) field and an optional ``id`` (default: the line number). Results
+are appended to a LensStore in ``--out`` keyed by prompt id. A row is the
+checkpoint, so a rerun after a crash skips every prompt already stored and
+recomputes nothing.
+
+Local runs (the default) shard prompts into micro-batches across a process
+pool, one model copy per worker. ``--remote`` runs traces on NDIF instead,
+keeping ``--concurrency`` requests in flight from a single process.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from .store import LensStore
+
+
+_RUN_FILE = "run.json"
+
+
+def run_corpus(
+    prompts_path: str,
+    model_spec: str,
+    out: str,
+    k: int = 5,
+    layers: Optional[List[int]] = None,
+    remote: bool = False,
+    workers: int = 1,
+    concurrency: int = 4,
+    shard_size: int = 8,
+    token_budget: int = 2048,
+    report_every: float = 5.0,
+    log: Optional[TextIO] = None,
+) -> Dict:
+    """
+    Collect logit lens data for every prompt in a JSONL file into a LensStore.
+
+    Args:
+        prompts_path: JSONL file of ``{"id": ..., "prompt": ...}`` objects
+        model_spec: HuggingFace model name, or ``"module:function"`` naming a
+            factory that returns a model (e.g. a locally built test model)
+        out: LensStore directory; created if missing, resumed if not
+        k: Number of top predictions per layer/position (default: 5)
+        layers: Specific layer indices to analyze (default: all layers)
+        remote: Run traces on NDIF (default: False, run locally)
+        workers: Local worker processes; 1 runs in this process (default: 1)
+        concurrency: Remote requests in flight (default: 4)
+        shard_size: Prompts per local work unit, collected with
+            collect_logit_lens_batch() (default: 8)
+        token_budget: Padded-token budget per local micro-batch (default: 2048)
+        report_every: Seconds between progress lines (default: 5.0)
+        log: Stream for progress lines (default: stderr)
+
+    Returns:
+        Dict with totals: done, skipped, failed, tokens, bytes_written, seconds
+
+    Example:
+        >>> run_corpus("prompts.jsonl", "openai-community/gpt2", "corpus.lens", workers=4)
+    """
+    prompts = list(_read_prompts(prompts_path))
+    ids = [pid for pid, _ in prompts]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"Duplicate prompt ids in {prompts_path}")
+
+    settings = {"model": model_spec, "k": k, "layers": layers}
+    store = LensStore(out, mode="a")
+    try:
+        _check_run_settings(Path(out), settings)
+        done = set(store.keys())
+        todo = [(pid, prompt) for pid, prompt in prompts if pid not in done]
+
+        progress = _Progress(store, len(prompts), len(prompts) - len(todo),
+                             report_every, log or sys.stderr)
+        progress.report(force=True)
+        if todo:
+            if remote:
+                asyncio.run(_run_remote(todo, model_spec, store, progress,
+                                        k=k, layers=layers, concurrency=concurrency))
+            else:
+                _run_local(todo, model_spec, store, progress, k=k, layers=layers,
+                           workers=workers, shard_size=shard_size,
+                           token_budget=token_budget)
+        progress.report(force=True)
+        return progress.totals()
+    finally:
+        store.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Console script entry point."""
+    parser = argparse.ArgumentParser(prog="logitlenskit")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Collect logit lens data for a JSONL corpus")
+    run.add_argument("prompts", help="JSONL file with one {\"id\", \"prompt\"} object per line")
+    run.add_argument("--model", required=True,
+                     help="HuggingFace model name, or module:function model factory")
+    run.add_argument("--out", required=True, help="Output LensStore directory")
+    run.add_argument("-k", type=int, default=5, help="Top-k per layer/position")
+    run.add_argument("--layers", type=_parse_layers, default=None,
+                     help="Comma-separated layer indices (default: all)")
+    run.add_argument("--remote", action="store_true", help="Run traces on NDIF")
+    run.add_argument("--workers", type=int, default=1, help="Local worker processes")
+    run.add_argument("--concurrency", type=int, default=4, help="Remote requests in flight")
+    run.add_argument("--shard-size", type=int, default=8, help="Prompts per local work unit")
+    run.add_argument("--token-budget", type=int, default=2048,
+                     help="Padded tokens per local micro-batch")
+    run.add_argument("--report-every", type=float, default=5.0,
+                     help="Seconds between progress lines")
+
+    args = parser.parse_args(argv)
+    totals = run_corpus(
+        args.prompts, args.model, args.out, k=args.k, layers=args.layers,
+        remote=args.remote, workers=args.workers, concurrency=args.concurrency,
+        shard_size=args.shard_size, token_budget=args.token_budget,
+        report_every=args.report_every,
+    )
+    return 1 if totals["failed"] else 0
+
+
+class _Progress:
+    """Counts completed prompts and prints throughput lines."""
+
+    def __init__(self, store: LensStore, total: int, skipped: int,
+                 report_every: float, log: TextIO):
+        self.store = store
+        self.total = total
+        self.skipped = skipped
+        self.report_every = report_every
+        self.log = log
+        self.done = 0
+        self.failed = 0
+        self.tokens = 0
+        self.start = self.last_report = time.perf_counter()
+        self.start_bytes = _dir_size(store.path)
+
+    def add(self, pid: str, result: Dict):
+        self.store.append(result, key=pid)
+        self.done += 1
+        self.tokens += len(result["input"])
+        self.report()
+
+    def fail(self, pid: str, error: BaseException):
+        self.failed += 1
+        print(f"failed {pid}: {type(error).__name__}: {error}", file=self.log)
+
+    def totals(self) -> Dict:
+        return {
+            "done": self.done,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "tokens": self.tokens,
+            "bytes_written": _dir_size(self.store.path) - self.start_bytes,
+            "seconds": time.perf_counter() - self.start,
+        }
+
+    def report(self, force: bool = False):
+        now = time.perf_counter()
+        if not force and now - self.last_report < self.report_every:
+            return
+        self.last_report = now
+        t = self.totals()
+        elapsed = max(t["seconds"], 1e-9)
+        print(
+            f"[{self.skipped + self.done}/{self.total}] "
+            f"{t['done'] / elapsed:.2f} prompts/s, {t['tokens'] / elapsed:.1f} tokens/s, "
+            f"{t['bytes_written'] / 1e6:.2f} MB written"
+            + (f", {self.failed} failed" if self.failed else "")
+            + (f" ({self.skipped} already done)" if self.skipped else ""),
+            file=self.log, flush=True,
+        )
+
+
+def _run_local(todo, model_spec, store, progress, k, layers, workers, shard_size,
+               token_budget):
+    """Collect shards of prompts, in this process or across a process pool."""
+    shards = [todo[i:i + shard_size] for i in range(0, len(todo), shard_size)]
+    options = {"k": k, "layers": layers, "token_budget": token_budget}
+
+    if workers <= 1:
+        _init_worker(model_spec, 0)
+        for shard in shards:
+            for pid, result in _collect_shard(shard, options):
+                progress.add(pid, result)
+        return
+
+    # Bound submitted work so memory stays flat on large corpora
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_spec, workers)) as pool:
+        shards = iter(shards)
+        pending = set()
+        while True:
+            for shard in shards:
+                pending.add(pool.submit(_collect_shard, shard, options))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for pid, result in future.result():
+                    progress.add(pid, result)
+
+
+async def _run_remote(todo, model_spec, store, progress, k, layers, concurrency):
+    """Keep ``concurrency`` remote traces in flight from this process."""
+    from .aio import acollect_many
+    from .collect import collect_logit_lens
+
+    model = _load_model(model_spec)
+    async for i, result in acollect_many(
+        [prompt for _, prompt in todo], model, concurrency=concurrency,
+        return_exceptions=True, collect=collect_logit_lens,
+        k=k, layers=layers, remote=True,
+    ):
+        if isinstance(result, BaseException):
+            progress.fail(todo[i][0], result)
+        else:
+            progress.add(todo[i][0], result)
+
+
+_worker_model = None
+
+
+def _init_worker(model_spec: str, workers: int):
+    """Load the model once per worker process."""
+    global _worker_model
+    if workers > 1:
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    _worker_model = _load_model(model_spec)
+
+
+def _collect_shard(shard: List[Tuple[str, str]], options: Dict) -> List[Tuple[str, Dict]]:
+    """Collect one shard with this worker's model."""
+    import torch
+    from .collect import collect_logit_lens_batch
+
+    # No autograd graph: results cross process boundaries
+    with torch.no_grad():
+        results = collect_logit_lens_batch(
+            [prompt for _, prompt in shard], _worker_model, k=options["k"],
+            layers=options["layers"], remote=False, token_budget=options["token_budget"],
+        )
+    return [(pid, result) for (pid, _), result in zip(shard, results)]
+
+
+def _load_model(model_spec: str):
+    """Load a model from a HuggingFace name or a ``module:function`` factory."""
+    if ":" in model_spec:
+        module, _, name = model_spec.partition(":")
+        return getattr(importlib.import_module(module), name)()
+    from nnterp import StandardizedTransformer
+    return StandardizedTransformer(model_spec)
+
+
+def _read_prompts(path: str) -> Iterator[Tuple[str, str]]:
+    """Yield (id, prompt) from a JSONL file, skipping blank lines."""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            prompt = record.get("prompt", record.get("text"))
+            if prompt is None:
+                raise ValueError(f"{path}:{line_number + 1}: missing 'prompt' field")
+            yield str(record.get("id", line_number)), prompt
+
+
+def _check_run_settings(out: Path, settings: Dict):
+    """Record run settings on first run; refuse to resume with different ones."""
+    path = out / _RUN_FILE
+    if path.exists():
+        previous = json.loads(path.read_text())
+        if previous != settings:
+            raise ValueError(
+                f"{out} was started with {previous}; cannot resume with {settings}"
+            )
+    else:
+        path.write_text(json.dumps(settings))
+
+
+def _parse_layers(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def _dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in Path(path).iterdir() if p.is_file())
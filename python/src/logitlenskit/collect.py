@@ -6,8 +6,27 @@ language models, optimized for remote execution via NDIF where bandwidth
 between server and client is the primary bottleneck.
 """
 
+import functools
+import heapq
+import sys
+
+import numpy as np
 import torch
-from typing import List, Dict, Optional, Union
+from typing import (
+    TYPE_CHECKING, Callable, List, Dict, Iterable, Iterator, Optional, Sequence, Union,
+)
+
+from .models import ModelPlan, get_model_plan
+from .profiling import Profile, make_profile, tensor_bytes, timed
+from .utils import split_ragged
+from .vocab import get_vocab_cache
+
+if TYPE_CHECKING:
+    from .cache import ResultCache
+    from .prefix import PrefixCache
+
+
+_PROBS_DTYPES = {"float32": torch.float32, "float16": torch.float16}
 
 
 def collect_logit_lens(
@@ -16,6 +35,19 @@ def collect_logit_lens(
     k: int = 5,
     layers: Optional[List[int]] = None,
     remote: bool = True,
+    fused: bool = False,
+    memory_budget: Optional[int] = None,
+    cache: Optional["ResultCache"] = None,
+    lens_head: bool = False,
+    precision: Optional[str] = None,
+    adaptive: bool = False,
+    adaptive_stride: int = 8,
+    adaptive_tolerance: float = 0.05,
+    layer_budget: Optional[int] = None,
+    positions: Union[int, slice, Sequence[int], Sequence[bool], torch.Tensor, None] = None,
+    prefix_cache: Optional["PrefixCache"] = None,
+    profile: Union[bool, Profile, Callable[[str, float], None]] = False,
+    probs_dtype: Optional[str] = None,
 ) -> Dict:
     """
     Collect logit lens data: top-k predictions and probability trajectories.
@@ -29,77 +61,1155 @@ def collect_logit_lens(
         k: Number of top predictions to track per layer/position (default: 5)
         layers: Specific layer indices to analyze (default: all layers)
         remote: Use NDIF remote execution (default: True)
+        fused: Project all selected layers with a single norm, lm_head,
+            softmax and topk over a stacked [n_layers * n_pos, d_model]
+            matrix instead of one call per layer (default: False). Results
+            are the same; fewer, larger kernels (and graph nodes) are run.
+        memory_budget: If set, bound the projection's working memory to about
+            this many bytes by streaming over lm_head in vocabulary chunks
+            with a running logsumexp and top-k merge, so full-vocabulary
+            probabilities are never materialized (default: None). Tracked
+            probabilities are returned as float32.
+        cache: Optional ResultCache. Results are keyed by model name, token
+            ids, k, layers and library version; a hit returns from disk
+            without running the model (default: None)
+        lens_head: Project through a cached LensHead with the final norm
+            folded into the unembedding (local runs only; default: False)
+        precision: Lens projection precision, "fp32", "bf16", "fp16" or
+            "int8" (per-row quantized unembedding). Implies lens_head; use
+            lens.precision_report() to check accuracy (default: None, the
+            model's own dtype)
+        adaptive: Project only the layers needed to follow the predictions
+            (default: False). Every ``adaptive_stride``-th candidate layer
+            (and the last) is projected first; then the midpoint of each gap
+            is projected, most-changed gap first, while the top-1 token
+            changes at some position or a top-k token's probability changes
+            by more than ``adaptive_tolerance`` across the gap. ``layers``
+            in the result lists exactly the layers computed.
+        adaptive_stride: Coarse stride over candidate layers (default: 8)
+        adaptive_tolerance: Probability change that triggers refinement
+            (default: 0.05)
+        layer_budget: Maximum number of layers to project in adaptive mode,
+            including the coarse pass (default: None, no limit)
+        positions: Token positions to project (default: None, all). An
+            index, a slice, a sequence of indices (negative indices count
+            from the end) or a boolean mask over the prompt's tokens. Hidden
+            states are sliced before the norm and lm_head, so cost scales
+            with the number of selected positions. ``input`` still lists
+            every token; unselected positions get ``topk`` of -1 (shown as
+            empty cells) and no tracked tokens.
+        prefix_cache: Optional PrefixCache for incremental collection (local
+            runs only). Lens results and the KV cache of the longest cached
+            token prefix are reused, and the model runs only on the new
+            suffix tokens. Results are the same as a full run (default: None)
+        profile: Record per-stage timings and byte counts in
+            ``data["profile"]`` (a Profile; see logitlenskit.profiling).
+            True, an existing Profile to add to, or a ``sink(name, value)``
+            callable that receives every measurement (default: False)
+        probs_dtype: Cast trajectories to "float32" or "float16" before
+            saving, e.g. to halve the remote download (default: None, as
+            computed). See planner.plan_payload() for choosing it, with k
+            and layers, from a byte or latency budget.
 
     Returns:
         Dict with:
             model: Model name/path
             input: List of input token strings
-            layers: List of layer indices analyzed
+            layers: List of layer indices analyzed (computed, if adaptive)
             topk: Tensor[int32] of shape [n_layers, n_positions, k]
+                (-1 at positions not selected)
             tracked: List of Tensor[int32] per position (unique token indices)
             probs: List of Tensor[float32] per position [n_layers, n_tracked]
             vocab: Dict mapping token indices to strings
+            profile: Profile, only when ``profile`` is set
 
     Example:
         >>> from nnterp import StandardizedTransformer
         >>> model = StandardizedTransformer("openai-community/gpt2")
         >>> data = collect_logit_lens("The capital of France is", model)
         >>> print(data["input"])  # ['The', ' capital', ' of', ' France', ' is']
+        >>> last = collect_logit_lens("The capital of France is", model, positions=-1)
     """
+    prof = make_profile(profile)
+
     # Tokenize once, client-side
+    with timed(prof, "tokenize"):
+        token_ids = model.tokenizer.encode(prompt)
+    _check_projection(remote, lens_head, precision)
+    selected = _resolve_positions(positions, len(token_ids))
+    select = _position_index(selected, len(token_ids))
+
+    # Default: all layers. The model's plan is cached per instance; a folded
+    # LensHead is only built after the result cache lookup below
+    if layers is None:
+        layers = list(range(get_model_plan(model).n_layers))
+
+    # Every option that changes the result, for the cache key
+    params = {}
+    if fused:
+        params["fused"] = True
+    if memory_budget is not None:
+        params["memory_budget"] = memory_budget
+    if lens_head:
+        params["lens_head"] = True
+    if precision is not None:
+        params["precision"] = precision
+    if probs_dtype is not None:
+        if probs_dtype not in _PROBS_DTYPES:
+            raise ValueError(
+                f"Unknown probs_dtype: {probs_dtype}. Supported: {list(_PROBS_DTYPES)}"
+            )
+        params["probs_dtype"] = probs_dtype
+    if adaptive:
+        n_coarse = len(set(range(0, len(layers), adaptive_stride)) | {len(layers) - 1})
+        if layer_budget is not None and layer_budget < n_coarse:
+            raise ValueError(
+                f"layer_budget={layer_budget} is smaller than the coarse pass "
+                f"({n_coarse} layers at stride {adaptive_stride})"
+            )
+        params["adaptive"] = [adaptive_stride, adaptive_tolerance, layer_budget]
+    if selected is not None:
+        params["positions"] = selected
+    if prefix_cache is not None and (remote or adaptive or selected is not None
+                                     or probs_dtype is not None):
+        raise ValueError(
+            "prefix_cache requires remote=False, without adaptive, positions or probs_dtype"
+        )
+
+    if cache is not None:
+        key = cache.key(_model_name(model), token_ids, k, layers, **params)
+        with timed(prof, "cache_lookup"):
+            cached = cache.get(key)
+        if cached is not None:
+            return _attach_profile(cached, prof)
+
+    plan = _projection_plan(model, remote, lens_head, precision)
+    if prefix_cache is not None:
+        with timed(prof, "trace"):
+            data = _collect_incremental(
+                model, plan, token_ids, layers, k, fused, memory_budget, prefix_cache,
+                config=(id(model), id(plan), k, tuple(layers), fused, memory_budget),
+            )
+        if cache is not None:
+            cache.put(key, data)
+        return _attach_profile(data, prof)
+
+    # Stages inside a remote trace run on the server: time the whole trace only
+    inner = None if remote else prof
+
+    # Run model, compute logit lens (computation happens server-side if remote=True)
+    with timed(prof, "trace"):
+        with model.trace(token_ids, remote=remote):
+            # Inside the trace: the body's module calls run outside any outer
+            # no_grad, and a graph would pin every layer's logits and softmax
+            with torch.no_grad():
+                if adaptive:
+                    hidden = torch.stack([_hidden(plan, li, select)[0] for li in layers])
+                    with timed(inner, "projection"):
+                        result = _adaptive_reduce(
+                            plan, hidden, k, adaptive_stride, adaptive_tolerance, layer_budget
+                        )
+                elif fused or memory_budget is not None:
+                    with timed(inner, "forward"):
+                        hidden = torch.stack([_hidden(plan, li, select)[0] for li in layers])
+                    result = _reduce_stacked(plan, hidden, k, memory_budget, inner)
+                else:
+                    all_probs, topk = _project_layers(plan, layers, k, select, inner)
+                    with timed(inner, "unique_gather"):
+                        tracked, offsets, values = _ragged_trajectories(all_probs, topk)
+                    result = {
+                        "topk": topk, "tracked": tracked, "offsets": offsets, "probs": values,
+                    }
+                if probs_dtype is not None:
+                    result["probs"] = result["probs"].to(_PROBS_DTYPES[probs_dtype])
+
+                # Save flat results to transmit from server; split client-side
+                result = result.save()
+
+    if prof is not None:
+        prof.add_bytes("saved", tensor_bytes(result))
+    if adaptive:
+        layers = [layers[i] for i in result["layers"].tolist()]
+    if selected is not None:
+        result = _expand_positions(result, selected, len(token_ids))
+    data = _build_result(model, token_ids, layers, result, prof)
+    if cache is not None:
+        cache.put(key, data)
+    return _attach_profile(data, prof)
+
+
+def iter_logit_lens(
+    prompt: str,
+    model,
+    k: int = 5,
+    layers: Optional[List[int]] = None,
+    remote: bool = True,
+    window: int = 256,
+    memory_budget: Optional[int] = None,
+    lens_head: bool = False,
+    precision: Optional[str] = None,
+) -> Iterator[Dict]:
+    """
+    Collect logit lens data window by window over positions, as a generator.
+
+    The forward pass runs once; projection and top-k/trajectory reduction
+    then run one position window at a time, so only one window's
+    [n_layers, window, vocab] probabilities exist at once. Locally
+    (``remote=False``) each window is projected when the consumer asks for
+    it, so downstream work can start before the prompt is finished. With
+    ``remote=True`` the server reduces the windows in turn inside one trace
+    and they are yielded after it returns.
+
+    Args:
+        prompt: Input text to analyze
+        model: nnterp StandardizedTransformer or nnsight LanguageModel
+        k: Number of top predictions to track per layer/position (default: 5)
+        layers: Specific layer indices to analyze (default: all layers)
+        remote: Use NDIF remote execution (default: True)
+        window: Number of positions per window (default: 256)
+        memory_budget: Optional per-window bound in bytes; see
+            collect_logit_lens()
+        lens_head: Use a folded LensHead; see collect_logit_lens()
+        precision: Lens projection precision; see collect_logit_lens()
+
+    Yields:
+        Partial results in the collect_logit_lens() format covering only the
+        window's positions (``input``, ``topk``, ``tracked`` and ``probs`` are
+        restricted to it), plus ``positions``: [start, end). Use
+        merge_logit_lens() to combine them into one result.
+
+    Example:
+        >>> parts = []
+        >>> for part in iter_logit_lens(long_prompt, model, remote=False):
+        ...     parts.append(part)  # e.g. render part["positions"] now
+        >>> data = merge_logit_lens(parts)
+    """
     token_ids = model.tokenizer.encode(prompt)
+    plan = _projection_plan(model, remote, lens_head, precision)
+
+    if layers is None:
+        layers = list(range(plan.n_layers))
+
     n_pos = len(token_ids)
+    windows = [(start, min(start + window, n_pos)) for start in range(0, n_pos, window)]
+
+    # no_grad inside the traces: a graph on the saved hidden states would pin
+    # the whole forward pass for as long as the generator is alive
+    if remote:
+        with model.trace(token_ids, remote=remote):
+            with torch.no_grad():
+                hidden = torch.stack([plan.layer_output(li)[0] for li in layers])
+                results = []
+                for start, end in windows:
+                    results.append(
+                        _reduce_stacked(plan, hidden[:, start:end], k, memory_budget)
+                    )
+                results = results.save()
+    else:
+        with model.trace(token_ids, remote=False):
+            with torch.no_grad():
+                hidden = torch.stack([plan.layer_output(li)[0] for li in layers]).save()
+
+    for i, (start, end) in enumerate(windows):
+        if remote:
+            result = results[i]
+        else:
+            with torch.no_grad():
+                result = _reduce_stacked(plan, hidden[:, start:end], k, memory_budget)
+        part = _build_result(model, token_ids[start:end], layers, result)
+        part["positions"] = [start, end]
+        yield part
+
+
+def merge_logit_lens(parts: Iterable[Dict]) -> Dict:
+    """
+    Merge partial results from iter_logit_lens() into one result.
+
+    Args:
+        parts: Partial results covering consecutive position windows
+
+    Returns:
+        Dict in the collect_logit_lens() format covering all positions
+    """
+    parts = sorted(parts, key=lambda part: part["positions"][0])
+    vocab = {}
+    for part in parts:
+        vocab.update(part["vocab"])
+
+    return {
+        "model": parts[0]["model"],
+        "input": [tok for part in parts for tok in part["input"]],
+        "layers": parts[0]["layers"],
+        "topk": torch.cat([part["topk"] for part in parts], dim=1),
+        "tracked": [t for part in parts for t in part["tracked"]],
+        "probs": [p for part in parts for p in part["probs"]],
+        "vocab": vocab,
+    }
+
+
+def generate_logit_lens(
+    prompt: str,
+    model,
+    max_new_tokens: int = 20,
+    k: int = 5,
+    layers: Optional[List[int]] = None,
+    remote: bool = True,
+    stop_at_eos: bool = True,
+    lens_head: bool = False,
+    precision: Optional[str] = None,
+) -> Iterator[Dict]:
+    """
+    Generate greedily and stream the logit lens of each new position.
+
+    The first part covers the prompt. Each later part covers one position:
+    the token generated in the previous step, projected at every layer.
+    Steps reuse the KV cache, so a step costs one token's forward pass and
+    ``len(layers)`` single-position projections, not a re-trace of the
+    growing sequence. Locally (``remote=False``) each step runs when the
+    consumer asks for it, so a widget can be updated live. With
+    ``remote=True`` generation runs in one ``model.generate`` on the
+    server, which collects every step, and the parts are yielded after it
+    returns.
+
+    Args:
+        prompt: Input text to continue
+        model: nnterp StandardizedTransformer or nnsight LanguageModel
+        max_new_tokens: Number of tokens to generate (default: 20)
+        k: Number of top predictions to track per layer/position (default: 5)
+        layers: Specific layer indices to analyze (default: all layers)
+        remote: Use NDIF remote execution (default: True)
+        stop_at_eos: Stop after the tokenizer's EOS token (default: True)
+        lens_head: Use a folded LensHead; see collect_logit_lens()
+        precision: Lens projection precision; see collect_logit_lens()
+
+    Yields:
+        Partial results in the collect_logit_lens() format covering the
+        part's positions, plus ``positions``: [start, end) and
+        ``generated``: the token string the model chose after the part's
+        last position. merge_logit_lens() combines them into the result
+        for the prompt and all generated tokens but the last.
+
+    Example:
+        >>> parts = []
+        >>> for part in generate_logit_lens("The capital of France is", model,
+        ...                                 max_new_tokens=10, remote=False):
+        ...     parts.append(part)
+        ...     print(part["generated"], end="")
+        >>> data = merge_logit_lens(parts)
+    """
+    token_ids = model.tokenizer.encode(prompt)
+    plan = _projection_plan(model, remote, lens_head, precision)
 
-    # Default: all layers
     if layers is None:
-        layers = list(range(model.num_layers))
-    n_layers = len(layers)
+        layers = list(range(plan.n_layers))
+    eos_id = getattr(model.tokenizer, "eos_token_id", None) if stop_at_eos else None
 
-    # Run model, compute logit lens (computation happens server-side if remote=True)
-    with model.trace(token_ids, remote=remote):
-        all_probs = []
-        all_topk = []
+    if remote:
+        steps = _generate_traced(model, plan, token_ids, layers, k, max_new_tokens, remote)
+    else:
+        steps = _generate_stepwise(model, plan, token_ids, layers, k, max_new_tokens)
+
+    cache = get_vocab_cache(model.tokenizer)
+    start = 0
+    for fed, result, next_id in steps:
+        part = _build_result(model, fed, layers, result)
+        part["positions"] = [start, start + len(fed)]
+        part["generated"] = cache.decode([next_id])[0]
+        yield part
+        if next_id == eos_id:
+            return
+        start += len(fed)
+
+
+def _generate_stepwise(model, plan, token_ids: List[int], layers: List[int], k: int,
+                       max_new_tokens: int) -> Iterator:
+    """
+    Greedy decoding as one local trace per step, with the KV cache carried over.
+
+    Yields:
+        Tuples (fed token ids, flat lens result, next token id)
+    """
+    fed = token_ids
+    past = None
+    n_pos = 0
+    for _ in range(max_new_tokens):
+        n_pos += len(fed)
+        inputs = {
+            "input_ids": torch.tensor([fed]),
+            "attention_mask": torch.ones(1, n_pos, dtype=torch.long),
+        }
+        with torch.no_grad():
+            with model.trace(inputs, remote=False, use_cache=True, past_key_values=past):
+                all_probs, topk = _project_layers(plan, layers, k)
+                tracked, offsets, values = _ragged_trajectories(all_probs, topk)
+                result = {
+                    "topk": topk, "tracked": tracked, "offsets": offsets, "probs": values,
+                }
+                result = result.save()
+                next_id = model.output.logits[0, -1].argmax().save()
+                past = model.output.past_key_values.save()
+        next_id = int(next_id)
+        yield fed, result, next_id
+        fed = [next_id]
+
+
+def _generate_traced(model, plan, token_ids: List[int], layers: List[int], k: int,
+                     max_new_tokens: int, remote: bool) -> List:
+    """
+    Greedy decoding in one ``model.generate``, reducing each step inside it.
+
+    Returns:
+        List of tuples (fed token ids, flat lens result, next token id)
+    """
+    with model.generate(token_ids, max_new_tokens=max_new_tokens, do_sample=False,
+                        remote=remote) as tracer:
+        results = list().save()
+        for _ in tracer.iter[:]:
+            all_probs, topk = _project_layers(plan, layers, k)
+            tracked, offsets, values = _ragged_trajectories(all_probs, topk)
+            results.append({
+                "topk": topk, "tracked": tracked, "offsets": offsets, "probs": values,
+            })
+        output = model.generator.output.save()
+
+    output = output[0].tolist()
+    generated = output[len(token_ids):]
+    fed = [token_ids] + [[t] for t in generated]
+    return list(zip(fed, results, generated))
+
+
+def collect_logit_lens_batch(
+    prompts: List[str],
+    model,
+    k: int = 5,
+    layers: Optional[List[int]] = None,
+    remote: bool = True,
+    token_budget: int = 2048,
+    batch_size: Optional[int] = None,
+    lens_head: bool = False,
+    precision: Optional[str] = None,
+) -> List[Dict]:
+    """
+    Collect logit lens data for many prompts, batching them into shared traces.
+
+    Prompts are tokenized client-side, grouped into micro-batches by length,
+    right-padded with an attention mask, and run through one ``model.trace``
+    per micro-batch. Right padding keeps every real token at its original
+    position, so each prompt's result is the same as a separate
+    ``collect_logit_lens`` call.
+
+    Args:
+        prompts: Input texts to analyze
+        model: nnterp StandardizedTransformer or nnsight LanguageModel
+        k: Number of top predictions to track per layer/position (default: 5)
+        layers: Specific layer indices to analyze (default: all layers)
+        remote: Use NDIF remote execution (default: True)
+        token_budget: Maximum padded tokens (batch size x longest prompt) per
+            micro-batch; used to choose micro-batch sizes automatically.
+            Layers are reduced as they are projected, so the projection
+            holds one layer's [token_budget, vocab] probabilities at a time
+        batch_size: Optional hard cap on prompts per micro-batch
+        lens_head: Use a folded LensHead; see collect_logit_lens()
+        precision: Lens projection precision; see collect_logit_lens()
+
+    Returns:
+        List of dicts, one per prompt in input order, each in the same format
+        as collect_logit_lens()
+
+    Example:
+        >>> results = collect_logit_lens_batch(
+        ...     ["The capital of France is", "The capital of Spain is"], model
+        ... )
+        >>> results[1]["input"][-1]  # ' is'
+    """
+    all_token_ids = [model.tokenizer.encode(prompt) for prompt in prompts]
+    plan = _projection_plan(model, remote, lens_head, precision)
+
+    if layers is None:
+        layers = list(range(plan.n_layers))
 
-        for li in layers:
-            # Project hidden state to vocabulary: hidden -> norm -> lm_head
-            logits = model.lm_head(model.ln_final(model.layers_output[li]))
+    pad_id = getattr(model.tokenizer, "pad_token_id", None)
+    if pad_id is None:
+        pad_id = 0
+
+    results: List[Optional[Dict]] = [None] * len(prompts)
+    lengths = [len(ids) for ids in all_token_ids]
+    for batch in _plan_micro_batches(lengths, token_budget, batch_size):
+        batch_ids = [all_token_ids[i] for i in batch]
+        batch_lengths = [lengths[i] for i in batch]
+        width = max(batch_lengths)
+
+        # Right-pad so real tokens keep their positions; the mask hides padding
+        input_ids = torch.tensor(
+            [ids + [pad_id] * (width - len(ids)) for ids in batch_ids]
+        )
+        attention_mask = torch.tensor(
+            [[1] * n + [0] * (width - n) for n in batch_lengths]
+        )
+
+        with model.trace(
+            {"input_ids": input_ids, "attention_mask": attention_mask},
+            remote=remote,
+        ):
+            with torch.no_grad():
+                batch_results = _reduce_batch(plan, layers, batch_lengths, k).save()
+
+        for i, result in zip(batch, batch_results):
+            results[i] = _build_result(model, all_token_ids[i], layers, result)
+
+    return results
+
+
+def decode_tracked_tokens(data: Dict, tokenizer) -> Dict[int, List[str]]:
+    """
+    Decode tracked token indices to strings.
+
+    Args:
+        data: Data from a collection function, with per-position token
+            indices under ``tracked`` (or legacy ``tracked_indices``)
+        tokenizer: Model tokenizer
+
+    Returns:
+        Dict mapping position index to list of token strings
+
+    Example:
+        >>> decoded = decode_tracked_tokens(data, model.tokenizer)
+        >>> decoded[0]  # [' the', ' a', ' an']
+    """
+    tracked = data["tracked"] if "tracked" in data else data["tracked_indices"]
+    cache = get_vocab_cache(tokenizer)
+    return {pos: cache.decode(ids.tolist()) for pos, ids in enumerate(tracked)}
+
+
+def _projection_plan(model, remote: bool, lens_head: bool, precision: Optional[str] = None):
+    """The model's ModelPlan, or its folded LensHead when requested."""
+    _check_projection(remote, lens_head, precision)
+    if remote:
+        _register_remote()
+    if not lens_head and precision is None:
+        return get_model_plan(model)
+    from .lens import get_lens_head
+    return get_lens_head(model, precision)
+
+
+def _check_projection(remote: bool, lens_head: bool, precision: Optional[str]):
+    """Reject projection options that cannot run remotely."""
+    if remote and (lens_head or precision is not None):
+        raise ValueError(
+            "lens_head and precision need remote=False: the folded head is client-side"
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _register_remote():
+    """
+    Send logitlenskit by value in remote requests.
+
+    Remote trace bodies call this package's helpers (ModelPlan accessors,
+    projection and reduction functions, profiling timers). NDIF does not
+    have logitlenskit installed, so they are serialized as source rather
+    than as references to an importable module.
+    """
+    from nnsight.ndif import register
+    register(sys.modules[__package__])
+
+
+def _plan_micro_batches(
+    lengths: List[int],
+    token_budget: int,
+    batch_size: Optional[int] = None,
+) -> List[List[int]]:
+    """
+    Group prompt indices into micro-batches that fit a padded-token budget.
+
+    Prompts are sorted longest first so that each batch pads to a similar
+    length. A batch grows until adding the next prompt would push
+    ``len(batch) * max_length`` over ``token_budget`` (or exceed
+    ``batch_size``). A prompt longer than the budget runs on its own.
+
+    Args:
+        lengths: Token count of each prompt
+        token_budget: Maximum padded tokens per micro-batch
+        batch_size: Optional hard cap on prompts per micro-batch
+
+    Returns:
+        List of batches, each a list of indices into ``lengths``
+    """
+    order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+    batches: List[List[int]] = []
+    current: List[int] = []
+    for i in order:
+        # Sorted descending, so the first prompt sets the padded width
+        width = lengths[current[0]] if current else lengths[i]
+        full = batch_size is not None and len(current) >= batch_size
+        if current and (full or (len(current) + 1) * width > token_budget):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _reduce_batch(plan: ModelPlan, layers: List[int], lengths: List[int], k: int) -> List[Dict]:
+    """
+    Project a right-padded batch layer by layer; one flat result per prompt.
+
+    Each layer's [batch, width, vocab] probabilities are reduced to top-k
+    indices and a log-normalizer right after the log-softmax, so only one
+    layer's probabilities exist at a time. Tracked-token probabilities are
+    then computed from the kept normalized hidden states, as dot products
+    with the unembedding rows (in chunks of about one layer's probabilities),
+    or by projecting each prompt's layers again where the unembedding is not
+    available.
+
+    Must be called inside a ``model.trace`` context.
+
+    Args:
+        plan: ModelPlan of the traced model
+        layers: Layer indices to project
+        lengths: Unpadded length of each prompt in the batch
+        k: Number of top predictions per layer/position
+
+    Returns:
+        List of dicts with topk, tracked, offsets and probs (ragged values)
+    """
+    normed, lse, topk = [], [], []
+    for li in layers:
+        hidden = plan.norm(plan.layer_output(li))
+        logits = plan.lm_head(hidden)
+        # log_softmax ranks like softmax, and gives the normalizer for free
+        log_probs = torch.log_softmax(logits, dim=-1)
+        topk.append(log_probs.topk(k, dim=-1).indices.to(torch.int32))
+        lse.append((logits[..., 0] - log_probs[..., 0]).float())
+        normed.append(hidden)
+        vocab_size, dtype = log_probs.shape[-1], log_probs.dtype
+        layer_bytes = log_probs.numel() * log_probs.element_size()
+        del logits, log_probs  # Before the next layer's projection
+
+    try:
+        weight, bias = plan.unembedding()
+    except ValueError:
+        weight = bias = None
+
+    results = []
+    for b, n in enumerate(lengths):
+        prompt_topk = torch.stack([t[b, :n] for t in topk])
+        pos_index, token_index, offsets = _ragged_unique(prompt_topk, vocab_size)
+        if weight is not None:
+            values = _tracked_probs(
+                torch.stack([h[b, :n] for h in normed]).to(weight.dtype), weight, bias,
+                torch.stack([s[b, :n] for s in lse]), pos_index, token_index, layer_bytes,
+            )
+        else:
+            values = torch.stack([
+                torch.softmax(plan.lm_head(h[b:b + 1, :n]), dim=-1)[0, pos_index, token_index]
+                for h in normed
+            ])
+        results.append({
+            "topk": prompt_topk, "tracked": token_index.to(torch.int32),
+            "offsets": offsets, "probs": values.to(dtype),
+        })
+    return results
+
+
+def _collect_incremental(model, plan, token_ids: List[int], layers: List[int], k: int,
+                         fused: bool, memory_budget: Optional[int],
+                         prefix_cache: "PrefixCache", config) -> Dict:
+    """
+    collect_logit_lens() body for prefix-cached runs.
+
+    Reuses the cached entry sharing the longest prefix: its per-position
+    results are copied, and the model runs on the remaining tokens with a
+    copy of its KV cache (and a full-length attention mask, so positions
+    continue from the prefix). The combined result and the extended KV
+    cache are stored for later prompts.
+    """
+    length, entry = prefix_cache.lookup(config, token_ids)
+    if length == len(token_ids):
+        result = _slice_positions(entry.result, length)
+        return _build_result(model, token_ids, layers, result)
+
+    past = prefix_cache.past_key_values(entry, length) if entry is not None else None
+    inputs = {
+        "input_ids": torch.tensor([token_ids[length:]]),
+        "attention_mask": torch.ones(1, len(token_ids), dtype=torch.long),
+    }
+    # No autograd graph: results and the KV cache are kept across calls. The
+    # outer no_grad covers the model's forward pass; the trace body runs its
+    # module calls outside it, so the projection needs its own
+    with torch.no_grad():
+        with model.trace(inputs, remote=False, use_cache=True, past_key_values=past):
+            with torch.no_grad():
+                if fused or memory_budget is not None:
+                    hidden = torch.stack([plan.layer_output(li)[0] for li in layers])
+                    result = _reduce_stacked(plan, hidden, k, memory_budget)
+                else:
+                    all_probs, topk = _project_layers(plan, layers, k)
+                    tracked, offsets, values = _ragged_trajectories(all_probs, topk)
+                    result = {
+                        "topk": topk, "tracked": tracked, "offsets": offsets,
+                        "probs": values,
+                    }
+                result = result.save()
+                past = model.output.past_key_values.save()
+
+    if entry is not None:
+        result = _concat_positions(_slice_positions(entry.result, length), result)
+    prefix_cache.insert(config, token_ids, past, result)
+    return _build_result(model, token_ids, layers, result)
+
+
+def _slice_positions(result: Dict, n_pos: int) -> Dict:
+    """The first ``n_pos`` positions of a flat result (views)."""
+    end = int(result["offsets"][n_pos])
+    return {
+        "topk": result["topk"][:, :n_pos],
+        "tracked": result["tracked"][:end],
+        "offsets": result["offsets"][:n_pos + 1],
+        "probs": result["probs"][:, :end],
+    }
+
+
+def _concat_positions(first: Dict, second: Dict) -> Dict:
+    """Concatenate two flat results along positions (copies)."""
+    return {
+        "topk": torch.cat([first["topk"], second["topk"]], dim=1),
+        "tracked": torch.cat([first["tracked"], second["tracked"]]),
+        "offsets": torch.cat([first["offsets"], second["offsets"][1:] + first["offsets"][-1]]),
+        "probs": torch.cat([first["probs"], second["probs"].to(first["probs"].dtype)], dim=1),
+    }
+
+
+def _resolve_positions(positions, n_pos: int) -> Optional[List[int]]:
+    """
+    Normalize a ``positions`` argument to sorted, unique, non-negative indices.
+
+    Args:
+        positions: None, an index, a slice, a sequence of indices or a
+            boolean mask of length ``n_pos``
+        n_pos: Number of prompt tokens
+
+    Returns:
+        List of indices, or None for all positions
+    """
+    if positions is None:
+        return None
+    if isinstance(positions, slice):
+        return list(range(n_pos))[positions] or _no_positions()
+    if isinstance(positions, torch.Tensor):
+        positions = positions.tolist()
+    # numpy scalars and arrays arrive here too: np.bool_ is not a bool and
+    # np.int64 is not JSON serializable, so normalize through one array
+    positions = np.asarray(positions).reshape(-1)
+    if positions.size == 0:
+        _no_positions()
+    if positions.dtype == bool:
+        if len(positions) != n_pos:
+            raise ValueError(
+                f"Boolean positions mask has length {len(positions)}; prompt has {n_pos} tokens"
+            )
+        positions = np.flatnonzero(positions)
+    elif not np.issubdtype(positions.dtype, np.integer):
+        raise ValueError(f"positions must be integers or a boolean mask, got {positions.dtype}")
+
+    resolved = set()
+    for p in positions.tolist():
+        if not -n_pos <= p < n_pos:
+            raise ValueError(f"Position {p} is out of range for a {n_pos}-token prompt")
+        resolved.add(p % n_pos)
+    return sorted(resolved) or _no_positions()
+
+
+def _no_positions():
+    raise ValueError("positions selects no tokens")
+
+
+def _position_index(selected: Optional[List[int]], n_pos: int):
+    """
+    Index for selecting positions from a [batch, n_pos, d_model] hidden state.
+
+    A contiguous run becomes a slice (a view; no gather), anything else an
+    index tensor. Returns None when every position is selected.
+    """
+    if selected is None or len(selected) == n_pos:
+        return None
+    if selected[-1] - selected[0] + 1 == len(selected):
+        return slice(selected[0], selected[-1] + 1)
+    return torch.tensor(selected, dtype=torch.long)
+
+
+def _hidden(plan: ModelPlan, layer: int, select=None):
+    """Hidden state after ``layer``, restricted to the ``select`` positions."""
+    hidden = plan.layer_output(layer)
+    if select is not None:
+        hidden = hidden[:, select]
+    return hidden
+
+
+def _expand_positions(result: Dict, selected: List[int], n_pos: int) -> Dict:
+    """
+    Place a position-selective result back on the full prompt.
+
+    ``topk`` gets -1 rows at unselected positions and ``offsets`` gets empty
+    ranges there; ``tracked`` and ``probs`` are unchanged, since selected
+    positions are in prompt order.
+    """
+    topk = result["topk"]
+    index = torch.tensor(selected, dtype=torch.long)
+    full_topk = topk.new_full((topk.shape[0], n_pos, topk.shape[2]), -1)
+    full_topk[:, index] = topk
+
+    counts = result["offsets"].diff()
+    full_counts = counts.new_zeros(n_pos)
+    full_counts[index] = counts
+    offsets = torch.cat([full_counts.new_zeros(1), full_counts.cumsum(0)])
+    return {**result, "topk": full_topk, "offsets": offsets}
+
+
+def _project_layers(plan: ModelPlan, layers: List[int], k: int, select=None,
+                    prof: Optional[Profile] = None):
+    """
+    Project each selected layer's hidden state to vocabulary probabilities.
+
+    Must be called inside a ``model.trace`` context.
+
+    Args:
+        plan: ModelPlan of the traced model
+        layers: Layer indices to project
+        k: Number of top predictions per layer/position
+        select: Optional position index from ``_position_index``
+        prof: Optional Profile for forward/projection/topk timings (local)
+
+    Returns:
+        Tuple (all_probs, topk): per-layer Tensor[n_pos, vocab] probabilities
+        and Tensor[int32] top-k indices of shape [n_layers, n_pos, k]
+    """
+    all_probs = []
+    all_topk = []
+    for li in layers:
+        # Project hidden state to vocabulary: hidden -> norm -> lm_head
+        with timed(prof, "forward"):
+            hidden = _hidden(plan, li, select)
+        with timed(prof, "projection"):
+            logits = plan.lm_head(plan.norm(hidden))
             probs = torch.softmax(logits[0], dim=-1)
-            all_probs.append(probs)
+        all_probs.append(probs)
+        with timed(prof, "topk"):
             all_topk.append(probs.topk(k, dim=-1).indices)
 
-        # Stack top-k indices: [n_layers, n_pos, k]
-        topk = torch.stack(all_topk).to(torch.int32)
-
-        # For each position: find unique tokens across all layers, extract trajectories
-        tracked = []
-        probs_out = []
-        for pos in range(n_pos):
-            # Union of all tokens appearing in top-k at any layer for this position
-            unique = torch.unique(topk[:, pos, :].flatten()).to(torch.int32)
-            # Extract probability trajectory for each unique token
-            traj = torch.stack([all_probs[li][pos, unique] for li in range(n_layers)])
-            tracked.append(unique)
-            probs_out.append(traj)
-
-        # Save results to transmit from server
-        result = {"topk": topk, "tracked": tracked, "probs": probs_out}.save()
-
-    # Build vocabulary map (client-side, only for tracked tokens)
-    all_ids = set(result["topk"].flatten().tolist())
-    for t in result["tracked"]:
-        all_ids.update(t.tolist())
-    vocab = {i: model.tokenizer.decode([i]) for i in all_ids}
-
-    # Get model name
-    model_name = getattr(model.config, '_name_or_path',
-                         getattr(model.config, 'name_or_path', 'unknown'))
+    # Stack top-k indices: [n_layers, n_pos, k]
+    return all_probs, torch.stack(all_topk).to(torch.int32)
+
+
+def _reduce_stacked(plan: ModelPlan, hidden, k: int,
+                    memory_budget: Optional[int] = None,
+                    prof: Optional[Profile] = None) -> Dict:
+    """
+    Project stacked hidden states and reduce to top-k and ragged trajectories.
+
+    Args:
+        plan: ModelPlan of the traced model
+        hidden: Tensor[n_layers, n_pos, d_model] of hidden states
+        k: Number of top predictions per layer/position
+        memory_budget: If set, stream over the vocabulary (see
+            ``_streaming_lens``); otherwise project in one fused pass
+        prof: Optional Profile for projection/topk/gather timings (local)
+
+    Returns:
+        Dict with topk, tracked, offsets and probs (ragged values)
+    """
+    if memory_budget is not None:
+        with timed(prof, "projection"):
+            topk, tracked, offsets, values = _streaming_lens(plan, hidden, k, memory_budget)
+    else:
+        # One projection over all layers: [n_layers, n_pos, vocab]
+        with timed(prof, "projection"):
+            all_probs = _project_stacked(plan, hidden)
+        with timed(prof, "topk"):
+            topk = all_probs.topk(k, dim=-1).indices.to(torch.int32)
+        with timed(prof, "unique_gather"):
+            tracked, offsets, values = _ragged_trajectories(all_probs, topk)
+    return {"topk": topk, "tracked": tracked, "offsets": offsets, "probs": values}
+
+
+def _project_stacked(plan: ModelPlan, hidden):
+    """
+    Project stacked hidden states to probabilities in a single pass.
+
+    Args:
+        plan: ModelPlan of the traced model
+        hidden: Tensor[n_layers, n_pos, d_model] of hidden states
+
+    Returns:
+        Tensor[n_layers, n_pos, vocab] of probabilities
+    """
+    n_layers, n_pos, d_model = hidden.shape
+    logits = plan.lm_head(plan.norm(hidden.reshape(n_layers * n_pos, d_model)))
+    return torch.softmax(logits, dim=-1).reshape(n_layers, n_pos, -1)
+
+
+def _adaptive_reduce(plan: ModelPlan, hidden, k: int, stride: int, tolerance: float,
+                     budget: Optional[int]) -> Dict:
+    """
+    Project a coarse stride of layers, then refine gaps where predictions change.
+
+    Gaps between adjacent computed layers are kept in a heap ordered by how
+    much the predictions change across them: positions whose top-1 token
+    differs, then the largest probability change among either end's top-k
+    tokens. The most-changed gap is split at its midpoint until no gap has a
+    top-1 change or a change above ``tolerance``, or ``budget`` layers are
+    computed. Reordering in the low-probability tail of the top-k alone does
+    not trigger refinement.
+
+    Must be called inside a ``model.trace`` context.
+
+    Args:
+        plan: ModelPlan of the traced model
+        hidden: Tensor[n_candidates, n_pos, d_model] of candidate layer states
+        k: Number of top predictions per layer/position
+        stride: Coarse stride over candidates
+        tolerance: Probability change that triggers refinement
+        budget: Maximum number of layers to project, or None
+
+    Returns:
+        Dict with topk, tracked, offsets and probs over the computed layers,
+        plus ``layers``: Tensor[int64] of computed candidate indices (sorted)
+    """
+    n = hidden.shape[0]
+    probs = {}
+    topk = {}
+
+    def project(i):
+        probs[i] = torch.softmax(plan.lm_head(plan.norm(hidden[i])), dim=-1)
+        topk[i] = probs[i].topk(k, dim=-1).indices
+
+    def change(a, b):
+        top1_changes = int((topk[a][:, 0] != topk[b][:, 0]).sum())
+        tokens = torch.cat([topk[a], topk[b]], dim=-1)
+        delta = (probs[a].gather(-1, tokens) - probs[b].gather(-1, tokens)).abs().max()
+        return top1_changes, float(delta.detach())
+
+    def push(a, b):
+        if b - a > 1:
+            top1_changes, delta = change(a, b)
+            if top1_changes or delta > tolerance:
+                heapq.heappush(gaps, (-top1_changes, -delta, a, b))
+
+    coarse = sorted(set(range(0, n, stride)) | {n - 1})
+    for i in coarse:
+        project(i)
+    gaps = []
+    for a, b in zip(coarse[:-1], coarse[1:]):
+        push(a, b)
+
+    while gaps and (budget is None or len(probs) < budget):
+        _, _, a, b = heapq.heappop(gaps)
+        mid = (a + b) // 2
+        project(mid)
+        push(a, mid)
+        push(mid, b)
+
+    computed = sorted(probs)
+    all_probs = []
+    all_topk = []
+    for i in computed:
+        all_probs.append(probs[i])
+        all_topk.append(topk[i])
+    stacked_topk = torch.stack(all_topk).to(torch.int32)
+    tracked, offsets, values = _ragged_trajectories(all_probs, stacked_topk)
+    return {
+        "topk": stacked_topk, "tracked": tracked, "offsets": offsets, "probs": values,
+        "layers": torch.tensor(computed, dtype=torch.long),
+    }
+
+
+def _ragged_trajectories(all_probs, topk):
+    """
+    Find tokens in the top-k at any layer and gather their trajectories.
+
+    Vectorized over positions: one ``torch.unique`` over (position, token)
+    keys and one gather per layer, instead of a unique and a stack per
+    position. Results are ragged: position ``p`` owns the slice
+    ``offsets[p]:offsets[p + 1]`` of ``tracked`` and of the last dim of
+    ``values``. Use ``split_ragged`` to recover per-position lists.
+
+    Args:
+        all_probs: List of Tensor[n_pos, vocab] probabilities, one per layer,
+            or a stacked Tensor[n_layers, n_pos, vocab]
+        topk: Tensor[int32] of shape [n_layers, n_pos, k]
+
+    Returns:
+        Tuple (tracked, offsets, values):
+            tracked: Tensor[int32] [n_tracked_total], sorted within a position
+            offsets: Tensor[int64] [n_pos + 1]
+            values: Tensor [n_layers, n_tracked_total] trajectories
+    """
+    pos_index, token_index, offsets = _ragged_unique(topk, all_probs[0].shape[-1])
+    if isinstance(all_probs, torch.Tensor):
+        values = all_probs[:, pos_index, token_index]
+    else:
+        values = torch.stack([probs[pos_index, token_index] for probs in all_probs])
+    return token_index.to(torch.int32), offsets, values
+
+
+def _ragged_unique(topk, vocab_size: int):
+    """
+    Unique (position, token) pairs of a top-k tensor, grouped by position.
+
+    Args:
+        topk: Tensor of shape [n_layers, n_pos, k] of token indices
+        vocab_size: Vocabulary size (used to key pairs as pos * vocab + token)
+
+    Returns:
+        Tuple (pos_index, token_index, offsets): int64 tensors where pairs are
+        sorted by position then token, and position ``p`` owns the slice
+        ``offsets[p]:offsets[p + 1]``
+    """
+    n_pos = topk.shape[1]
+    positions = torch.arange(n_pos, device=topk.device).view(1, n_pos, 1)
+    keys = torch.unique((positions * vocab_size + topk.long()).flatten())
+    pos_index = keys // vocab_size
+    token_index = keys % vocab_size
+
+    counts = torch.bincount(pos_index, minlength=n_pos)
+    offsets = torch.cat([counts.new_zeros(1), counts.cumsum(0)])
+    return pos_index, token_index, offsets
+
+
+def _streaming_lens(plan: ModelPlan, hidden, k: int, memory_budget: int):
+    """
+    Memory-bounded logit lens: stream over lm_head in vocabulary chunks.
+
+    Normalizes all layers once, then for each chunk of unembedding rows
+    computes chunk logits, folds them into a running logsumexp and merges a
+    running top-k. Tracked-token probabilities are computed afterwards from
+    the stored normalizers, so no [n_layers, n_pos, vocab] tensor is ever
+    materialized. Peak working memory is about ``memory_budget`` bytes (plus
+    a minimum of one k-wide chunk).
+
+    Must be called inside a ``model.trace`` context.
+
+    Args:
+        plan: ModelPlan of the traced model
+        hidden: Tensor[n_layers, n_pos, d_model] of hidden states
+        k: Number of top predictions per layer/position
+        memory_budget: Approximate working-memory bound in bytes
+
+    Returns:
+        Tuple (topk, tracked, offsets, values) as from ``_ragged_trajectories``,
+        with float32 values
+    """
+    # A graph would keep every chunk's logits alive, defeating the budget.
+    # Entered here, inside the trace body, where callers' no_grad may not reach
+    with torch.no_grad():
+        n_layers, n_pos, d_model = hidden.shape
+        n_rows = n_layers * n_pos
+        weight, bias = plan.unembedding()
+        # Match the unembedding's dtype: LensHead.norm returns float32 even for
+        # bf16/fp16 folded matrices, and a reduced-precision model's weights may
+        # differ from its activations
+        normed = plan.norm(hidden.reshape(n_rows, d_model)).to(weight.dtype).detach()
+        vocab_size = weight.shape[0]
+
+        # float32 logits, plus exp/topk temporaries, for each vocab column
+        chunk = max(k, min(vocab_size, memory_budget // (n_rows * 4 * 3)))
+
+        lse = torch.full((n_rows,), float("-inf"), device=normed.device)
+        top_vals = torch.empty((n_rows, 0), device=normed.device)
+        top_idx = torch.empty((n_rows, 0), dtype=torch.long, device=normed.device)
+        for start in range(0, vocab_size, chunk):
+            logits = normed @ weight[start:start + chunk].T
+            if bias is not None:
+                logits = logits + bias[start:start + chunk]
+            logits = logits.float()
+            lse = torch.logaddexp(lse, torch.logsumexp(logits, dim=-1))
+
+            vals, idx = logits.topk(min(k, logits.shape[-1]), dim=-1)
+            top_vals = torch.cat([top_vals, vals], dim=-1)
+            top_idx = torch.cat([top_idx, idx + start], dim=-1)
+            top_vals, keep = top_vals.topk(min(k, top_vals.shape[-1]), dim=-1)
+            top_idx = top_idx.gather(-1, keep)
+
+        topk = top_idx.reshape(n_layers, n_pos, -1).to(torch.int32)
+        pos_index, token_index, offsets = _ragged_unique(topk, vocab_size)
+
+        values = _tracked_probs(
+            normed.reshape(n_layers, n_pos, d_model), weight, bias,
+            lse.reshape(n_layers, n_pos), pos_index, token_index, memory_budget,
+        )
+        return topk, token_index.to(torch.int32), offsets, values
+
+
+def _tracked_probs(normed, weight, bias, lse, pos_index, token_index, memory_budget: int):
+    """
+    Tracked-token probabilities exp(h . w_token + b - logsumexp), in chunks.
+
+    Args:
+        normed: Tensor[n_layers, n_pos, d_model] of normalized hidden states,
+            in the unembedding's dtype
+        weight: Unembedding [vocab, d_model]
+        bias: Optional unembedding bias [vocab]
+        lse: Tensor[n_layers, n_pos] of float32 log-normalizers
+        pos_index: Positions of the tracked pairs, from ``_ragged_unique``
+        token_index: Tokens of the tracked pairs, from ``_ragged_unique``
+        memory_budget: Approximate working-memory bound in bytes
+
+    Returns:
+        Tensor[float32] of shape [n_layers, n_tracked]
+    """
+    n_layers, _, d_model = normed.shape
+    step = max(1, memory_budget // (n_layers * d_model * normed.element_size() * 2))
+    values = []
+    for start in range(0, pos_index.shape[0], step):
+        pos = pos_index[start:start + step]
+        tok = token_index[start:start + step]
+        logits = (normed[:, pos, :] * weight[tok]).sum(dim=-1)
+        if bias is not None:
+            logits = logits + bias[tok]
+        values.append(torch.exp(logits.float() - lse[:, pos]))
+    return torch.cat(values, dim=-1) if values else lse.new_zeros((n_layers, 0))
+
+
+def _attach_profile(data: Dict, prof: Optional[Profile]) -> Dict:
+    """Add ``profile`` to a result when profiling."""
+    if prof is not None:
+        data["profile"] = prof
+    return data
+
+
+def _model_name(model) -> str:
+    """Get the model name/path from its config."""
+    return getattr(model.config, '_name_or_path',
+                   getattr(model.config, 'name_or_path', 'unknown'))
+
+
+def _build_result(model, token_ids: List[int], layers: List[int], result: Dict,
+                  prof: Optional[Profile] = None) -> Dict:
+    """
+    Assemble the public result dict from saved trace outputs.
+
+    Splits the ragged tracked/probs tensors into per-position lists and
+    decodes the vocabulary client-side, only for tokens that were tracked,
+    through the tokenizer's shared VocabCache.
+    """
+    with timed(prof, "split"):
+        tracked, probs = split_ragged(result["tracked"], result["probs"], result["offsets"])
+
+    with timed(prof, "vocab_decode"):
+        all_ids = set(result["topk"].flatten().tolist())
+        all_ids.discard(-1)  # unselected positions
+        all_ids.update(result["tracked"].tolist())
+        cache = get_vocab_cache(model.tokenizer)
+        vocab = cache.decode_map(all_ids)
+        input_tokens = cache.decode(token_ids)
 
     return {
-        "model": model_name,
-        "input": [model.tokenizer.decode([t]) for t in token_ids],
+        "model": _model_name(model),
+        "input": input_tokens,
         "layers": layers,
         "topk": result["topk"],
-        "tracked": result["tracked"],
-        "probs": result["probs"],
+        "tracked": tracked,
+        "probs": probs,
         "vocab": vocab,
     }
@@ -4,14 +4,39 @@ Jupyter display utilities for logit lens visualization.
 Provides zero-install HTML output - no ipywidgets required.
 """
 
+import base64
+import functools
+import io
 import json
-from typing import Dict, Optional, Union
+import os
+import sys
+import zlib
+from typing import Dict, Iterator, Optional, Union
+
+import numpy as np
 from IPython.display import HTML, display
 
+from .profiling import timed
+from .utils import _to_numpy
+
 
-# The LogitLensWidget JavaScript code will be embedded here
+# Minified widget shipped with the package (js/: npm run build:python),
+# inlined into the first widget of each kernel session
+_WIDGET_JS_PATH = os.path.join(os.path.dirname(__file__), "static", "logit-lens-widget.min.js")
+
+# Fallback for widgets whose page lost the inlined script (cleared output)
 _WIDGET_JS_URL = "https://davidbau.github.io/logitlenskit/js/dist/logit-lens-widget.min.js"
 
+_widget_js_injected = False
+
+# Widget JSON at least this large is embedded compressed (show_logit_lens)
+COMPRESS_MIN_BYTES = 64 * 1024
+
+# Decoder for compressed data, inlined like the widget script: once per session
+_INFLATE_JS_PATH = os.path.join(os.path.dirname(__file__), "static", "inflate.js")
+
+_inflate_js_injected = False
+
 
 def to_js_format(data: Dict) -> Dict:
     """
@@ -29,25 +54,33 @@ def to_js_format(data: Dict) -> Dict:
         >>> js_data = to_js_format(data)
         >>> json.dumps(js_data)  # Ready for JavaScript
     """
+    with timed(data.get("profile"), "to_js_format"):
+        return _to_js_format(data)
+
+
+def _to_js_format(data: Dict) -> Dict:
     vocab = data["vocab"]
-    n_layers = len(data["layers"])
-    n_pos = len(data["input"])
 
     # topk: [n_layers, n_pos, k] indices -> [n_layers][n_pos] string lists
-    topk_js = [
-        [[vocab[idx.item()] for idx in data["topk"][li, pos]]
-         for pos in range(n_pos)]
-        for li in range(n_layers)
-    ]
-
-    # tracked/probs: parallel arrays -> {token: trajectory} dicts per position
-    tracked_js = [
-        {
-            vocab[idx.item()]: [round(p, 5) for p in data["probs"][pos][:, i].tolist()]
-            for i, idx in enumerate(data["tracked"][pos])
-        }
-        for pos in range(n_pos)
-    ]
+    topk_js = _lookup_tokens(_to_numpy(data["topk"]), vocab)
+
+    # tracked/probs: parallel arrays -> {token: trajectory} dicts per position.
+    # Round and convert all positions at once, then slice per position.
+    counts = [len(t) for t in data["tracked"]]
+    if sum(counts):
+        ids = np.concatenate([_to_numpy(t) for t in data["tracked"]]).tolist()
+        probs = np.concatenate([_to_numpy(p) for p in data["probs"]], axis=1)
+        trajectories = _round_half_even(probs, 5).T.tolist()
+    else:
+        ids, trajectories = [], []
+    tracked_js = []
+    start = 0
+    for count in counts:
+        tracked_js.append({
+            vocab[i]: traj
+            for i, traj in zip(ids[start:start + count], trajectories[start:start + count])
+        })
+        start += count
 
     return {
         "meta": {"version": 2, "model": data["model"]},
@@ -58,6 +91,147 @@ def to_js_format(data: Dict) -> Dict:
     }
 
 
+def write_logit_lens(
+    data: Dict,
+    fp,
+    format: str = "json",
+    var_name: str = "PREVIEW_DATA",
+) -> int:
+    """
+    Stream logit lens data to a file or socket as compact V2 JSON or JSONP.
+
+    The document is written piece by piece: header fields first, then one
+    ``topk`` layer at a time and one ``tracked`` position at a time, so
+    memory stays bounded by a single layer or position instead of the whole
+    V2 structure. The output equals
+    ``json.dumps(to_js_format(data), separators=(",", ":"))``, wrapped as
+    ``var PREVIEW_DATA = ...;`` for ``format="jsonp"`` (as in preview_data.js).
+
+    Args:
+        data: Data from collect_logit_lens() (Python format) or
+              already converted to_js_format() (JavaScript V2 format)
+        fp: Path, text file object, or binary file object (e.g. a socket's
+            ``makefile("wb")``); binary targets receive UTF-8
+        format: "json" or "jsonp" (default: "json")
+        var_name: JavaScript variable name for the JSONP wrapper
+
+    Returns:
+        Number of UTF-8 bytes written
+
+    Example:
+        >>> write_logit_lens(data, "preview_data.js", format="jsonp")
+    """
+    if format not in ("json", "jsonp"):
+        raise ValueError(f"Unknown format: {format}. Expected 'json' or 'jsonp'.")
+
+    if isinstance(fp, (str, os.PathLike)):
+        with open(fp, "w", encoding="utf-8") as f:
+            return write_logit_lens(data, f, format=format, var_name=var_name)
+
+    prof = data.get("profile")
+    with timed(prof, "write"):
+        written = _write_logit_lens(data, fp, format, var_name)
+    if prof is not None:
+        prof.add_bytes("json", written)
+    return written
+
+
+def _write_logit_lens(data: Dict, fp, format: str, var_name: str) -> int:
+    if _is_python_format(data):
+        meta = {"version": 2, "model": data["model"]}
+        topk_rows = _iter_topk_js(data)
+        tracked_rows = _iter_tracked_js(data)
+    elif _is_js_format(data):
+        meta = data["meta"]
+        topk_rows = iter(data["topk"])
+        tracked_rows = iter(data["tracked"])
+    else:
+        raise ValueError(
+            "Unrecognized data format. Expected output from collect_logit_lens() "
+            "or to_js_format()."
+        )
+
+    text = isinstance(fp, io.TextIOBase)
+    written = 0
+
+    def emit(chunk: str):
+        nonlocal written
+        encoded = chunk.encode("utf-8")
+        fp.write(chunk if text else encoded)
+        written += len(encoded)
+
+    def dumps(obj) -> str:
+        return json.dumps(obj, separators=(",", ":"))
+
+    if format == "jsonp":
+        emit(f"var {var_name} = ")
+    emit('{"meta":' + dumps(meta) + ',"input":' + dumps(data["input"])
+         + ',"layers":' + dumps(data["layers"]) + ',"topk":[')
+    for i, row in enumerate(topk_rows):
+        emit(("," if i else "") + dumps(row))
+    emit('],"tracked":[')
+    for i, row in enumerate(tracked_rows):
+        emit(("," if i else "") + dumps(row))
+    emit("]}")
+    if format == "jsonp":
+        emit(";\n")
+    return written
+
+
+def _iter_topk_js(data: Dict) -> Iterator[list]:
+    """Yield V2 ``topk`` rows (one layer's [n_pos] string lists) one at a time."""
+    for li in range(data["topk"].shape[0]):
+        yield _lookup_tokens(_to_numpy(data["topk"][li:li + 1]), data["vocab"])[0]
+
+
+def _iter_tracked_js(data: Dict) -> Iterator[Dict]:
+    """Yield V2 ``tracked`` dicts (one position's token -> trajectory) one at a time."""
+    vocab = data["vocab"]
+    for ids, probs in zip(data["tracked"], data["probs"]):
+        trajectories = _round_half_even(_to_numpy(probs), 5).T.tolist()
+        yield {vocab[i]: traj for i, traj in zip(_to_numpy(ids).tolist(), trajectories)}
+
+
+def _lookup_tokens(topk: np.ndarray, vocab: Dict) -> list:
+    """
+    Map a [n_layers, n_pos, k] index array to nested lists of token strings.
+
+    Looks each distinct index up once and fans the strings out with a single
+    fancy index. Negative indices pad cells shorter than k and are dropped.
+    """
+    unique, inverse = np.unique(topk, return_inverse=True)
+    table = np.array(
+        [vocab[i] if i >= 0 else None for i in unique.tolist()], dtype=object
+    )
+    strings = table[inverse.reshape(topk.shape)].tolist()
+    if unique.size and unique[0] < 0:
+        strings = [[[t for t in cell if t is not None] for cell in layer]
+                   for layer in strings]
+    return strings
+
+
+def _round_half_even(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    Vectorized equivalent of Python's ``round(float(v), ndigits)``.
+
+    For float32 (or narrower) input, ``v * 10**ndigits`` is exact in float64
+    for the 5 digits used here, so ``rint`` makes the same half-to-even
+    decision as ``round`` and the division gives the same nearest double.
+    For wider input, values within rounding error of a tie fall back to
+    ``round`` element by element.
+    """
+    scale = 10.0 ** ndigits
+    wide = values.dtype.itemsize > 4
+    values = values.astype(np.float64)
+    scaled = values * scale
+    result = np.rint(scaled) / scale
+    if wide:
+        frac = np.abs(scaled - np.floor(scaled) - 0.5)
+        for i in np.flatnonzero(frac <= 4 * np.spacing(scaled)):
+            result.flat[i] = round(float(values.flat[i]), ndigits)
+    return result
+
+
 def _is_js_format(data: Dict) -> bool:
     """Check if data is already in JavaScript V2 format."""
     return "meta" in data and "tracked" in data and isinstance(data["tracked"][0], dict)
@@ -72,18 +246,35 @@ def show_logit_lens(
     data: Dict,
     title: Optional[str] = None,
     container_id: Optional[str] = None,
+    inline_js: Optional[bool] = None,
+    compress: Optional[bool] = None,
 ) -> HTML:
     """
     Display interactive logit lens visualization in Jupyter.
 
     This generates self-contained HTML that works without any widget
-    installation. The visualization is fully interactive.
+    installation or network access. The visualization is fully interactive.
+
+    The widget script ships with the package and is inlined into the first
+    widget of the kernel session only; later widgets carry just their data
+    and an init call, and use the script already defined in the page.
+
+    Large widget data is embedded as base64 zlib and inflated in the
+    browser (DecompressionStream, or a small bundled inflate where that is
+    missing), which keeps notebook files and kernel messages small. The
+    decoder is inlined into the first compressed widget of the session, as
+    the widget script is.
 
     Args:
         data: Data from collect_logit_lens() (Python format) or
               already converted to_js_format() (JavaScript V2 format)
         title: Optional title for the widget
         container_id: Optional container ID (auto-generated if not provided)
+        inline_js: Inline the widget script: True always (e.g. for HTML saved
+            on its own), False never, None once per session (default: None;
+            always in Colab, where each output is a separate frame)
+        compress: Embed the data compressed: True always, False never, None
+            when its JSON is at least COMPRESS_MIN_BYTES (default: None)
 
     Returns:
         IPython HTML object that displays the widget
@@ -113,32 +304,104 @@ def show_logit_lens(
     if title:
         ui_state["title"] = title
 
-    # Generate HTML with embedded widget
-    html = f"""
+    global _widget_js_injected, _inflate_js_injected
+    if inline_js is None:
+        inline_js = not _widget_js_injected or "google.colab" in sys.modules
+    _widget_js_injected = _widget_js_injected or inline_js
+
+    prof = data.get("profile")
+    with timed(prof, "html_embed"):
+        data_json = json.dumps(widget_data)
+        if compress is None:
+            compress = len(data_json) >= COMPRESS_MIN_BYTES
+        if compress:
+            with timed(prof, "compress"):
+                # Level 1: ~5x faster than the default for ~20% more bytes
+                packed = zlib.compress(data_json.encode("utf-8"), 1)
+                encoded = base64.b64encode(packed).decode()
+            # logitLensInflate is defined by the session's first compressed widget
+            load = (f"(typeof logitLensInflate !== 'undefined' ? "
+                    f'logitLensInflate("{encoded}") : Promise.reject(new Error('
+                    f'"decoder not in the page; call reset_widget_js()")))'
+                    f'.then(function(text) {{ render(JSON.parse(text)); }})'
+                    f'.catch(function(err) {{ container.textContent = '
+                    f'"Could not decode logit lens data: " + err; }});')
+        else:
+            load = f"render({_script_safe(data_json)});"
+        html = _widget_html(container_id, load, ui_state)
+        # The decoder is needed with or without the widget script (inline_js=False)
+        if compress and (inline_js or not _inflate_js_injected):
+            html = f"<script>{_inflate_js()}</script>" + html
+            _inflate_js_injected = True
+        if inline_js:
+            html = f"<script>{_widget_js()}</script>" + html
+    if prof is not None:
+        prof.add_bytes("json", len(data_json.encode("utf-8")))
+        prof.add_bytes("html", len(html.encode("utf-8")))
+    return HTML(html)
+
+
+def reset_widget_js():
+    """
+    Inline the widget script (and data decoder) again in the next
+    show_logit_lens() output.
+
+    Call this after clearing the output that carried the script, or when
+    output goes to a new page.
+    """
+    global _widget_js_injected, _inflate_js_injected
+    _widget_js_injected = False
+    _inflate_js_injected = False
+
+
+@functools.lru_cache(maxsize=1)
+def _widget_js() -> str:
+    """The bundled widget script, safe to inline in a <script> element."""
+    with open(_WIDGET_JS_PATH, encoding="utf-8") as f:
+        return _script_safe(f.read())
+
+
+@functools.lru_cache(maxsize=1)
+def _inflate_js() -> str:
+    """The bundled decoder for compressed widget data."""
+    with open(_INFLATE_JS_PATH, encoding="utf-8") as f:
+        return _script_safe(f.read())
+
+
+def _script_safe(text: str) -> str:
+    """Escape ``</`` so inlined JS or JSON cannot close its <script> element."""
+    return text.replace("</", "<\\/")
+
+
+def _widget_html(container_id: str, load: str, ui_state: Dict) -> str:
+    """Widget container and init script; ``load`` passes the data to render()."""
+    return f"""
     <div id="{container_id}" style="background: white; padding: 20px; border-radius: 8px;"></div>
     <script>
     (function() {{
-        var data = {json.dumps(widget_data)};
+        var container = document.getElementById("{container_id}");
         var uiState = {json.dumps(ui_state)};
 
-        // Check if LogitLensWidget is already loaded
-        if (typeof LogitLensWidget !== 'undefined') {{
-            LogitLensWidget("#{container_id}", data, uiState);
-        }} else {{
-            // Load widget script
-            var script = document.createElement('script');
-            script.src = "{_WIDGET_JS_URL}";
-            script.onload = function() {{
+        function render(data) {{
+            // Check if LogitLensWidget is already loaded
+            if (typeof LogitLensWidget !== 'undefined') {{
                 LogitLensWidget("#{container_id}", data, uiState);
-            }};
-            document.head.appendChild(script);
+            }} else {{
+                // Script not in the page (e.g. its output was cleared): load it
+                var script = document.createElement('script');
+                script.src = "{_WIDGET_JS_URL}";
+                script.onload = function() {{
+                    LogitLensWidget("#{container_id}", data, uiState);
+                }};
+                document.head.appendChild(script);
+            }}
         }}
+
+        {load}
     }})();
     </script>
     """
 
-    return HTML(html)
-
 
 def display_logit_lens(
     data: Dict,
@@ -0,0 +1,341 @@
+"""
+Folded lens heads: the final norm's affine parameters merged into lm_head.
+
+A logit lens projection is ``lm_head(norm(h))``. For LayerNorm and RMSNorm
+the norm is a parameter-free normalization followed by an elementwise gain
+(and, for LayerNorm, a bias), so
+
+    lm_head(norm(h)) = normalize(h) @ (W * gain).T + (W @ norm_bias + lm_bias)
+
+A LensHead precomputes the folded matrix and bias once per model and dtype.
+Each projection is then one normalization and one GEMM (with the bias fused
+in), with no separate elementwise pass for the gain.
+
+The folded matrix can also be stored at reduced precision (PRECISIONS):
+bf16/fp16 copies, or an int8 copy with one scale per vocabulary row, with
+logits accumulated and returned in float32. precision_report() measures how
+far each mode drifts from the fp32 lens on sample prompts.
+
+Lens heads hold client-side copies of the unembedding, so they are for
+local (``remote=False``) collection.
+"""
+
+import time
+import weakref
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import torch
+import torch.nn.functional as F
+
+from .models import ModelPlan, get_model_plan
+
+
+NORM_KINDS = ("layernorm", "rmsnorm")
+PRECISIONS = {
+    "fp32": torch.float32,
+    "bf16": torch.bfloat16,
+    "fp16": torch.float16,
+    "int8": torch.int8,
+}
+
+
+class LensHead:
+    """
+    Final norm folded into a cached copy of the unembedding.
+
+    Implements the ModelPlan projection interface (``layer_output``,
+    ``norm``, ``lm_head``, ``unembedding``, ``n_layers``), with ``norm``
+    reduced to the parameter-free normalization and ``lm_head`` applying the
+    folded matrix, so collection code can use either interchangeably.
+
+    Args:
+        plan: ModelPlan of the model
+        dtype: dtype of the folded matrix (default: the unembedding's dtype)
+
+    Raises:
+        ValueError: If the final norm is not a LayerNorm or RMSNorm module
+
+    Example:
+        >>> head = get_lens_head(model)
+        >>> with model.trace("Hello", remote=False):
+        ...     logits = head.lm_head(head.norm(head.layer_output(5))).save()
+    """
+
+    def __init__(self, plan: ModelPlan, dtype: Optional[torch.dtype] = None):
+        self.kind, self.eps, gain, shift = _norm_params(plan.norm_module())
+        weight, bias = plan.unembedding()
+        if dtype is None:
+            dtype = weight.dtype
+
+        # Fold in float32, then cast once
+        with torch.no_grad():
+            weight = weight.detach().float()
+            folded_bias = bias.detach().float() if bias is not None else None
+            if shift is not None:
+                projected = weight @ shift.detach().float()
+                folded_bias = projected if folded_bias is None else folded_bias + projected
+            if gain is not None:
+                weight = weight * gain.detach().float()
+
+        self.weight = weight.to(dtype)
+        self.bias = folded_bias.to(dtype) if folded_bias is not None else None
+        self.plan = plan
+        self.n_layers = plan.n_layers
+
+    @property
+    def dtype(self) -> torch.dtype:
+        return self.weight.dtype
+
+    def layer_output(self, index: int):
+        """Hidden state after layer ``index``; see ModelPlan.layer_output."""
+        return self.plan.layer_output(index)
+
+    def norm(self, hidden):
+        """Parameter-free normalization, computed in float32."""
+        hidden = hidden.float()
+        if self.kind == "layernorm":
+            return F.layer_norm(hidden, hidden.shape[-1:], eps=self.eps)
+        return hidden * torch.rsqrt(hidden.pow(2).mean(-1, keepdim=True) + self.eps)
+
+    def lm_head(self, normed):
+        """Folded projection: one GEMM with the bias fused in; float32 logits."""
+        return F.linear(normed.to(self.weight.dtype), self.weight, self.bias).float()
+
+    def unembedding(self) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+        """Folded weight [vocab, d_model] and bias [vocab]."""
+        return self.weight, self.bias
+
+
+class QuantizedLensHead(LensHead):
+    """
+    LensHead with an int8 folded matrix and one float32 scale per vocab row.
+
+    Rows are quantized symmetrically: ``weight ~= int8_weight * scale[:, None]``.
+    The matrix takes a quarter of the fp32 memory. Where ``torch._int_mm``
+    is available, activations are quantized per row on the fly and the
+    projection runs as an int8 x int8 -> int32 GEMM; otherwise the matrix is
+    dequantized a vocabulary chunk at a time for float32 GEMMs, so at most a
+    quarter of it exists in float32 at once.
+
+    Args:
+        plan: ModelPlan of the model
+    """
+
+    def __init__(self, plan: ModelPlan):
+        super().__init__(plan, dtype=torch.float32)
+        weight = self.weight
+        self.vocab_size, self.d_model = weight.shape
+        self.scale = weight.abs().amax(dim=-1).clamp_min(1e-12) / 127
+        quantized = torch.round(weight / self.scale[:, None]).clamp(-127, 127)
+        # [d_model, vocab] layout, as torch._int_mm expects, zero-padded to
+        # multiples of 8 in both dims as its CUDA kernel requires
+        quantized = F.pad(quantized, (0, -self.d_model % 8, 0, -self.vocab_size % 8))
+        self.weight = quantized.to(torch.int8).T.contiguous()
+        self._int_mm = hasattr(torch, "_int_mm")
+
+    def lm_head(self, normed):
+        """int8 projection, then per-row (token) and per-column (vocab) scales."""
+        shape = normed.shape
+        x = normed.float().reshape(-1, shape[-1])
+        logits = self._int8_logits(x) if self._int_mm else None
+        if logits is None:
+            logits = self._dequantized_logits(x)
+        if self.bias is not None:
+            logits += self.bias
+        return logits.reshape(*shape[:-1], -1)
+
+    def _int8_logits(self, x):
+        """Logits from the int8 GEMM, or None where the kernel rejects the call."""
+        n_rows = x.shape[0]
+        x_scale = x.abs().amax(dim=-1, keepdim=True).clamp_min(1e-12) / 127
+        x_q = torch.round(x / x_scale).to(torch.int8)
+        # CUDA's kernel needs more than 16 rows (e.g. positions=-1, generate steps)
+        pad_rows = max(0, 17 - n_rows) if x_q.is_cuda else 0
+        x_q = F.pad(x_q, (0, self.weight.shape[0] - self.d_model, 0, pad_rows))
+        try:
+            out = torch._int_mm(x_q, self.weight)
+        except RuntimeError:
+            # Unsupported device or shape: fall back for this call only
+            return None
+        return out[:n_rows, :self.vocab_size].float().mul_(x_scale).mul_(self.scale)
+
+    def _dequantized_logits(self, x):
+        """float32 GEMMs over vocabulary chunks of the dequantized matrix."""
+        logits = x.new_empty((x.shape[0], self.vocab_size))
+        chunk = -(-self.vocab_size // 4)
+        for start in range(0, self.vocab_size, chunk):
+            end = min(start + chunk, self.vocab_size)
+            logits[:, start:end] = x @ self.weight[:self.d_model, start:end].float()
+        return logits.mul_(self.scale)
+
+    def unembedding(self):
+        raise ValueError(
+            "int8 lens heads cannot stream the unembedding; "
+            "drop memory_budget or use another precision"
+        )
+
+
+_HEADS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def get_lens_head(model, dtype: Union[torch.dtype, str, None] = None) -> LensHead:
+    """
+    Get the cached LensHead for a model and dtype, folding it on first use.
+
+    Folded weights are a snapshot: call clear_lens_heads() after changing
+    the model's norm or unembedding parameters.
+
+    Args:
+        model: nnterp StandardizedTransformer or nnsight LanguageModel
+        dtype: dtype of the folded matrix (default: the unembedding's dtype),
+            or a PRECISIONS name; ``torch.int8`` / ``"int8"`` gives a
+            QuantizedLensHead
+
+    Returns:
+        LensHead for the model
+    """
+    plan = get_model_plan(model)
+    if isinstance(dtype, str):
+        if dtype not in PRECISIONS:
+            raise ValueError(f"Unknown precision: {dtype}. Supported: {list(PRECISIONS)}")
+        dtype = PRECISIONS[dtype]
+    if dtype is None:
+        dtype = plan.unembedding()[0].dtype
+    heads: Dict[torch.dtype, LensHead] = _HEADS.setdefault(model, {})
+    head = heads.get(dtype)
+    if head is None:
+        if dtype == torch.int8:
+            head = QuantizedLensHead(plan)
+        else:
+            head = LensHead(plan, dtype)
+        heads[dtype] = head
+    return head
+
+
+def clear_lens_heads():
+    """Drop all cached LensHeads."""
+    _HEADS.clear()
+
+
+def precision_report(
+    prompts: Union[str, Iterable[str]],
+    model,
+    k: int = 5,
+    layers: Optional[List[int]] = None,
+    precisions: Iterable[str] = ("bf16", "fp16", "int8"),
+) -> Dict[str, Dict[str, float]]:
+    """
+    Compare reduced-precision lens projections against the fp32 lens.
+
+    Runs each prompt once (locally), then projects the same hidden states
+    with every head. Top-k and trajectories are taken over the tokens the
+    fp32 lens tracks (the union of top-k across layers, as in
+    collect_logit_lens), so the errors are those a visualization would show.
+
+    Args:
+        prompts: A prompt or prompts to evaluate on
+        model: nnterp StandardizedTransformer or nnsight LanguageModel
+        k: Top-k size (default: 5)
+        layers: Layer indices (default: all layers)
+        precisions: Modes to compare (default: bf16, fp16 and int8)
+
+    Returns:
+        Dict mapping each precision (and "fp32") to:
+            topk_agreement: Fraction of (layer, position) cells whose top-k
+                set equals the fp32 top-k set
+            top1_agreement: Fraction of cells with the same top-1 token
+            max_trajectory_error: Largest absolute probability difference
+                on a tracked token's trajectory
+            mean_trajectory_error: Mean absolute difference on tracked tokens
+            seconds: Projection time for all prompts
+
+    Example:
+        >>> report = precision_report(sample_prompts, model, k=5)
+        >>> report["int8"]["top1_agreement"]  # e.g. 0.998
+    """
+    from .collect import _ragged_unique
+
+    if isinstance(prompts, str):
+        prompts = [prompts]
+    plan = get_model_plan(model)
+    if layers is None:
+        layers = list(range(plan.n_layers))
+    names = ["fp32"] + [p for p in precisions if p != "fp32"]
+    heads = {name: get_lens_head(model, name) for name in names}
+
+    totals = {name: {"cells": 0, "topk": 0, "top1": 0, "max_err": 0.0,
+                     "sum_err": 0.0, "n_err": 0, "seconds": 0.0} for name in names}
+    with torch.no_grad():
+        for prompt in prompts:
+            token_ids = model.tokenizer.encode(prompt)
+            with model.trace(token_ids, remote=False):
+                # The outer no_grad does not reach the trace body
+                with torch.no_grad():
+                    hidden = []
+                    for li in layers:
+                        hidden.append(plan.layer_output(li)[0])
+                    hidden = torch.stack(hidden).save()
+
+            reference = None
+            for name in names:
+                head = heads[name]
+                start = time.perf_counter()
+                probs = torch.softmax(head.lm_head(head.norm(hidden)), dim=-1)
+                topk = probs.topk(k, dim=-1).indices
+                totals[name]["seconds"] += time.perf_counter() - start
+                if reference is None:
+                    reference = (probs, topk, _ragged_unique(topk, probs.shape[-1]))
+
+                ref_probs, ref_topk, (pos_index, token_index, _) = reference
+                t = totals[name]
+                t["cells"] += topk.shape[0] * topk.shape[1]
+                t["top1"] += int((topk[..., 0] == ref_topk[..., 0]).sum())
+                same = (topk.sort(dim=-1).values == ref_topk.sort(dim=-1).values).all(dim=-1)
+                t["topk"] += int(same.sum())
+                err = (probs[:, pos_index, token_index] - ref_probs[:, pos_index, token_index]).abs()
+                t["max_err"] = max(t["max_err"], float(err.max()) if err.numel() else 0.0)
+                t["sum_err"] += float(err.sum())
+                t["n_err"] += err.numel()
+
+    return {
+        name: {
+            "topk_agreement": t["topk"] / max(t["cells"], 1),
+            "top1_agreement": t["top1"] / max(t["cells"], 1),
+            "max_trajectory_error": t["max_err"],
+            "mean_trajectory_error": t["sum_err"] / max(t["n_err"], 1),
+            "seconds": t["seconds"],
+        }
+        for name, t in totals.items()
+    }
+
+
+def _norm_params(module) -> Tuple[str, float, Optional[torch.Tensor], Optional[torch.Tensor]]:
+    """
+    Classify a final norm module for folding.
+
+    Returns:
+        Tuple (kind, eps, gain, shift): kind is "layernorm" or "rmsnorm";
+        gain and shift are the effective elementwise scale and bias (None
+        when absent)
+    """
+    if module is None:
+        raise ValueError("Cannot fold a final norm given as a function; use the unfolded lens")
+
+    name = type(module).__name__
+    if isinstance(module, torch.nn.LayerNorm) or (
+        "LayerNorm" in name and hasattr(module, "eps")
+    ):
+        return "layernorm", float(module.eps), getattr(module, "weight", None), \
+            getattr(module, "bias", None)
+
+    if "RMSNorm" in name:
+        eps = getattr(module, "variance_epsilon", getattr(module, "eps", None))
+        if eps is None:
+            raise ValueError(f"Cannot find eps on {name}")
+        gain = module.weight
+        if name.startswith("Gemma"):
+            # Gemma RMSNorms scale by (1 + weight)
+            gain = 1.0 + gain.detach().float()
+        return "rmsnorm", float(eps), gain, None
+
+    raise ValueError(f"Cannot fold final norm of type {name}; supported: {list(NORM_KINDS)}")
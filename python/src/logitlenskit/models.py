@@ -5,8 +5,10 @@ Each model family has different internal structure (layer paths, norm type, etc.
 This registry provides a unified interface for accessing model components.
 """
 
+import functools
 import inspect
-from typing import Dict, Any, Optional, Union, Callable
+import weakref
+from typing import Dict, Any, Optional, Tuple, Union, Callable
 
 
 # =============================================================================
@@ -24,6 +26,11 @@ from typing import Dict, Any, Optional, Union, Callable
 #   - lm_head: Language model head (module or weight matrix)
 #   - n_layers: Number of layers (string path to config attr, or callable)
 
+def _gpt_neox_lm_head(model):
+    """GPT-NeoX unembedding: ``embed_out`` before transformers 5, ``lm_head`` after."""
+    return model.embed_out if hasattr(model, "embed_out") else model.lm_head
+
+
 MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
     "llama": {
         "layers": "model.layers",
@@ -58,7 +65,7 @@ MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
     "gpt_neox": {
         "layers": "gpt_neox.layers",
         "norm": "gpt_neox.final_layer_norm",
-        "lm_head": "embed_out",
+        "lm_head": _gpt_neox_lm_head,
         "n_layers": "config.num_hidden_layers",
     },
     "olmo": {
@@ -142,8 +149,7 @@ def apply_module_or_callable(model, accessor: Union[str, Callable], hidden):
     """
     if callable(accessor):
         # Check if it's a callable that takes hidden directly
-        sig = inspect.signature(accessor)
-        if len(sig.parameters) >= 2:
+        if _takes_hidden(accessor):
             # Callable(model, hidden) -> direct application
             return accessor(model, hidden)
         else:
@@ -175,8 +181,10 @@ def detect_model_type(model) -> str:
     Raises:
         ValueError: If model type cannot be detected
     """
+    config = _model_config(model)
+
     # Try model_type from config
-    model_type = getattr(model.config, "model_type", "").lower()
+    model_type = getattr(config, "model_type", "").lower()
 
     # Check direct match
     if model_type in MODEL_CONFIGS:
@@ -187,7 +195,7 @@ def detect_model_type(model) -> str:
         return MODEL_ALIASES[model_type]
 
     # Try architectures field
-    archs = getattr(model.config, "architectures", [])
+    archs = getattr(config, "architectures", None) or []
     for arch in archs:
         arch_lower = arch.lower()
         for key in MODEL_CONFIGS:
@@ -226,3 +234,196 @@ def get_model_config(model, model_type: Optional[str] = None) -> Dict[str, Any]:
         raise ValueError(f"Unknown model type: {model_type}")
 
     return MODEL_CONFIGS[model_type]
+
+
+# =============================================================================
+# Compiled Model Plans
+# =============================================================================
+#
+# resolve_accessor() and apply_module_or_callable() re-walk dotted paths and
+# re-inspect callables on every call. A ModelPlan does that work once per
+# model: it resolves layers, norm and lm_head to modules (nnsight envoys),
+# classifies each callable accessor, and is cached per model instance.
+
+
+class ModelPlan:
+    """
+    Architecture accessors for one model, resolved once.
+
+    Works for nnterp StandardizedTransformers (through their standardized
+    ``layers_output``, ``ln_final`` and ``lm_head``) and for raw nnsight
+    LanguageModels (through MODEL_CONFIGS). The layer, norm and lm_head
+    methods must be used inside a ``model.trace`` context.
+
+    Args:
+        model: nnterp StandardizedTransformer or nnsight LanguageModel
+        model_type: Explicit model type for raw models, or None to auto-detect
+
+    Attributes:
+        model_type: "nnterp" or a MODEL_CONFIGS key
+        n_layers: Number of layers
+
+    Example:
+        >>> plan = get_model_plan(model)
+        >>> with model.trace("Hello"):
+        ...     logits = plan.lm_head(plan.norm(plan.layer_output(5))).save()
+    """
+
+    def __init__(self, model, model_type: Optional[str] = None):
+        self.model = model
+        if _is_standardized(model):
+            self.model_type = "nnterp"
+            self.n_layers = model.num_layers
+            self._layers = None
+            self._norm = ("module", model.ln_final)
+            self._lm_head = ("module", model.lm_head)
+            return
+
+        config = get_model_config(model, model_type)
+        self.model_type = next(
+            (name for name, cfg in MODEL_CONFIGS.items() if cfg is config), model_type
+        )
+        layers = resolve_accessor(model, config["layers"])
+        self.n_layers = _resolve_n_layers(model, config["n_layers"], layers)
+        self._layers = [layers[i] for i in range(self.n_layers)]
+        self._norm = _classify(model, config["norm"])
+        self._lm_head = _classify(model, config["lm_head"])
+
+    def layer_output(self, index: int):
+        """Hidden state after layer ``index``: Tensor[batch, n_pos, d_model]."""
+        if self._layers is None:
+            return self.model.layers_output[index]
+        output = self._layers[index].output
+        return output[0] if isinstance(output, tuple) else output
+
+    def norm(self, hidden):
+        """Apply the final norm."""
+        return self._apply(self._norm, hidden)
+
+    def lm_head(self, hidden):
+        """Apply the unembedding: hidden states to logits."""
+        return self._apply(self._lm_head, hidden)
+
+    def unembedding(self) -> Tuple[Any, Optional[Any]]:
+        """
+        Unembedding weight [vocab, d_model] and optional bias [vocab].
+
+        Raises:
+            ValueError: If lm_head is a callable applied to hidden states,
+                whose weights cannot be recovered
+        """
+        kind, target = self._lm_head
+        if kind == "module":
+            return target.weight, getattr(target, "bias", None)
+        if kind == "weights":
+            # Applied as hidden @ weights, so weights are [d_model, vocab]
+            return target(self.model).T, None
+        raise ValueError(
+            f"lm_head for {self.model_type} is a function of hidden states; "
+            "its unembedding matrix is not available"
+        )
+
+    def norm_module(self):
+        """The final norm as a plain torch module, or None if it is a function."""
+        kind, target = self._norm
+        return _unwrap(target) if kind == "module" else None
+
+    def _apply(self, op: Tuple[str, Any], hidden):
+        kind, target = op
+        if kind == "module":
+            return target(hidden)
+        if kind == "function":
+            return target(self.model, hidden)
+        return hidden @ target(self.model)
+
+
+_PLANS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def get_model_plan(model, model_type: Optional[str] = None) -> ModelPlan:
+    """
+    Get the compiled ModelPlan for a model, building it on first use.
+
+    Plans are cached per model instance (and model_type) for as long as the
+    model is alive.
+
+    Args:
+        model: nnterp StandardizedTransformer or nnsight LanguageModel
+        model_type: Explicit model type for raw models, or None to auto-detect
+
+    Returns:
+        ModelPlan for the model
+    """
+    try:
+        plans = _PLANS.setdefault(model, {})
+    except TypeError:
+        # Not weak-referenceable or hashable: build without caching
+        return ModelPlan(model, model_type)
+    plan = plans.get(model_type)
+    if plan is None:
+        plan = plans[model_type] = ModelPlan(model, model_type)
+    return plan
+
+
+def _takes_hidden(accessor: Callable) -> bool:
+    """
+    Whether a callable accessor has the (model, hidden) signature.
+
+    Not lru_cached: ModelPlan is sent by value in remote requests, and
+    cloudpickle can only send lru_cache wrappers by reference.
+    """
+    return len(inspect.signature(accessor).parameters) >= 2
+
+
+def _classify(model, accessor: Union[str, Callable]) -> Tuple[str, Any]:
+    """
+    Classify a norm/lm_head accessor once, as apply_module_or_callable would.
+
+    Returns:
+        ("module", module), ("function", fn(model, hidden)) or
+        ("weights", fn(model) -> matrix). Weight matrices are fetched at
+        apply time so that remote traces see the server's parameters.
+    """
+    if callable(accessor):
+        if _takes_hidden(accessor):
+            return "function", accessor
+        resolved = accessor(model)
+        if callable(resolved):
+            return "module", resolved
+        return "weights", accessor
+
+    resolved = resolve_accessor(model, accessor)
+    if callable(resolved):
+        return "module", resolved
+    return "weights", functools.partial(resolve_accessor, accessor=accessor)
+
+
+def _resolve_n_layers(model, accessor: Union[str, Callable], layers) -> int:
+    """Resolve n_layers from the config, falling back to the layer count."""
+    if isinstance(accessor, str) and accessor.startswith("config."):
+        config = _model_config(model)
+        if config is not None:
+            return int(resolve_accessor(config, accessor[len("config."):]))
+        return len(layers)
+    return int(resolve_accessor(model, accessor))
+
+
+def _unwrap(module):
+    """The torch module behind an nnsight Envoy (or the module itself)."""
+    return getattr(module, "_module", module)
+
+
+def _model_config(model):
+    """The model's HuggingFace config (also for models built from a module)."""
+    config = getattr(model, "config", None)
+    if config is None:
+        config = getattr(getattr(model, "_model", None), "config", None)
+    return config
+
+
+def _is_standardized(model) -> bool:
+    """Whether model has nnterp's standardized interface (StandardizedTransformer)."""
+    try:
+        return hasattr(model, "layers_output") and hasattr(model, "ln_final")
+    except Exception:
+        return False
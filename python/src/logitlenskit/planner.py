@@ -0,0 +1,212 @@
+"""
+Payload planning: choose k, layers and trajectory precision for a budget.
+
+Payload sizes follow from the result shapes. For n_pos positions, L
+selected layers, top-k size k and U tracked tokens per position:
+
+    transmitted  topk int32 [L, n_pos, k] + tracked int32 [n_pos * U]
+                 + offsets int64 [n_pos + 1] + probs [L, n_pos * U]
+    V2 JSON      token strings for input and topk cells, and one
+                 rounded trajectory of L numbers per tracked token
+    V3 binary    int32 topk and tracked, trajectories at the precision
+
+U is not known before running, but is bounded by k * L and in practice is
+a small multiple of k, because top-k sets drift slowly across layers; the
+planner uses ``k * min(L, tracked_ratio)``. plan_payload() is a dry run: it
+predicts these sizes, and the download time at a given bandwidth, and picks
+the largest collection that fits, without touching a model.
+"""
+
+import math
+from typing import Dict, List, Optional, Union
+
+from .models import get_model_plan
+
+
+PROBS_DTYPES = {"float32": 4, "float16": 2}
+
+# Fixed JSON overhead: meta, field names and brackets
+_JSON_OVERHEAD = 128
+
+
+def plan_payload(
+    n_pos: int,
+    n_layers: int,
+    vocab_size: Optional[int] = None,
+    *,
+    max_bytes: Optional[int] = None,
+    max_json_bytes: Optional[int] = None,
+    max_seconds: Optional[float] = None,
+    k: int = 5,
+    min_k: int = 1,
+    bandwidth: float = 10e6,
+    latency: float = 0.5,
+    tracked_ratio: float = 3.0,
+    token_chars: float = 6.0,
+    value_chars: float = 6.5,
+) -> Dict:
+    """
+    Choose layer stride, k and trajectory precision to fit payload budgets.
+
+    Candidates are every layer stride (the last layer is always kept), k
+    from ``k`` down to ``min_k``, and float32 or float16 trajectories. The
+    plan is the candidate with the most (layer, top-k) cells that meets
+    every budget; ties prefer float32, then more layers. If none fits, the
+    smallest candidate is returned with ``fits=False``.
+
+    Args:
+        n_pos: Prompt length in tokens
+        n_layers: Number of model layers
+        vocab_size: Vocabulary size, bounding tracked tokens (optional)
+        max_bytes: Budget for the tensors transmitted from the trace
+        max_json_bytes: Budget for the V2 widget JSON
+        max_seconds: Budget for ``latency + transmitted / bandwidth``
+        k: Largest top-k to consider (default: 5)
+        min_k: Smallest top-k to consider (default: 1)
+        bandwidth: Download bandwidth in bytes/second (default: 10 MB/s)
+        latency: Fixed per-request seconds, e.g. queueing and the forward
+            pass (default: 0.5)
+        tracked_ratio: Expected tracked tokens per position, as a multiple
+            of k (default: 3.0)
+        token_chars: Average JSON-encoded token string length, quotes
+            included (default: 6.0)
+        value_chars: Average JSON length of a rounded probability
+            (default: 6.5)
+
+    Returns:
+        Dict with:
+            k, layers, layer_stride, probs_dtype: The chosen settings
+            kwargs: The settings as collect_logit_lens() keyword arguments
+            predicted: transmitted_bytes, json_bytes, v3_bytes and seconds
+            fits: Whether every budget is met
+
+    Example:
+        >>> plan = plan_payload(n_pos=500, n_layers=80, max_bytes=2_000_000)
+        >>> plan["predicted"]["transmitted_bytes"], plan["layer_stride"]
+        >>> data = collect_logit_lens(prompt, model, **plan["kwargs"])
+    """
+    if n_pos < 1 or n_layers < 1:
+        raise ValueError(f"n_pos and n_layers must be >= 1, got {n_pos}, {n_layers}")
+    if not 1 <= min_k <= k:
+        raise ValueError(f"Need 1 <= min_k <= k, got min_k={min_k}, k={k}")
+
+    best = None
+    smallest = None
+    for stride in range(1, n_layers + 1):
+        layers = _strided_layers(n_layers, stride)
+        for top in range(k, min_k - 1, -1):
+            for dtype in PROBS_DTYPES:
+                predicted = predict_payload(
+                    n_pos, len(layers), top, vocab_size, dtype, bandwidth=bandwidth,
+                    latency=latency, tracked_ratio=tracked_ratio,
+                    token_chars=token_chars, value_chars=value_chars,
+                )
+                candidate = (len(layers) * top, dtype == "float32", len(layers))
+                plan = (candidate, stride, layers, top, dtype, predicted)
+                if smallest is None or predicted["transmitted_bytes"] < smallest[5]["transmitted_bytes"]:
+                    smallest = plan
+                fits = (
+                    (max_bytes is None or predicted["transmitted_bytes"] <= max_bytes)
+                    and (max_json_bytes is None or predicted["json_bytes"] <= max_json_bytes)
+                    and (max_seconds is None or predicted["seconds"] <= max_seconds)
+                )
+                if fits and (best is None or candidate > best[0]):
+                    best = plan
+
+    _, stride, layers, top, dtype, predicted = best or smallest
+    return {
+        "k": top,
+        "layers": layers,
+        "layer_stride": stride,
+        "probs_dtype": dtype,
+        "kwargs": {"k": top, "layers": layers, "probs_dtype": dtype},
+        "predicted": predicted,
+        "fits": best is not None,
+    }
+
+
+def plan_for_prompt(prompt: str, model, **budgets) -> Dict:
+    """
+    plan_payload() for a prompt and model, without running the model.
+
+    Tokenizes the prompt and reads the layer count and vocabulary size
+    from the model; see plan_payload() for the budget arguments.
+
+    Example:
+        >>> plan = plan_for_prompt(prompt, model, max_seconds=5.0, bandwidth=2e6)
+        >>> data = collect_logit_lens(prompt, model, **plan["kwargs"])
+    """
+    n_pos = len(model.tokenizer.encode(prompt))
+    return plan_payload(n_pos, get_model_plan(model).n_layers, len(model.tokenizer),
+                        **budgets)
+
+
+def predict_payload(
+    n_pos: int,
+    n_layers: int,
+    k: int,
+    vocab_size: Optional[int] = None,
+    probs_dtype: str = "float32",
+    *,
+    bandwidth: float = 10e6,
+    latency: float = 0.5,
+    tracked_ratio: float = 3.0,
+    token_chars: float = 6.0,
+    value_chars: float = 6.5,
+) -> Dict[str, Union[int, float]]:
+    """
+    Predicted payload sizes for one collection; see plan_payload().
+
+    Args:
+        n_pos: Prompt length in tokens
+        n_layers: Number of selected layers
+        k: Top-k size
+        vocab_size: Vocabulary size, bounding tracked tokens (optional)
+        probs_dtype: Trajectory dtype, "float32" or "float16"
+
+    Returns:
+        Dict with transmitted_bytes, json_bytes, v3_bytes, seconds and
+        tracked (expected tracked tokens per position)
+    """
+    if probs_dtype not in PROBS_DTYPES:
+        raise ValueError(f"Unknown probs_dtype: {probs_dtype}. Supported: {list(PROBS_DTYPES)}")
+    itemsize = PROBS_DTYPES[probs_dtype]
+
+    tracked = k * min(n_layers, tracked_ratio)
+    if vocab_size is not None:
+        tracked = min(tracked, vocab_size)
+    n_tracked = n_pos * tracked
+
+    ids = n_layers * n_pos * k * 4 + n_tracked * 4
+    transmitted = ids + (n_pos + 1) * 8 + n_layers * n_tracked * itemsize
+
+    # Distinct strings in the V3 table: at most the tracked tokens
+    strings = n_tracked if vocab_size is None else min(n_tracked, vocab_size)
+    v3 = (ids + (n_pos + 1) * 4 + n_layers * n_tracked * itemsize
+          + strings * (token_chars + 2)
+          + _JSON_OVERHEAD + n_pos * (token_chars + 1))  # header with input tokens
+
+    cell = k * (token_chars + 1) + 2
+    json_bytes = (
+        _JSON_OVERHEAD
+        + n_pos * (token_chars + 1)
+        + n_layers * 4
+        + n_layers * n_pos * cell
+        + n_pos * 3
+        + n_tracked * (token_chars + 3 + n_layers * (value_chars + 1))
+    )
+    return {
+        "transmitted_bytes": int(math.ceil(transmitted)),
+        "json_bytes": int(math.ceil(json_bytes)),
+        "v3_bytes": int(math.ceil(v3)),
+        "seconds": latency + transmitted / bandwidth,
+        "tracked": tracked,
+    }
+
+
+def _strided_layers(n_layers: int, stride: int) -> List[int]:
+    """Every ``stride``-th layer from 0, plus the last layer."""
+    layers = list(range(0, n_layers, stride))
+    if layers[-1] != n_layers - 1:
+        layers.append(n_layers - 1)
+    return layers
@@ -0,0 +1,238 @@
+"""
+In-memory prefix cache for incremental logit lens collection.
+
+Few-shot templates and "one base prompt, many continuations" workloads run
+many prompts that share long token prefixes. In a causal model the hidden
+states, and so the lens results, of a position depend only on the tokens up
+to it. A PrefixCache keeps, for each collected prompt, the model's KV cache
+and the flat per-position lens results, indexed by a token trie. A later
+prompt reuses the longest cached prefix: its lens results are copied, and the
+model runs only on the new suffix tokens, attending to the cached keys and
+values.
+
+Entries are bounded in bytes (KV tensors plus lens results); least recently
+used entries are evicted past ``max_bytes``. The cache holds tensors of a
+live model, so it is for local (``remote=False``) collection.
+"""
+
+import copy
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import torch
+
+
+class PrefixCache:
+    """
+    Memory-bounded token-trie cache of KV caches and lens results.
+
+    Args:
+        max_bytes: Total size bound for cached KV and lens tensors; least
+            recently used entries are evicted beyond it (default: 1 GB)
+
+    Example:
+        >>> prefixes = PrefixCache(max_bytes=2_000_000_000)
+        >>> for prompt in [template + q for q in questions]:
+        ...     data = collect_logit_lens(prompt, model, remote=False,
+        ...                               prefix_cache=prefixes)
+        >>> prefixes.stats()["tokens_reused"]
+    """
+
+    def __init__(self, max_bytes: int = 1 << 30):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.tokens_reused = 0
+        self.tokens_computed = 0
+        self._roots: Dict[Hashable, _Node] = {}
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._exact: Dict[Tuple[Hashable, Tuple[int, ...]], int] = {}
+        self._next_id = 0
+
+    def lookup(self, config: Hashable, token_ids: List[int]) -> Tuple[int, Optional["_Entry"]]:
+        """
+        Find the cached entry sharing the longest prefix with ``token_ids``.
+
+        Args:
+            config: Collection settings the entry must have been made with
+            token_ids: Prompt token ids
+
+        Returns:
+            Tuple (length, entry): the shared prefix length and the most
+            recently stored entry with that prefix, or (0, None)
+        """
+        node = self._roots.get(config)
+        length = 0
+        while node is not None and length < len(token_ids):
+            child = node.children.get(token_ids[length])
+            if child is None:
+                break
+            node = child
+            length += 1
+
+        self.tokens_reused += length
+        self.tokens_computed += len(token_ids) - length
+        if length == 0:
+            self.misses += 1
+            return 0, None
+        entry = self._entries[next(reversed(node.entries))]
+        self._entries.move_to_end(entry.id)
+        self.hits += 1
+        return length, entry
+
+    def past_key_values(self, entry: "_Entry", length: int):
+        """
+        Copy of an entry's KV cache truncated to its first ``length`` tokens.
+
+        The copy is extended in place by the next forward pass, so the
+        cached entry itself is never modified.
+        """
+        past = copy.deepcopy(entry.past_key_values)
+        extra = len(entry.token_ids) - length
+        if extra:
+            past.crop(-extra)
+        return past
+
+    def insert(self, config: Hashable, token_ids: List[int], past_key_values,
+               result: Dict[str, torch.Tensor]):
+        """
+        Store a prompt's KV cache and flat lens result, then evict past the bound.
+
+        Args:
+            config: Collection settings the result was made with
+            token_ids: Prompt token ids
+            past_key_values: KV cache covering all of ``token_ids``
+            result: Flat result with topk, tracked, offsets and probs
+        """
+        # Entries outlive the call: keep no autograd graph alive through them
+        past_key_values = _detach(past_key_values)
+        result = _detach(result)
+        token_ids = tuple(token_ids)
+        if (config, token_ids) in self._exact:
+            self._remove(self._exact[config, token_ids])  # Same prompt: replace
+
+        entry = _Entry(self._next_id, config, token_ids, past_key_values, result,
+                       _nbytes(past_key_values) + _nbytes(result))
+        self._next_id += 1
+        node = self._roots.setdefault(config, _Node())
+        node.entries[entry.id] = None
+        for token in token_ids:
+            node = node.children.setdefault(token, _Node())
+            node.entries[entry.id] = None
+        self._exact[config, token_ids] = entry.id
+        self._entries[entry.id] = entry
+        self.nbytes += entry.nbytes
+        self._evict()
+
+    def clear(self):
+        """Drop all entries."""
+        self._roots.clear()
+        self._entries.clear()
+        self._exact.clear()
+        self.nbytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Cache statistics.
+
+        Returns:
+            Dict with hits, misses, evictions, tokens_reused,
+            tokens_computed, entries and size_bytes
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "tokens_reused": self.tokens_reused,
+            "tokens_computed": self.tokens_computed,
+            "entries": len(self._entries),
+            "size_bytes": self.nbytes,
+        }
+
+    def _evict(self):
+        """Drop least recently used entries until under max_bytes."""
+        while self._entries and self.nbytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, entry_id: int):
+        """Unlink an entry from the trie, pruning nodes left without entries."""
+        entry = self._entries.pop(entry_id)
+        del self._exact[entry.config, entry.token_ids]
+        self.nbytes -= entry.nbytes
+        node = self._roots[entry.config]
+        path = [(None, node)]
+        for token in entry.token_ids:
+            node = node.children[token]
+            path.append((token, node))
+        for (_, parent), (token, child) in zip(reversed(path[:-1]), reversed(path[1:])):
+            del child.entries[entry_id]
+            if not child.entries:
+                del parent.children[token]
+        root = path[0][1]
+        del root.entries[entry_id]
+        if not root.entries:
+            del self._roots[entry.config]
+
+
+class _Node:
+    """Trie node: children by token id, and ids of entries below it (in insertion order)."""
+
+    __slots__ = ("children", "entries")
+
+    def __init__(self):
+        self.children: Dict[int, _Node] = {}
+        self.entries: Dict[int, None] = {}
+
+
+class _Entry:
+    """One cached prompt."""
+
+    __slots__ = ("id", "config", "token_ids", "past_key_values", "result", "nbytes")
+
+    def __init__(self, entry_id: int, config: Hashable, token_ids: Tuple[int, ...],
+                 past_key_values, result: Dict[str, torch.Tensor], nbytes: int):
+        self.id = entry_id
+        self.config = config
+        self.token_ids = token_ids
+        self.past_key_values = past_key_values
+        self.result = result
+        self.nbytes = nbytes
+
+
+def _detach(obj: Any, depth: int = 0) -> Any:
+    """Detach the tensors reachable from ``obj`` (a KV cache or dict), in place."""
+    if isinstance(obj, torch.Tensor):
+        return obj.detach()
+    if depth > 4:
+        return obj
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            obj[key] = _detach(value, depth + 1)
+    elif isinstance(obj, list):
+        obj[:] = [_detach(value, depth + 1) for value in obj]
+    elif isinstance(obj, tuple):
+        return tuple(_detach(value, depth + 1) for value in obj)
+    elif hasattr(obj, "__dict__"):
+        for key, value in list(vars(obj).items()):
+            setattr(obj, key, _detach(value, depth + 1))
+    return obj
+
+
+def _nbytes(obj: Any, depth: int = 0) -> int:
+    """Total bytes of the tensors reachable from ``obj`` (a KV cache or dict)."""
+    if isinstance(obj, torch.Tensor):
+        return obj.numel() * obj.element_size()
+    if depth > 4:
+        return 0
+    if isinstance(obj, dict):
+        values = obj.values()
+    elif isinstance(obj, (list, tuple)):
+        values = obj
+    elif hasattr(obj, "__dict__"):
+        values = vars(obj).values()
+    else:
+        return 0
+    return sum(_nbytes(value, depth + 1) for value in values)
@@ -0,0 +1,144 @@
+"""
+Per-stage timing and byte-count instrumentation.
+
+``collect_logit_lens(..., profile=True)`` attaches a Profile to the result as
+``data["profile"]``; to_js_format(), write_logit_lens() and
+show_logit_lens() keep adding their own stages to it. A Profile can also
+forward every measurement to a metrics sink (statsd, Prometheus, a log
+line), as ``sink(name, value)``.
+
+Stages recorded:
+
+    tokenize        client-side tokenization
+    cache_lookup    ResultCache lookup (when a cache is given)
+    trace           the whole ``model.trace`` block (remote: queueing,
+                    forward, server-side reduction and download)
+    forward         waiting for layer outputs inside a local trace
+    projection      norm + lm_head + softmax (local)
+    topk            top-k selection (local)
+    unique_gather   tracked-token unique and trajectory gather (local)
+    split           splitting ragged results per position
+    vocab_decode    decoding tracked token strings
+    to_js_format    conversion to widget JSON
+    write           streaming widget JSON with write_logit_lens()
+    html_embed      JSON serialization and HTML assembly
+
+Byte counts: ``saved`` (tensors saved from the trace, i.e. transferred when
+remote), ``json`` (widget JSON) and ``html``.
+
+Inside a remote trace the body runs on the server, so its stages are only
+seen as ``trace``.
+"""
+
+import time
+from contextlib import nullcontext
+from typing import Callable, Dict, Optional
+
+import torch
+
+
+class Profile:
+    """
+    Accumulated per-stage seconds and byte counts.
+
+    Args:
+        sink: Optional callable receiving each measurement as
+            ``sink(name, value)``, with names ``"<stage>.seconds"`` and
+            ``"<name>.bytes"``
+
+    Example:
+        >>> data = collect_logit_lens(prompt, model, remote=False, profile=True)
+        >>> data["profile"].seconds["projection"]
+        >>> html = show_logit_lens(data)
+        >>> data["profile"].report()["bytes"]["html"]
+    """
+
+    def __init__(self, sink: Optional[Callable[[str, float], None]] = None):
+        self.seconds: Dict[str, float] = {}
+        self.bytes: Dict[str, int] = {}
+        self.sink = sink
+
+    def stage(self, name: str) -> "_Stage":
+        """Time the enclosed block, adding to the stage's total."""
+        return _Stage(self, name)
+
+    def add_seconds(self, name: str, seconds: float):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        if self.sink is not None:
+            self.sink(f"{name}.seconds", seconds)
+
+    def add_bytes(self, name: str, nbytes: int):
+        self.bytes[name] = self.bytes.get(name, 0) + nbytes
+        if self.sink is not None:
+            self.sink(f"{name}.bytes", nbytes)
+
+    def report(self) -> Dict[str, Dict]:
+        """Copy of the measurements: {"seconds": {...}, "bytes": {...}}."""
+        return {"seconds": dict(self.seconds), "bytes": dict(self.bytes)}
+
+    def __repr__(self) -> str:
+        stages = ", ".join(f"{name}={seconds * 1e3:.1f}ms"
+                           for name, seconds in self.seconds.items())
+        sizes = ", ".join(f"{name}={nbytes}B" for name, nbytes in self.bytes.items())
+        return f"Profile({stages}; {sizes})"
+
+
+class _Stage:
+    """
+    Context manager timing one stage of a Profile.
+
+    A plain class rather than a @contextmanager generator: remote requests
+    serialize this package by source (see collect._register_remote), and
+    generator-based context managers cannot be rebuilt from source.
+    """
+
+    __slots__ = ("profile", "name", "start")
+
+    def __init__(self, profile: Profile, name: str):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profile.add_seconds(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def make_profile(profile) -> Optional[Profile]:
+    """
+    Profile for a ``profile=`` argument.
+
+    Args:
+        profile: False/None (no profiling), True, a Profile to add to, or a
+            sink callable
+
+    Returns:
+        A Profile, or None
+    """
+    if profile is None or profile is False:
+        return None
+    if profile is True:
+        return Profile()
+    if isinstance(profile, Profile):
+        return profile
+    if callable(profile):
+        return Profile(sink=profile)
+    raise ValueError(f"profile must be a bool, a Profile or a callable, got {profile!r}")
+
+
+def timed(profile: Optional[Profile], name: str):
+    """``profile.stage(name)``, or a no-op context when not profiling."""
+    return profile.stage(name) if profile is not None else nullcontext()
+
+
+def tensor_bytes(value) -> int:
+    """Total bytes of the tensors in a (possibly nested) dict or list."""
+    if isinstance(value, torch.Tensor):
+        return value.numel() * value.element_size()
+    if isinstance(value, dict):
+        return sum(tensor_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(tensor_bytes(v) for v in value)
+    return 0
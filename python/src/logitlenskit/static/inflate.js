@@ -0,0 +1,154 @@
+/**
+ * Decode widget data embedded by show_logit_lens() as base64 zlib.
+ *
+ * Uses the browser's DecompressionStream where available; otherwise falls
+ * back to a small inflate (RFC 1951, after Mark Adler's puff.c).
+ */
+function logitLensInflate(b64) {
+    var bin = atob(b64), bytes = new Uint8Array(bin.length);
+    for (var i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    if (typeof DecompressionStream !== 'undefined') {
+        var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+        return new Response(stream).text();
+    }
+    return new Promise(function(resolve) {
+        // Skip the 2-byte zlib header; the adler32 trailer is not checked
+        resolve(new TextDecoder().decode(inflateRaw(bytes.subarray(2))));
+    });
+
+    function inflateRaw(data) {
+        var LBASE = [3, 4, 5, 6, 7, 8, 9, 10, 11, 13, 15, 17, 19, 23, 27, 31, 35, 43, 51, 59,
+                     67, 83, 99, 115, 131, 163, 195, 227, 258];
+        var LEXT = [0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 3, 3, 3, 3, 4, 4, 4, 4,
+                    5, 5, 5, 5, 0];
+        var DBASE = [1, 2, 3, 4, 5, 7, 9, 13, 17, 25, 33, 49, 65, 97, 129, 193, 257, 385, 513,
+                     769, 1025, 1537, 2049, 3073, 4097, 6145, 8193, 12289, 16385, 24577];
+        var DEXT = [0, 0, 0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 5, 5, 6, 6, 7, 7, 8, 8, 9, 9, 10, 10,
+                    11, 11, 12, 12, 13, 13];
+        var ORDER = [16, 17, 18, 0, 8, 7, 9, 6, 10, 5, 11, 4, 12, 3, 13, 2, 14, 1, 15];
+        var inPos = 0, bitBuf = 0, bitCnt = 0;
+        var out = new Uint8Array(data.length * 4), outPos = 0;
+        var fixedLit = null, fixedDist = null;
+
+        function bits(n) {
+            while (bitCnt < n) {
+                if (inPos >= data.length) throw new Error('inflate: truncated data');
+                bitBuf |= data[inPos++] << bitCnt;
+                bitCnt += 8;
+            }
+            var value = bitBuf & ((1 << n) - 1);
+            bitBuf >>>= n;
+            bitCnt -= n;
+            return value;
+        }
+
+        function reserve(n) {
+            if (outPos + n <= out.length) return;
+            var grown = new Uint8Array(Math.max(out.length * 2, outPos + n));
+            grown.set(out);
+            out = grown;
+        }
+
+        // Canonical Huffman code from code lengths: symbols ordered by code
+        function build(lengths) {
+            var counts = new Uint16Array(16), offsets = new Uint16Array(16);
+            var symbols = new Uint16Array(lengths.length), i;
+            for (i = 0; i < lengths.length; i++) counts[lengths[i]]++;
+            counts[0] = 0;
+            for (i = 1; i < 16; i++) offsets[i] = offsets[i - 1] + counts[i - 1];
+            for (i = 0; i < lengths.length; i++) {
+                if (lengths[i]) symbols[offsets[lengths[i]]++] = i;
+            }
+            return {counts: counts, symbols: symbols};
+        }
+
+        function decode(code) {
+            var value = 0, first = 0, index = 0;
+            for (var len = 1; len < 16; len++) {
+                value |= bits(1);
+                var count = code.counts[len];
+                if (value - count < first) return code.symbols[index + (value - first)];
+                index += count;
+                first = (first + count) << 1;
+                value <<= 1;
+            }
+            throw new Error('inflate: invalid code');
+        }
+
+        function dynamicCodes() {
+            var nlen = bits(5) + 257, ndist = bits(5) + 1, ncode = bits(4) + 4;
+            var lengths = [], i;
+            for (i = 0; i < 19; i++) lengths.push(0);
+            for (i = 0; i < ncode; i++) lengths[ORDER[i]] = bits(3);
+            var lengthCode = build(lengths);
+            lengths = [];
+            while (lengths.length < nlen + ndist) {
+                var symbol = decode(lengthCode);
+                if (symbol < 16) {
+                    lengths.push(symbol);
+                    continue;
+                }
+                var value = 0, repeat;
+                if (symbol === 16) {
+                    value = lengths[lengths.length - 1];
+                    repeat = 3 + bits(2);
+                } else if (symbol === 17) {
+                    repeat = 3 + bits(3);
+                } else {
+                    repeat = 11 + bits(7);
+                }
+                while (repeat--) lengths.push(value);
+            }
+            return [build(lengths.slice(0, nlen)), build(lengths.slice(nlen))];
+        }
+
+        function fixedCodes() {
+            if (!fixedLit) {
+                var lengths = [], i;
+                for (i = 0; i < 288; i++) lengths.push(i < 144 ? 8 : i < 256 ? 9 : i < 280 ? 7 : 8);
+                fixedLit = build(lengths);
+                lengths = [];
+                for (i = 0; i < 30; i++) lengths.push(5);
+                fixedDist = build(lengths);
+            }
+            return [fixedLit, fixedDist];
+        }
+
+        var last;
+        do {
+            last = bits(1);
+            var type = bits(2);
+            if (type === 0) {
+                // Stored block: byte-aligned length, its complement, then raw bytes
+                bitBuf = 0;
+                bitCnt = 0;
+                var len = data[inPos] | (data[inPos + 1] << 8);
+                inPos += 4;
+                reserve(len);
+                out.set(data.subarray(inPos, inPos + len), outPos);
+                outPos += len;
+                inPos += len;
+                continue;
+            }
+            if (type === 3) throw new Error('inflate: invalid block type');
+            var codes = type === 1 ? fixedCodes() : dynamicCodes();
+            for (;;) {
+                var symbol = decode(codes[0]);
+                if (symbol < 256) {
+                    reserve(1);
+                    out[outPos++] = symbol;
+                } else if (symbol === 256) {
+                    break;
+                } else {
+                    symbol -= 257;
+                    var length = LBASE[symbol] + bits(LEXT[symbol]);
+                    var distSymbol = decode(codes[1]);
+                    var distance = DBASE[distSymbol] + bits(DEXT[distSymbol]);
+                    reserve(length);
+                    for (var i = 0; i < length; i++, outPos++) out[outPos] = out[outPos - distance];
+                }
+            }
+        } while (!last);
+        return out.subarray(0, outPos);
+    }
+}
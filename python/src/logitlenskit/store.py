@@ -0,0 +1,458 @@
+"""
+Memory-mapped columnar store for corpus-scale logit lens datasets.
+
+Each collect_logit_lens() result becomes one row. Its arrays are appended to
+flat little-endian column files, and a fixed-size index record maps the row
+to its ranges in each column. Readers memory-map the columns, so any row is
+an O(1) lookup and its arrays are zero-copy numpy views (or torch tensors
+sharing the same memory).
+
+Directory layout::
+
+    meta.json        store settings: format version, model, probs dtype
+    index.bin        one _INDEX_DTYPE record per row (the commit log)
+    keys.jsonl       one JSON string per row: the row's key (e.g. prompt id)
+    vocab.jsonl      [token_id, string] lines, each id written once
+    topk.bin         int32    [n_layers * n_pos * k] per row
+    tracked.bin      int32    [n_tracked] per row
+    offsets.bin      int64    [n_pos + 1] per row, relative to the row
+    probs.bin        float32 | float16  [n_layers * n_tracked] per row
+    layers.bin       int32    [n_layers] per row
+    input.bin        UTF-8 bytes of input token strings
+    input_ends.bin   int64    [n_pos] per row, end offset of each string
+
+One writer may append while any number of readers read. The writer appends
+all column data first and the index record last, so a reader never sees a
+row whose data is incomplete; readers call refresh() to pick up new rows.
+The writer tracks its own appends in memory and re-maps the columns lazily,
+on the next read, so appending N rows costs O(N) rather than re-reading the
+store each time. A writer that crashed mid-append leaves trailing bytes that
+the next writer truncates on open.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+import numpy as np
+import torch
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from .utils import _to_numpy, split_ragged
+
+
+_FORMAT_VERSION = 1
+_INDEX_DTYPE = np.dtype([
+    ("topk", "<i8"),
+    ("tracked", "<i8"),
+    ("offsets", "<i8"),
+    ("probs", "<i8"),
+    ("layers", "<i8"),
+    ("input", "<i8"),
+    ("n_layers", "<i4"),
+    ("n_pos", "<i4"),
+    ("k", "<i4"),
+    ("n_tracked", "<i4"),
+])
+_COLUMN_DTYPES = {
+    "topk": np.dtype("<i4"),
+    "tracked": np.dtype("<i4"),
+    "offsets": np.dtype("<i8"),
+    "layers": np.dtype("<i4"),
+    "input_ends": np.dtype("<i8"),
+    "input": np.dtype("u1"),
+}
+PROBS_DTYPES = ("float32", "float16")
+
+
+class LensStore:
+    """
+    Append-only, memory-mapped store of logit lens results.
+
+    Args:
+        path: Store directory (created in append mode if missing)
+        mode: "r" to read, "a" to append (and read)
+        probs_dtype: Trajectory storage dtype for a new store, "float32"
+            (default) or "float16"
+
+    Example:
+        >>> with LensStore("corpus.lens", mode="a") as store:
+        ...     for pid, prompt in prompts:
+        ...         store.append(collect_logit_lens(prompt, model), key=pid)
+        >>> store = LensStore("corpus.lens")
+        >>> store["prompt-17"]["probs"][3]  # zero-copy view
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        mode: str = "r",
+        probs_dtype: str = "float32",
+    ):
+        if mode not in ("r", "a"):
+            raise ValueError(f"Unknown mode: {mode}. Expected 'r' or 'a'.")
+        self.path = Path(path)
+        self.mode = mode
+        self._lock = None
+
+        if mode == "a":
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._acquire_lock()
+            if not (self.path / "meta.json").exists():
+                if probs_dtype not in PROBS_DTYPES:
+                    raise ValueError(
+                        f"Unknown probs_dtype: {probs_dtype}. Supported: {list(PROBS_DTYPES)}"
+                    )
+                self._write_meta({
+                    "version": _FORMAT_VERSION, "model": None, "probs_dtype": probs_dtype,
+                })
+        elif not (self.path / "meta.json").exists():
+            raise FileNotFoundError(f"No logit lens store at {self.path}")
+
+        self.meta = json.loads((self.path / "meta.json").read_text())
+        if self.meta["version"] != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported store version: {self.meta['version']}")
+        self._probs_dtype = np.dtype(self.meta["probs_dtype"]).newbyteorder("<")
+
+        self._keys: List[str] = []
+        self._key_rows: Dict[str, int] = {}
+        self._keys_bytes = 0
+        self.vocab: Dict[int, str] = {}
+        self._vocab_bytes = 0
+        if mode == "a":
+            self._recover()
+        self.refresh()
+        if mode == "a":
+            # Column ends in items (input: bytes), advanced by each append
+            self._ends = {
+                name: _file_size(self.path / f"{name}.bin") // dtype.itemsize
+                for name, dtype in _COLUMN_DTYPES.items()
+            }
+            self._ends["probs"] = (
+                _file_size(self.path / "probs.bin") // self._probs_dtype.itemsize
+            )
+
+    # -- Reading -----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self._n_rows
+
+    def __getitem__(self, row: Union[int, str]) -> Dict:
+        """Row by number or key, in collect_logit_lens() format (torch views)."""
+        return self.get(row)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in range(len(self)):
+            yield self.get(row)
+
+    def keys(self) -> List[str]:
+        """Row keys, in row order."""
+        return list(self._keys)
+
+    def refresh(self):
+        """Re-map columns and pick up rows committed since the last refresh."""
+        self._n_rows = _file_size(self.path / "index.bin") // _INDEX_DTYPE.itemsize
+        self._remap()
+
+        if len(self._keys) < self._n_rows:
+            with open(self.path / "keys.jsonl", "rb") as f:
+                f.seek(self._keys_bytes)
+                chunk = f.read()
+            # Keys are written before the index record; take committed rows only
+            lines = chunk.split(b"\n")[:self._n_rows - len(self._keys)]
+            for line in lines:
+                self._add_key(json.loads(line))
+                self._keys_bytes += len(line) + 1
+
+        vocab_path = self.path / "vocab.jsonl"
+        if _file_size(vocab_path) > self._vocab_bytes:
+            with open(vocab_path, "rb") as f:
+                f.seek(self._vocab_bytes)
+                chunk = f.read()
+            # Only consume complete lines; a writer may be mid-line
+            complete = chunk[:chunk.rfind(b"\n") + 1]
+            for line in complete.decode("utf-8").splitlines():
+                token_id, string = json.loads(line)
+                self.vocab[token_id] = string
+            self._vocab_bytes += len(complete)
+
+    def row_arrays(self, row: Union[int, str]) -> Dict[str, np.ndarray]:
+        """
+        Zero-copy numpy views of one row's arrays.
+
+        Returns:
+            Dict with topk [n_layers, n_pos, k], tracked [n_tracked],
+            offsets [n_pos + 1], probs [n_layers, n_tracked] and layers
+        """
+        self._ensure_mapped()
+        rec = self._index[self._row_number(row)]
+        n_layers, n_pos, k, n_tracked = (
+            int(rec["n_layers"]), int(rec["n_pos"]), int(rec["k"]), int(rec["n_tracked"])
+        )
+        cols = self._columns
+        return {
+            "topk": _slice(cols["topk"], rec["topk"], n_layers * n_pos * k)
+            .reshape(n_layers, n_pos, k),
+            "tracked": _slice(cols["tracked"], rec["tracked"], n_tracked),
+            "offsets": _slice(cols["offsets"], rec["offsets"], n_pos + 1),
+            "probs": _slice(cols["probs"], rec["probs"], n_layers * n_tracked)
+            .reshape(n_layers, n_tracked),
+            "layers": _slice(cols["layers"], rec["layers"], n_layers),
+        }
+
+    def get(self, row: Union[int, str]) -> Dict:
+        """
+        One row in collect_logit_lens() format.
+
+        Tensors share memory with the memory-mapped files (copy-on-write),
+        and ``vocab`` is the store-wide vocabulary (a superset of the row's).
+        """
+        row = self._row_number(row)
+        arrays = self.row_arrays(row)  # Maps any rows appended since the last read
+        rec = self._index[row]
+
+        ends = _slice(self._columns["input_ends"], rec["input"], int(rec["n_pos"]))
+        blob = self._columns["input"]
+        tokens = []
+        start = self._input_start(row)
+        for end in ends.tolist():
+            tokens.append(blob[start:end].tobytes().decode("utf-8"))
+            start = end
+
+        tracked, probs = split_ragged(
+            torch.from_numpy(arrays["tracked"]),
+            torch.from_numpy(arrays["probs"]),
+            arrays["offsets"],
+        )
+        return {
+            "model": self.meta["model"],
+            "input": tokens,
+            "layers": arrays["layers"].tolist(),
+            "topk": torch.from_numpy(arrays["topk"]),
+            "tracked": tracked,
+            "probs": probs,
+            "vocab": self.vocab,
+        }
+
+    def column(self, name: str) -> np.ndarray:
+        """Whole flat column (memory-mapped), e.g. for corpus-wide statistics."""
+        self._ensure_mapped()
+        return self._columns[name]
+
+    # -- Writing -----------------------------------------------------------
+
+    def append(self, data: Dict, key: Optional[str] = None) -> int:
+        """
+        Append one collect_logit_lens() result as a new row.
+
+        Args:
+            data: Result in collect_logit_lens() format
+            key: Optional unique key (e.g. prompt id) for lookup
+
+        Returns:
+            The new row number
+        """
+        if self.mode != "a":
+            raise ValueError("Store is open read-only; use mode='a' to append")
+        if key is not None and key in self._key_rows:
+            raise KeyError(f"Duplicate key: {key}")
+        if self.meta["model"] is None:
+            self.meta["model"] = data["model"]
+            self._write_meta(self.meta)
+        elif data["model"] != self.meta["model"]:
+            raise ValueError(
+                f"Store holds {self.meta['model']}, cannot append {data['model']}"
+            )
+
+        topk = _to_numpy(data["topk"]).astype("<i4")
+        n_layers, n_pos, k = topk.shape
+        tracked = [_to_numpy(t).astype("<i4") for t in data["tracked"]]
+        counts = [len(t) for t in tracked]
+        offsets = np.cumsum([0] + counts, dtype="<i8")
+        probs = (
+            np.concatenate([_to_numpy(p) for p in data["probs"]], axis=1)
+            if counts else np.zeros((n_layers, 0))
+        ).astype(self._probs_dtype)
+        inputs = [s.encode("utf-8") for s in data["input"]]
+
+        ends = self._ends
+        input_start = ends["input"]
+
+        record = np.zeros(1, dtype=_INDEX_DTYPE)
+        for name in ("topk", "tracked", "offsets", "probs", "layers"):
+            record[name] = ends[name]
+        record["input"] = ends["input_ends"]
+        record["n_layers"], record["n_pos"], record["k"] = n_layers, n_pos, k
+        record["n_tracked"] = int(offsets[-1])
+
+        # Column data first; the index record last commits the row
+        _append(self.path / "topk.bin", topk.tobytes())
+        _append(self.path / "tracked.bin", b"".join(t.tobytes() for t in tracked))
+        _append(self.path / "offsets.bin", offsets.tobytes())
+        _append(self.path / "probs.bin", np.ascontiguousarray(probs).tobytes())
+        _append(self.path / "layers.bin", np.asarray(data["layers"], dtype="<i4").tobytes())
+        _append(self.path / "input.bin", b"".join(inputs))
+        _append(self.path / "input_ends.bin", (
+            input_start + np.cumsum([len(s) for s in inputs], dtype="<i8")
+        ).astype("<i8").tobytes())
+
+        new_vocab = [(int(i), s) for i, s in data["vocab"].items() if int(i) not in self.vocab]
+        if new_vocab:
+            vocab_lines = "".join(
+                json.dumps([i, s]) + "\n" for i, s in new_vocab
+            ).encode("utf-8")
+            _append(self.path / "vocab.jsonl", vocab_lines)
+            self.vocab.update(new_vocab)
+            self._vocab_bytes += len(vocab_lines)
+        key_line = (json.dumps(key) + "\n").encode("utf-8")
+        _append(self.path / "keys.jsonl", key_line)
+        _append(self.path / "index.bin", record.tobytes())
+
+        # Track the new row in memory; columns are re-mapped on the next read
+        self._add_key(key)
+        self._keys_bytes += len(key_line)
+        for name, count in (("topk", topk.size), ("tracked", int(offsets[-1])),
+                            ("offsets", n_pos + 1), ("probs", probs.size),
+                            ("layers", n_layers), ("input_ends", n_pos),
+                            ("input", sum(len(s) for s in inputs))):
+            ends[name] += count
+        self._n_rows += 1
+        return self._n_rows - 1
+
+    def close(self):
+        """Release the writer lock."""
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+    def __enter__(self) -> "LensStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -- Internals ---------------------------------------------------------
+
+    def _remap(self):
+        """Memory-map the index and every column as they are on disk."""
+        self._index = _map(self.path / "index.bin", _INDEX_DTYPE, self._n_rows)
+        self._columns = {
+            name: _map(self.path / f"{name}.bin", dtype)
+            for name, dtype in _COLUMN_DTYPES.items()
+        }
+        self._columns["probs"] = _map(self.path / "probs.bin", self._probs_dtype)
+        self._mapped_rows = self._n_rows
+
+    def _ensure_mapped(self):
+        """Re-map after this writer's appends, once, before the next read."""
+        if self._mapped_rows != self._n_rows:
+            self._remap()
+
+    def _add_key(self, key: Optional[str]):
+        if key is not None:
+            self._key_rows[key] = len(self._keys)
+        self._keys.append(key)
+
+    def _row_number(self, row: Union[int, str]) -> int:
+        if isinstance(row, str):
+            return self._key_rows[row]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(f"Row {row} out of range for store of {len(self)} rows")
+        return row
+
+    def _input_start(self, row: int) -> int:
+        """Byte offset where the row's first input string starts."""
+        first = int(self._index[row]["input"])
+        return 0 if first == 0 else int(self._columns["input_ends"][first - 1])
+
+    def _write_meta(self, meta: Dict):
+        tmp = self.path / "meta.json.tmp"
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, self.path / "meta.json")
+
+    def _acquire_lock(self):
+        """Take the single-writer lock (Unix only; no-op elsewhere)."""
+        self._lock = open(self.path / "write.lock", "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._lock.close()
+                self._lock = None
+                raise RuntimeError(f"Another writer has {self.path} open") from None
+
+    def _recover(self):
+        """Truncate data left behind by an append that never committed."""
+        n_rows = _file_size(self.path / "index.bin") // _INDEX_DTYPE.itemsize
+        _truncate(self.path / "index.bin", n_rows * _INDEX_DTYPE.itemsize)
+        index = _map(self.path / "index.bin", _INDEX_DTYPE, n_rows)
+
+        ends = {name: 0 for name in (*_COLUMN_DTYPES, "probs")}
+        if n_rows:
+            rec = index[-1]
+            n_layers, n_pos, k, n_tracked = (
+                int(rec["n_layers"]), int(rec["n_pos"]), int(rec["k"]), int(rec["n_tracked"])
+            )
+            ends["topk"] = (int(rec["topk"]) + n_layers * n_pos * k) * 4
+            ends["tracked"] = (int(rec["tracked"]) + n_tracked) * 4
+            ends["offsets"] = (int(rec["offsets"]) + n_pos + 1) * 8
+            ends["probs"] = (int(rec["probs"]) + n_layers * n_tracked) * self._probs_dtype.itemsize
+            ends["layers"] = (int(rec["layers"]) + n_layers) * 4
+            ends["input_ends"] = (int(rec["input"]) + n_pos) * 8
+            input_ends = _map(self.path / "input_ends.bin", _COLUMN_DTYPES["input_ends"])
+            ends["input"] = int(input_ends[int(rec["input"]) + n_pos - 1]) if n_pos else (
+                int(input_ends[int(rec["input"]) - 1]) if int(rec["input"]) else 0
+            )
+        for name, end in ends.items():
+            _truncate(self.path / f"{name}.bin", end)
+
+        keys_path = self.path / "keys.jsonl"
+        if keys_path.exists():
+            lines = keys_path.read_bytes().split(b"\n")[:n_rows]
+            keys_path.write_bytes(b"".join(line + b"\n" for line in lines))
+        vocab_path = self.path / "vocab.jsonl"
+        if vocab_path.exists():
+            data = vocab_path.read_bytes()
+            vocab_path.write_bytes(data[:data.rfind(b"\n") + 1])
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _map(path: Path, dtype: np.dtype, count: Optional[int] = None) -> np.ndarray:
+    """Copy-on-write memory map of the first ``count`` items (default: all)."""
+    available = _file_size(path) // dtype.itemsize
+    count = available if count is None else min(count, available)
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="c", shape=(count,))
+
+
+def _slice(column: np.ndarray, start, count: int) -> np.ndarray:
+    start = int(start)
+    return column[start:start + count]
+
+
+def _append(path: Path, data: bytes):
+    with open(path, "ab") as f:
+        f.write(data)
+        f.flush()
+
+
+def _truncate(path: Path, size: int):
+    if _file_size(path) > size:
+        with open(path, "r+b") as f:
+            f.truncate(size)
+    elif not path.exists():
+        path.touch()
@@ -1,5 +1,10 @@
 """Utility functions for logitlenskit."""
 
+from typing import List, Tuple
+
+import numpy as np
+import torch
+
 
 def get_value(saved):
     """
@@ -19,3 +24,38 @@ def get_value(saved):
         return saved.value
     except AttributeError:
         return saved
+
+
+def split_ragged(tracked, values, offsets) -> Tuple[List, List]:
+    """
+    Split flat ragged tracked/trajectory tensors into per-position lists.
+
+    Position ``p`` owns ``tracked[offsets[p]:offsets[p + 1]]`` and the same
+    column range of ``values``. The returned tensors are views, not copies.
+
+    Args:
+        tracked: Tensor [n_tracked_total] of token indices
+        values: Tensor [n_layers, n_tracked_total] of trajectories
+        offsets: Tensor or list [n_pos + 1] of start offsets per position
+
+    Returns:
+        Tuple (tracked_list, values_list) with one entry per position:
+        Tensor[n_tracked] and Tensor[n_layers, n_tracked]
+
+    Example:
+        >>> tracked, probs = split_ragged(flat_ids, flat_probs, offsets)
+        >>> probs[3][:, 0]  # Trajectory of first tracked token at position 3
+    """
+    offsets = [int(o) for o in offsets]
+    counts = [end - start for start, end in zip(offsets[:-1], offsets[1:])]
+    return list(tracked.split(counts)), list(values.split(counts, dim=-1))
+
+
+def _to_numpy(values) -> np.ndarray:
+    """Convert a tensor (any device, bfloat16 included) or array to numpy."""
+    if isinstance(values, torch.Tensor):
+        values = values.detach().cpu()
+        if values.dtype == torch.bfloat16:
+            values = values.float()  # exact; numpy has no bfloat16
+        return values.numpy()
+    return np.asarray(values)
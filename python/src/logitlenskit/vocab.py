@@ -0,0 +1,198 @@
+"""
+Persistent token decode cache shared across collection calls.
+
+Decoding token ids one ``tokenizer.decode([i])`` call at a time is slow, and
+a corpus run decodes the same few thousand ids over and over. A VocabCache
+remembers every id it has decoded, decodes misses in one ``batch_decode``
+call, and can precompute the whole vocabulary into a compact string table
+that is saved to disk and memory-mapped on later startups.
+
+Caches are shared per tokenizer: get_vocab_cache() returns the same cache
+for the same tokenizer object, or for any tokenizer loaded from the same
+``name_or_path`` with the same vocabulary size.
+
+Table file layout (little-endian)::
+
+    b"LLVT"            magic
+    uint32             format version (1)
+    uint64             n_tokens
+    uint64 [n + 1]     byte offsets into blob
+    bytes              concatenated UTF-8 strings
+"""
+
+import os
+import struct
+import weakref
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+
+TABLE_MAGIC = b"LLVT"
+_TABLE_VERSION = 1
+_HEADER = struct.Struct("<4sIQ")
+
+
+class VocabCache:
+    """
+    Cache of decoded token strings for one tokenizer.
+
+    Args:
+        tokenizer: HuggingFace-style tokenizer with ``decode`` (and ideally
+            ``batch_decode``)
+        weak: Hold the tokenizer by weak reference, so a cache stored in a
+            per-tokenizer weak registry does not keep the tokenizer alive
+
+    Example:
+        >>> cache = get_vocab_cache(model.tokenizer)
+        >>> cache.decode([464, 3139])  # ['The', ' capital']
+        >>> cache.save("gpt2.vocab")   # decodes the full vocab once
+    """
+
+    def __init__(self, tokenizer, weak: bool = False):
+        self._tokenizer = weakref.ref(tokenizer) if weak else (lambda: tokenizer)
+        self._strings: Dict[int, str] = {}
+        self._offsets: Optional[np.ndarray] = None
+        self._blob: Optional[np.ndarray] = None
+
+    @property
+    def tokenizer(self):
+        """The tokenizer this cache decodes with."""
+        return self._tokenizer()
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        """
+        Decode each id as a single token, like ``[tokenizer.decode([i]) for i in ids]``.
+
+        Ids not yet cached are decoded together in one batch.
+        """
+        ids = [int(i) for i in ids]
+        missing = sorted({i for i in ids if self._lookup(i) is None})
+        if missing:
+            self._strings.update(zip(missing, self._decode_uncached(missing)))
+        return [self._lookup(i) for i in ids]
+
+    def decode_map(self, ids: Iterable[int]) -> Dict[int, str]:
+        """Decode ids into a {id: string} dict."""
+        ids = sorted({int(i) for i in ids})
+        return dict(zip(ids, self.decode(ids)))
+
+    def precompute(self, vocab_size: Optional[int] = None, batch_size: int = 8192):
+        """
+        Decode the whole vocabulary into the cache.
+
+        Args:
+            vocab_size: Number of ids to decode (default: ``len(tokenizer)``)
+            batch_size: Ids per batch_decode call
+        """
+        if vocab_size is None:
+            vocab_size = len(self.tokenizer)
+        for start in range(0, vocab_size, batch_size):
+            self.decode(range(start, min(start + batch_size, vocab_size)))
+
+    def save(self, path: Union[str, os.PathLike], vocab_size: Optional[int] = None):
+        """
+        Write the full vocabulary as a string table, precomputing it if needed.
+
+        Args:
+            path: Output file
+            vocab_size: Number of ids to store (default: ``len(tokenizer)``)
+        """
+        if vocab_size is None:
+            vocab_size = len(self.tokenizer)
+        self.precompute(vocab_size)
+        encoded = [s.encode("utf-8") for s in self.decode(range(vocab_size))]
+        offsets = np.cumsum([0] + [len(s) for s in encoded], dtype="<u8")
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(TABLE_MAGIC, _TABLE_VERSION, vocab_size))
+            f.write(offsets.tobytes())
+            f.write(b"".join(encoded))
+
+    def load(self, path: Union[str, os.PathLike], mmap: bool = True) -> "VocabCache":
+        """
+        Use a string table written by save() for lookups.
+
+        Args:
+            path: Table file
+            mmap: Memory-map the table instead of reading it into memory
+
+        Returns:
+            self
+        """
+        with open(path, "rb") as f:
+            magic, version, n_tokens = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != TABLE_MAGIC or version != _TABLE_VERSION:
+            raise ValueError(f"Not a logit lens vocab table: {path}")
+
+        if mmap:
+            data = np.memmap(path, dtype=np.uint8, mode="r")
+        else:
+            data = np.fromfile(path, dtype=np.uint8)
+        offsets_end = _HEADER.size + 8 * (n_tokens + 1)
+        self._offsets = data[_HEADER.size:offsets_end].view("<u8")
+        self._blob = data[offsets_end:]
+        return self
+
+    def _lookup(self, token_id: int) -> Optional[str]:
+        """Cached string for an id, or None."""
+        if self._offsets is not None and 0 <= token_id < len(self._offsets) - 1:
+            start, end = self._offsets[token_id], self._offsets[token_id + 1]
+            return self._blob[start:end].tobytes().decode("utf-8")
+        return self._strings.get(token_id)
+
+    def _decode_uncached(self, ids: List[int]) -> List[str]:
+        """Decode ids with the tokenizer, batched when the tokenizer supports it."""
+        if callable(getattr(type(self.tokenizer), "batch_decode", None)):
+            return list(self.tokenizer.batch_decode([[i] for i in ids]))
+        return [self.tokenizer.decode([i]) for i in ids]
+
+
+_CACHES_BY_NAME: Dict[tuple, VocabCache] = {}
+_CACHES_BY_TOKENIZER: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def get_vocab_cache(tokenizer, table_path: Optional[Union[str, os.PathLike]] = None) -> VocabCache:
+    """
+    Get the shared VocabCache for a tokenizer, creating it on first use.
+
+    Tokenizers with a ``name_or_path`` share a cache by (name, vocab size);
+    others are cached by object identity for as long as they are alive.
+
+    Args:
+        tokenizer: HuggingFace-style tokenizer
+        table_path: Optional string table from VocabCache.save(); loaded
+            (memory-mapped) if the file exists
+
+    Returns:
+        VocabCache for the tokenizer
+    """
+    key = _name_key(tokenizer)
+    if key is not None:
+        cache = _CACHES_BY_NAME.get(key)
+        if cache is None:
+            cache = _CACHES_BY_NAME[key] = VocabCache(tokenizer)
+    else:
+        cache = _CACHES_BY_TOKENIZER.get(tokenizer)
+        if cache is None:
+            cache = _CACHES_BY_TOKENIZER[tokenizer] = VocabCache(tokenizer, weak=True)
+
+    if table_path is not None and cache._offsets is None and os.path.exists(table_path):
+        cache.load(table_path)
+    return cache
+
+
+def clear_vocab_caches():
+    """Drop all shared VocabCaches."""
+    _CACHES_BY_NAME.clear()
+    _CACHES_BY_TOKENIZER.clear()
+
+
+def _name_key(tokenizer) -> Optional[tuple]:
+    """(name_or_path, vocab size) for named tokenizers, else None."""
+    name = getattr(tokenizer, "name_or_path", None)
+    if not isinstance(name, str) or not name:
+        return None
+    try:
+        return (name, len(tokenizer))
+    except TypeError:
+        return None
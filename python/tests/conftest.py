@@ -54,3 +54,69 @@ def sample_widget_data():
             ] * 4
         ] * 4
     }
+
+
+def build_tiny_model():
+    """
+    Tiny randomly initialized GPT-2 wrapped in nnterp, for offline tests.
+
+    Uses a word-level tokenizer over tokens "t2".."t99" (ids 0 and 1 are the
+    special tokens), so prompts look like "t5 t6 t7" and each word is exactly
+    one token. Also usable as a ``module:function`` model factory
+    (``conftest:build_tiny_model``) in subprocesses.
+    """
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+    from nnterp import StandardizedTransformer
+
+    torch.manual_seed(0)
+    vocab_size = 100
+    config = GPT2Config(
+        n_layer=4, n_embd=32, n_head=2, vocab_size=vocab_size, n_positions=128,
+        bos_token_id=1, eos_token_id=1,
+    )
+    hf_model = GPT2LMHeadModel(config).eval()
+
+    vocab = {"<unk>": 0, "<eos>": 1}
+    vocab.update({f"t{i}": i for i in range(2, vocab_size)})
+    word_level = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    word_level.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=word_level,
+        unk_token="<unk>", pad_token="<unk>", bos_token="<eos>", eos_token="<eos>",
+    )
+    return StandardizedTransformer(
+        hf_model, tokenizer=tokenizer, check_attn_probs_with_trace=False
+    )
+
+
+@pytest.fixture(scope="session")
+def tiny_model():
+    """Session-wide build_tiny_model() instance."""
+    pytest.importorskip("nnterp")
+    pytest.importorskip("torch")
+    return build_tiny_model()
+
+
+@pytest.fixture(scope="session")
+def raw_model(tiny_model):
+    """The tiny model's weights wrapped as a raw nnsight LanguageModel."""
+    from nnsight import LanguageModel
+    return LanguageModel(tiny_model._model, tokenizer=tiny_model.tokenizer)
+
+
+def assert_same_result(a, b, atol=1e-6):
+    """Two collect_logit_lens results should match field by field."""
+    import torch
+
+    assert a["input"] == b["input"]
+    assert a["layers"] == b["layers"]
+    assert torch.equal(a["topk"], b["topk"])
+    assert len(a["tracked"]) == len(b["tracked"])
+    for ta, tb in zip(a["tracked"], b["tracked"]):
+        assert torch.equal(ta, tb)
+    for pa, pb in zip(a["probs"], b["probs"]):
+        assert pa.dtype == pb.dtype
+        assert torch.allclose(pa.float(), pb.float(), atol=atol)
+    assert a["vocab"] == b["vocab"]
@@ -0,0 +1,181 @@
+"""Tests for the asyncio collection API, using a stand-in backend with latency."""
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+import torch
+
+from logitlenskit.aio import acollect_logit_lens, acollect_many
+from logitlenskit.collect import collect_logit_lens
+
+
+class StandInBackend:
+    """Blocking collect() replacement that sleeps like a remote round-trip."""
+
+    def __init__(self, latency=0.05, failures=None, error=ConnectionError):
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.error = error
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, model, **kwargs):
+        with self._lock:
+            self.calls.append(prompt)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            latency = self.latency(prompt) if callable(self.latency) else self.latency
+            time.sleep(latency)
+            with self._lock:
+                if self.failures.get(prompt, 0) > 0:
+                    self.failures[prompt] -= 1
+                    raise self.error(f"simulated failure for {prompt}")
+            return {"model": model, "input": [prompt], "kwargs": kwargs}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+async def collect_all(agen):
+    return [item async for item in agen]
+
+
+class TestAcollectLogitLens:
+    """Test the single-prompt coroutine."""
+
+    def test_passes_kwargs(self):
+        backend = StandInBackend(latency=0.01)
+        result = asyncio.run(acollect_logit_lens("p", "m", k=3, collect=backend))
+        assert result == {"model": "m", "input": ["p"], "kwargs": {"k": 3}}
+
+    def test_retries_then_succeeds(self):
+        backend = StandInBackend(latency=0.0, failures={"p": 2})
+        result = asyncio.run(acollect_logit_lens("p", "m", backoff=0.001, collect=backend))
+        assert result["input"] == ["p"]
+        assert backend.calls == ["p"] * 3
+
+    def test_gives_up_after_retries(self):
+        backend = StandInBackend(latency=0.0, failures={"p": 5})
+        with pytest.raises(ConnectionError):
+            asyncio.run(acollect_logit_lens("p", "m", retries=1, backoff=0.001, collect=backend))
+        assert len(backend.calls) == 2
+
+    def test_no_retry_on_other_errors(self):
+        backend = StandInBackend(latency=0.0, failures={"p": 1}, error=ValueError)
+        with pytest.raises(ValueError):
+            asyncio.run(acollect_logit_lens("p", "m", backoff=0.001, collect=backend))
+        assert len(backend.calls) == 1
+
+    @pytest.mark.parametrize("error", [FileNotFoundError, PermissionError])
+    def test_no_retry_on_local_os_errors(self, error):
+        backend = StandInBackend(latency=0.0, failures={"p": 1}, error=error)
+        with pytest.raises(error):
+            asyncio.run(acollect_logit_lens("p", "m", backoff=0.001, collect=backend))
+        assert len(backend.calls) == 1
+
+    def test_retries_transport_errors(self):
+        httpx = pytest.importorskip("httpx")
+        backend = StandInBackend(latency=0.0, failures={"p": 1}, error=httpx.ConnectError)
+        result = asyncio.run(acollect_logit_lens("p", "m", backoff=0.001, collect=backend))
+        assert result["input"] == ["p"]
+        assert len(backend.calls) == 2
+
+    def test_import_defers_transport_modules(self):
+        code = ("import sys, logitlenskit.aio; "
+                "assert 'httpx' not in sys.modules and 'socketio' not in sys.modules")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        subprocess.run([sys.executable, "-c", code], check=True, env=env)
+
+    def test_real_model_matches_sync(self, tiny_model):
+        prompt = "t5 t6 t7"
+        expected = collect_logit_lens(prompt, tiny_model, k=3, remote=False)
+        result = asyncio.run(acollect_logit_lens(prompt, tiny_model, k=3, remote=False))
+        assert torch.equal(result["topk"], expected["topk"])
+        for a, b in zip(result["probs"], expected["probs"]):
+            assert torch.allclose(a, b)
+
+
+class TestAcollectMany:
+    """Test concurrency limit, completion order, retries and backpressure."""
+
+    def test_concurrent_and_bounded(self):
+        backend = StandInBackend(latency=0.05)
+        prompts = [f"p{i}" for i in range(12)]
+        start = time.perf_counter()
+        results = asyncio.run(collect_all(
+            acollect_many(prompts, "m", concurrency=4, collect=backend)
+        ))
+        elapsed = time.perf_counter() - start
+
+        assert sorted(i for i, _ in results) == list(range(12))
+        assert all(r["input"] == [prompts[i]] for i, r in results)
+        assert backend.peak == 4
+        assert elapsed < 12 * 0.05 * 0.6  # well below the sequential time
+
+    def test_yields_in_completion_order(self):
+        backend = StandInBackend(latency=lambda p: {"slow": 0.2, "fast": 0.01}[p])
+        results = asyncio.run(collect_all(
+            acollect_many(["slow", "fast"], "m", concurrency=2, collect=backend)
+        ))
+        assert [i for i, _ in results] == [1, 0]
+
+    def test_backpressure(self):
+        backend = StandInBackend(latency=0.0)
+        pulled = []
+
+        def prompts():
+            for i in range(10):
+                pulled.append(i)
+                yield f"p{i}"
+
+        async def consume():
+            agen = acollect_many(prompts(), "m", concurrency=2, collect=backend)
+            await agen.__anext__()
+            await asyncio.sleep(0.05)  # slow consumer
+            n_pulled = len(pulled)
+            await agen.aclose()
+            return n_pulled
+
+        assert asyncio.run(consume()) <= 3
+        assert len(backend.calls) <= 3
+
+    def test_async_iterable_prompts(self):
+        async def prompts():
+            for i in range(5):
+                yield f"p{i}"
+
+        backend = StandInBackend(latency=0.01)
+        results = asyncio.run(collect_all(
+            acollect_many(prompts(), "m", concurrency=3, collect=backend)
+        ))
+        assert sorted(i for i, _ in results) == list(range(5))
+
+    def test_retries_and_return_exceptions(self):
+        backend = StandInBackend(latency=0.0, failures={"p1": 1, "p2": 9})
+        results = dict(asyncio.run(collect_all(acollect_many(
+            ["p0", "p1", "p2"], "m", retries=2, backoff=0.001,
+            return_exceptions=True, collect=backend,
+        ))))
+        assert results[0]["input"] == ["p0"]
+        assert results[1]["input"] == ["p1"]
+        assert isinstance(results[2], ConnectionError)
+
+    def test_raises_and_cancels(self):
+        backend = StandInBackend(latency=0.01, failures={"p0": 9}, error=RuntimeError)
+        with pytest.raises(RuntimeError):
+            asyncio.run(collect_all(acollect_many(
+                [f"p{i}" for i in range(20)], "m", concurrency=2, collect=backend,
+            )))
+        assert len(backend.calls) < 20
+
+    def test_invalid_concurrency(self):
+        with pytest.raises(ValueError):
+            asyncio.run(collect_all(acollect_many(["p"], "m", concurrency=0)))
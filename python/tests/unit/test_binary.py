@@ -0,0 +1,108 @@
+"""Tests for the binary V3 wire format."""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+
+from logitlenskit.binary import decode_v3, encode_v3, read_v3
+from logitlenskit.display import to_js_format
+
+
+FIXTURES = Path(__file__).parent.parent.parent.parent / "js" / "tests" / "fixtures"
+
+
+@pytest.fixture
+def python_data():
+    """Small collect_logit_lens()-format result with non-contiguous ids."""
+    return {
+        "model": "test/model",
+        "input": ["The", " cat"],
+        "layers": [0, 2, 4],
+        "topk": torch.tensor([
+            [[10, 500]], [[500, 7]], [[7, 10]],
+        ], dtype=torch.int32).reshape(3, 1, 2).repeat(1, 2, 1),
+        "tracked": [
+            torch.tensor([7, 10, 500], dtype=torch.int32),
+            torch.tensor([7, 10, 500], dtype=torch.int32),
+        ],
+        "probs": [
+            torch.tensor([[0.1, 0.5, 0.2], [0.3, 0.0, 0.6], [0.9, 0.05, 0.01]]),
+            torch.tensor([[0.2, 0.4, 0.1], [0.25, 0.125, 0.5], [1.0, 1e-7, 0.0]]),
+        ],
+        "vocab": {7: " on", 10: " sat", 500: " été"},
+    }
+
+
+class TestRoundTrip:
+    """Encode then decode should preserve data up to quantization."""
+
+    def test_float32_exact(self, python_data):
+        restored = decode_v3(encode_v3(python_data, quantization="float32"))
+
+        assert restored["model"] == "test/model"
+        assert restored["input"] == python_data["input"]
+        assert restored["layers"] == python_data["layers"]
+        assert restored["vocab"] == python_data["vocab"]
+        assert torch.equal(restored["topk"], python_data["topk"])
+        for a, b in zip(restored["tracked"], python_data["tracked"]):
+            assert torch.equal(a, b)
+        for a, b in zip(restored["probs"], python_data["probs"]):
+            assert torch.equal(a, b)
+
+    def test_unselected_cells_stay_unselected(self, python_data):
+        python_data["topk"][:, 1, :] = -1
+        restored = decode_v3(encode_v3(python_data, quantization="float32"))
+        assert torch.equal(restored["topk"], python_data["topk"])
+
+    def test_float16(self, python_data):
+        restored = decode_v3(encode_v3(python_data, quantization="float16"))
+        for a, b in zip(restored["probs"], python_data["probs"]):
+            assert torch.allclose(a, b, atol=1e-3)
+
+    def test_uint8_log(self, python_data):
+        blob = encode_v3(python_data, quantization="uint8-log", log_floor=1e-6)
+        restored = decode_v3(blob)
+        for a, b in zip(restored["probs"], python_data["probs"]):
+            big = b >= 1e-6
+            assert torch.all(a[~big] == 0)
+            assert torch.allclose(a[big], b[big], rtol=0.03)
+        assert restored["quantization"] == {"scheme": "uint8-log", "floor": 1e-6}
+
+    def test_decoded_converts_to_js(self, python_data):
+        restored = decode_v3(encode_v3(python_data, quantization="float32"))
+        assert to_js_format(restored) == to_js_format(python_data)
+
+    def test_from_js_format(self):
+        v2 = json.loads((FIXTURES / "sample-data-v2.json").read_text())
+        restored = decode_v3(encode_v3(v2, quantization="float32"))
+        js = to_js_format(restored)
+        assert js["input"] == v2["input"]
+        assert js["topk"] == v2["topk"]
+        assert js["tracked"] == v2["tracked"]
+
+
+class TestLayout:
+    """Test the header and section layout."""
+
+    def test_sections_aligned(self, python_data):
+        blob = encode_v3(python_data)
+        header, arrays = read_v3(blob)
+        assert header["version"] == 3
+        assert header["quantization"] == {"scheme": "float16"}
+        body_start = 8 + int.from_bytes(blob[4:8], "little")
+        assert body_start % 8 == 0
+        for entry in header["sections"]:
+            assert entry["offset"] % 8 == 0
+        assert arrays["topk"].dtype == np.int32
+        assert arrays["trajectories"].dtype == np.float16
+
+    def test_bad_magic(self):
+        with pytest.raises(ValueError, match="bad magic"):
+            decode_v3(b"JUNKJUNK")
+
+    def test_unknown_quantization(self, python_data):
+        with pytest.raises(ValueError, match="Unknown quantization"):
+            encode_v3(python_data, quantization="int4")
@@ -0,0 +1,179 @@
+"""Tests for the on-disk result cache."""
+
+import os
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+import torch
+
+from logitlenskit.cache import ResultCache
+from logitlenskit.collect import collect_logit_lens
+
+
+def make_result(n_pos=3, seed=0):
+    gen = torch.Generator().manual_seed(seed)
+    return {
+        "model": "test/model",
+        "input": [f"w{i}" for i in range(n_pos)],
+        "layers": [0, 1],
+        "topk": torch.randint(0, 20, (2, n_pos, 2), generator=gen, dtype=torch.int32),
+        "tracked": [torch.arange(i, i + 3, dtype=torch.int32) for i in range(n_pos)],
+        "probs": [torch.rand(2, 3, generator=gen) for _ in range(n_pos)],
+        "vocab": {i: f"tok{i}" for i in range(25)},
+    }
+
+
+class TestResultCache:
+    """Test ResultCache get/put, keys, stats and eviction."""
+
+    def test_round_trip_lossless(self, tmp_path):
+        cache = ResultCache(tmp_path)
+        result = make_result()
+        key = cache.key("m", [1, 2, 3], 2, [0, 1])
+        assert cache.get(key) is None
+        cache.put(key, result)
+
+        hit = cache.get(key)
+        assert hit.keys() == result.keys()
+        assert hit["input"] == result["input"]
+        assert torch.equal(hit["topk"], result["topk"])
+        for a, b in zip(hit["probs"], result["probs"]):
+            assert torch.equal(a, b)
+
+    def test_key_depends_on_every_field(self, tmp_path):
+        cache = ResultCache(tmp_path)
+        base = cache.key("m", [1, 2], 5, [0, 1])
+        assert base == cache.key("m", [1, 2], 5, [0, 1])
+        assert base != cache.key("m2", [1, 2], 5, [0, 1])
+        assert base != cache.key("m", [1, 3], 5, [0, 1])
+        assert base != cache.key("m", [1, 2], 4, [0, 1])
+        assert base != cache.key("m", [1, 2], 5, [0])
+        assert base != cache.key("m", [1, 2], 5, [0, 1], positions=[-1])
+
+    def test_stats(self, tmp_path):
+        cache = ResultCache(tmp_path)
+        key = cache.key("m", [1], 2, [0])
+        cache.get(key)
+        written = cache.put(key, make_result())
+        cache.get(key)
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["bytes_written"] == written
+        assert stats["bytes_read"] == written
+        assert stats["entries"] == 1
+        assert stats["size_bytes"] == written
+
+    def test_put_under_budget_skips_scan(self, tmp_path, monkeypatch):
+        cache = ResultCache(tmp_path)
+        cache.put(cache.key("m", [0], 2, [0]), make_result())
+        monkeypatch.setattr(cache, "_evict", Mock(side_effect=AssertionError("scanned")))
+        for i in range(1, 4):
+            cache.put(cache.key("m", [i], 2, [0]), make_result(seed=i))
+        cache.put(cache.key("m", [0], 2, [0]), make_result())  # Overwrite
+        assert cache._total == cache.stats()["size_bytes"]
+
+    def test_lru_eviction(self, tmp_path):
+        cache = ResultCache(tmp_path, max_bytes=10**9)
+        keys = [cache.key("m", [i], 2, [0]) for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.put(key, make_result(seed=i))
+            os.utime(cache._path(key), ns=(i * 10**9, i * 10**9))
+        cache.get(keys[0])  # Most recently used now
+
+        entry_size = cache.stats()["size_bytes"] // 3
+        cache.max_bytes = 2 * entry_size
+        cache.put(cache.key("m", [9], 2, [0]), make_result(seed=9))
+
+        assert cache.get(keys[0]) is not None
+        assert cache.get(keys[1]) is None
+        assert cache.stats()["evictions"] == 2
+
+
+class TestCollectWithCache:
+    """collect_logit_lens should use the cache around the trace."""
+
+    def test_hit_skips_trace(self, tiny_model, tmp_path):
+        cache = ResultCache(tmp_path)
+        first = collect_logit_lens("t5 t6 t7", tiny_model, k=3, remote=False, cache=cache)
+
+        model = Mock(wraps=tiny_model)
+        model.tokenizer = tiny_model.tokenizer
+        model.num_layers = tiny_model.num_layers
+        model.config = tiny_model.config
+        model.trace.side_effect = AssertionError("trace should not run on a hit")
+        second = collect_logit_lens("t5 t6 t7", model, k=3, remote=False, cache=cache)
+
+        assert second["input"] == first["input"]
+        assert torch.equal(second["topk"], first["topk"])
+        assert cache.stats()["hits"] == 1
+
+    def test_positions_round_trip(self, tiny_model, tmp_path):
+        cache = ResultCache(tmp_path)
+        first = collect_logit_lens("t5 t6 t7", tiny_model, k=3, remote=False, cache=cache,
+                                   positions=[1])
+        second = collect_logit_lens("t5 t6 t7", tiny_model, k=3, remote=False, cache=cache,
+                                    positions=[1])
+
+        assert cache.stats()["hits"] == 1
+        assert (first["topk"][:, [0, 2]] == -1).all()
+        assert torch.equal(second["topk"], first["topk"])
+
+    def test_numpy_positions(self, tiny_model, tmp_path):
+        cache = ResultCache(tmp_path)
+        first = collect_logit_lens("t5 t6 t7", tiny_model, k=3, remote=False, cache=cache,
+                                   positions=np.array([1], dtype=np.int64))
+        second = collect_logit_lens("t5 t6 t7", tiny_model, k=3, remote=False, cache=cache,
+                                    positions=[1])
+
+        assert cache.stats()["hits"] == 1
+        assert torch.equal(second["topk"], first["topk"])
+
+    @pytest.mark.parametrize("options", [
+        {"fused": True},
+        {"memory_budget": 4096},
+        {"lens_head": True},
+        {"precision": "bf16"},
+    ])
+    def test_options_keyed(self, tiny_model, tmp_path, options):
+        cache = ResultCache(tmp_path)
+        collect_logit_lens("t5 t6 t7", tiny_model, k=3, remote=False, cache=cache)
+        collect_logit_lens("t5 t6 t7", tiny_model, k=3, remote=False, cache=cache, **options)
+        assert cache.stats()["hits"] == 0
+        assert cache.stats()["entries"] == 2
+
+    def test_hit_skips_lens_head_fold(self, tiny_model, tmp_path, monkeypatch):
+        import logitlenskit.lens
+
+        cache = ResultCache(tmp_path)
+        first = collect_logit_lens("t5 t6 t7", tiny_model, k=3, remote=False, cache=cache,
+                                   lens_head=True)
+        monkeypatch.setattr(logitlenskit.lens, "get_lens_head",
+                            Mock(side_effect=AssertionError("folded on a hit")))
+        second = collect_logit_lens("t5 t6 t7", tiny_model, k=3, remote=False, cache=cache,
+                                    lens_head=True)
+        assert cache.stats()["hits"] == 1
+        assert torch.equal(second["topk"], first["topk"])
+
+    @pytest.mark.parametrize("options", [{}, {"adaptive": True}])
+    def test_hit_keeps_probs_dtype(self, tiny_model, tmp_path, options):
+        cache = ResultCache(tmp_path)
+        first = collect_logit_lens("t5 t6 t7", tiny_model, k=3, remote=False, cache=cache,
+                                   probs_dtype="float16", **options)
+        second = collect_logit_lens("t5 t6 t7", tiny_model, k=3, remote=False, cache=cache,
+                                    probs_dtype="float16", **options)
+        assert cache.stats()["hits"] == 1
+        for a, b in zip(first["probs"], second["probs"]):
+            assert b.dtype == torch.float16
+            assert torch.equal(a, b)
+
+    def test_adaptive_keyed_on_probs_dtype(self, tiny_model, tmp_path):
+        cache = ResultCache(tmp_path)
+        full = collect_logit_lens("t5 t6 t7", tiny_model, k=3, remote=False, cache=cache,
+                                  adaptive=True)
+        half = collect_logit_lens("t5 t6 t7", tiny_model, k=3, remote=False, cache=cache,
+                                  adaptive=True, probs_dtype="float16")
+        assert cache.stats()["hits"] == 0
+        assert full["probs"][0].dtype == torch.float32
+        assert half["probs"][0].dtype == torch.float16
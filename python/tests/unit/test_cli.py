@@ -0,0 +1,118 @@
+"""Tests for the resumable corpus runner and CLI."""
+
+import io
+import json
+
+import pytest
+import torch
+
+import logitlenskit.collect
+from logitlenskit.cli import main, run_corpus
+from logitlenskit.collect import collect_logit_lens
+from logitlenskit.store import LensStore
+
+MODEL = "conftest:build_tiny_model"
+
+
+def write_prompts(path, n, start=0):
+    with open(path, "w") as f:
+        for i in range(start, start + n):
+            words = " ".join(f"t{2 + (i * 7 + j) % 90}" for j in range(3 + i % 4))
+            f.write(json.dumps({"id": f"p{i}", "prompt": words}) + "\n")
+    return path
+
+
+def read_prompts(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def assert_matches_direct(store, prompts, model):
+    for record in prompts:
+        expected = collect_logit_lens(record["prompt"], model, k=3, remote=False)
+        row = store[record["id"]]
+        assert row["input"] == expected["input"]
+        assert torch.equal(row["topk"], expected["topk"])
+        for a, b in zip(row["probs"], expected["probs"]):
+            assert torch.allclose(a, b, atol=1e-6)
+
+
+class TestRunCorpus:
+    """Test local runs, resume and reporting."""
+
+    def test_local_run(self, tmp_path, tiny_model):
+        prompts = write_prompts(tmp_path / "prompts.jsonl", 10)
+        log = io.StringIO()
+        totals = run_corpus(str(prompts), MODEL, str(tmp_path / "out"), k=3,
+                            shard_size=4, log=log)
+        assert totals["done"] == 10 and totals["failed"] == 0
+        assert totals["tokens"] == sum(3 + i % 4 for i in range(10))
+        assert totals["bytes_written"] > 0
+        assert "prompts/s" in log.getvalue() and "tokens/s" in log.getvalue()
+
+        store = LensStore(tmp_path / "out")
+        assert sorted(store.keys()) == sorted(f"p{i}" for i in range(10))
+        assert_matches_direct(store, read_prompts(prompts), tiny_model)
+
+    def test_resume_skips_completed(self, tmp_path):
+        prompts = tmp_path / "prompts.jsonl"
+        write_prompts(prompts, 4)
+        run_corpus(str(prompts), MODEL, str(tmp_path / "out"), k=3, log=io.StringIO())
+
+        write_prompts(prompts, 7)
+        totals = run_corpus(str(prompts), MODEL, str(tmp_path / "out"), k=3,
+                            log=io.StringIO())
+        assert totals["skipped"] == 4 and totals["done"] == 3
+        assert len(LensStore(tmp_path / "out")) == 7
+
+    def test_resume_rejects_changed_settings(self, tmp_path):
+        prompts = write_prompts(tmp_path / "prompts.jsonl", 2)
+        run_corpus(str(prompts), MODEL, str(tmp_path / "out"), k=3, log=io.StringIO())
+        with pytest.raises(ValueError):
+            run_corpus(str(prompts), MODEL, str(tmp_path / "out"), k=5, log=io.StringIO())
+
+    def test_process_pool(self, tmp_path, tiny_model):
+        prompts = write_prompts(tmp_path / "prompts.jsonl", 6)
+        totals = run_corpus(str(prompts), MODEL, str(tmp_path / "out"), k=3,
+                            workers=2, shard_size=2, log=io.StringIO())
+        assert totals["done"] == 6
+        assert_matches_direct(LensStore(tmp_path / "out"), read_prompts(prompts), tiny_model)
+
+    def test_remote_queue_records_failures(self, tmp_path, monkeypatch):
+        def fake_remote(prompt, model, remote, **kwargs):
+            if prompt.startswith("t9"):
+                raise RuntimeError("server error")
+            return collect_logit_lens(prompt, model, remote=False, **kwargs)
+
+        monkeypatch.setattr(logitlenskit.collect, "collect_logit_lens", fake_remote)
+        prompts = tmp_path / "prompts.jsonl"
+        prompts.write_text(
+            '{"id": "ok", "prompt": "t5 t6"}\n{"id": "bad", "prompt": "t9 t6"}\n'
+        )
+        log = io.StringIO()
+        totals = run_corpus(str(prompts), MODEL, str(tmp_path / "out"), k=3,
+                            remote=True, concurrency=2, log=log)
+        assert totals["done"] == 1 and totals["failed"] == 1
+        assert "failed bad" in log.getvalue()
+        # Failed prompts are not checkpointed, so a rerun retries them
+        assert LensStore(tmp_path / "out").keys() == ["ok"]
+
+    def test_duplicate_ids(self, tmp_path):
+        prompts = tmp_path / "prompts.jsonl"
+        prompts.write_text('{"id": 1, "prompt": "t5"}\n{"id": 1, "prompt": "t6"}\n')
+        with pytest.raises(ValueError):
+            run_corpus(str(prompts), MODEL, str(tmp_path / "out"))
+
+
+class TestMain:
+    """Test the argparse entry point."""
+
+    def test_run_command(self, tmp_path, capsys):
+        prompts = write_prompts(tmp_path / "prompts.jsonl", 3)
+        code = main(["run", str(prompts), "--model", MODEL, "--out", str(tmp_path / "out"),
+                     "-k", "2", "--layers", "0,3"])
+        assert code == 0
+        assert "[3/3]" in capsys.readouterr().err
+        row = LensStore(tmp_path / "out")["p0"]
+        assert row["layers"] == [0, 3]
+        assert row["topk"].shape[-1] == 2
@@ -0,0 +1,400 @@
+"""Tests for collection functions against a tiny offline model."""
+
+import weakref
+
+import numpy as np
+import pytest
+import torch
+
+from conftest import assert_same_result
+from logitlenskit.collect import (
+    collect_logit_lens,
+    collect_logit_lens_batch,
+    generate_logit_lens,
+    iter_logit_lens,
+    merge_logit_lens,
+    _generate_stepwise,
+    _generate_traced,
+    _plan_micro_batches,
+    _ragged_trajectories,
+    _streaming_lens,
+)
+from logitlenskit.models import get_model_plan
+from logitlenskit.utils import split_ragged
+
+
+def loop_trajectories(all_probs, topk):
+    """Reference per-position unique/stack loop that the ragged path replaces."""
+    n_layers, n_pos = topk.shape[0], topk.shape[1]
+    tracked, probs = [], []
+    for pos in range(n_pos):
+        unique = torch.unique(topk[:, pos, :].flatten()).to(torch.int32)
+        tracked.append(unique)
+        probs.append(torch.stack([all_probs[li][pos, unique] for li in range(n_layers)]))
+    return tracked, probs
+
+
+class TestCollectLogitLens:
+    """Test collect_logit_lens on a local model."""
+
+    def test_result_shapes(self, tiny_model):
+        data = collect_logit_lens("t5 t6 t7", tiny_model, k=3, remote=False)
+
+        assert data["input"] == ["t5", "t6", "t7"]
+        assert data["layers"] == [0, 1, 2, 3]
+        assert data["topk"].shape == (4, 3, 3)
+        assert data["topk"].dtype == torch.int32
+        assert len(data["tracked"]) == 3
+        for tracked, probs in zip(data["tracked"], data["probs"]):
+            assert probs.shape == (4, len(tracked))
+
+    def test_layer_subset(self, tiny_model):
+        data = collect_logit_lens("t5 t6", tiny_model, layers=[1, 3], remote=False)
+        assert data["layers"] == [1, 3]
+        assert data["topk"].shape[0] == 2
+
+    @pytest.mark.parametrize("options", [
+        {}, {"fused": True}, {"memory_budget": 4096}, {"adaptive": True},
+        {"positions": [0, 2]}, {"probs_dtype": "float16"},
+    ])
+    def test_no_autograd_graph(self, tiny_model, options):
+        data = collect_logit_lens("t5 t6 t7", tiny_model, k=3, remote=False, **options)
+        assert not any(p.requires_grad for p in data["probs"])
+
+
+class TestCollectLogitLensBatch:
+    """Test batched collection against single-prompt collection."""
+
+    PROMPTS = ["t5 t6 t7 t8", "t9", "t10 t11", "t12 t13 t14", "t3 t4 t5 t6 t7"]
+
+    def test_matches_single_prompt(self, tiny_model):
+        batched = collect_logit_lens_batch(
+            self.PROMPTS, tiny_model, k=3, remote=False
+        )
+        assert len(batched) == len(self.PROMPTS)
+        for prompt, result in zip(self.PROMPTS, batched):
+            single = collect_logit_lens(prompt, tiny_model, k=3, remote=False)
+            assert_same_result(result, single, atol=1e-5)
+
+    def test_without_unembedding_matrix(self, tiny_model, monkeypatch):
+        # Tracked probabilities are re-projected where the matrix is unavailable
+        def unavailable(self):
+            raise ValueError("no unembedding")
+        monkeypatch.setattr(type(get_model_plan(tiny_model)), "unembedding", unavailable)
+        batched = collect_logit_lens_batch(self.PROMPTS, tiny_model, k=3, remote=False)
+        for prompt, result in zip(self.PROMPTS, batched):
+            single = collect_logit_lens(prompt, tiny_model, k=3, remote=False)
+            assert_same_result(result, single, atol=1e-6)
+
+    def test_one_layer_of_probabilities_at_a_time(self, tiny_model, monkeypatch):
+        live = []
+        log_softmax = torch.log_softmax
+
+        def tracking_log_softmax(x, *args, **kwargs):
+            out = log_softmax(x, *args, **kwargs)
+            if out.shape[-1] == 100 and out.dim() == 3:
+                live.append(weakref.ref(out))
+                assert sum(ref() is not None for ref in live) <= 1
+            return out
+
+        monkeypatch.setattr(torch, "log_softmax", tracking_log_softmax)
+        collect_logit_lens_batch(self.PROMPTS, tiny_model, k=3, remote=False)
+        assert len(live) >= 4
+
+    def test_small_budget_splits_batches(self, tiny_model):
+        batched = collect_logit_lens_batch(
+            self.PROMPTS, tiny_model, k=2, layers=[0, 2], remote=False,
+            token_budget=5,
+        )
+        assert [r["input"] for r in batched] == [p.split() for p in self.PROMPTS]
+
+
+class TestPlanMicroBatches:
+    """Test micro-batch planning from prompt lengths."""
+
+    def test_fits_budget(self):
+        lengths = [10, 3, 7, 2, 9, 4]
+        batches = _plan_micro_batches(lengths, token_budget=20)
+        assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+        for batch in batches:
+            if len(batch) > 1:
+                assert len(batch) * max(lengths[i] for i in batch) <= 20
+
+    def test_long_prompt_runs_alone(self):
+        batches = _plan_micro_batches([50, 2, 2], token_budget=10)
+        assert [0] in batches
+
+    def test_batch_size_cap(self):
+        batches = _plan_micro_batches([1] * 7, token_budget=100, batch_size=3)
+        assert [len(b) for b in batches] == [3, 3, 1]
+
+
+class TestFusedProjection:
+    """Test the fused all-layer projection mode."""
+
+    def test_matches_per_layer(self, tiny_model):
+        prompt = "t5 t6 t7 t8 t9"
+        loop = collect_logit_lens(prompt, tiny_model, k=4, remote=False)
+        fused = collect_logit_lens(prompt, tiny_model, k=4, remote=False, fused=True)
+        assert_same_result(fused, loop, atol=1e-6)
+
+    def test_layer_subset(self, tiny_model):
+        fused = collect_logit_lens(
+            "t5 t6", tiny_model, layers=[0, 3], remote=False, fused=True
+        )
+        assert fused["topk"].shape == (2, 2, 5)
+        assert fused["probs"][0].shape[0] == 2
+
+
+class TestRaggedTrajectories:
+    """Test vectorized unique/gather against the per-position loop."""
+
+    @pytest.mark.parametrize("n_layers,n_pos,vocab,k", [
+        (1, 1, 10, 1), (4, 7, 50, 3), (12, 33, 200, 5), (3, 5, 8, 8),
+    ])
+    def test_matches_loop(self, n_layers, n_pos, vocab, k):
+        torch.manual_seed(n_layers * 100 + n_pos)
+        probs = torch.softmax(torch.randn(n_layers, n_pos, vocab), dim=-1)
+        topk = probs.topk(k, dim=-1).indices.to(torch.int32)
+
+        expected_tracked, expected_probs = loop_trajectories(probs, topk)
+        for all_probs in (probs, list(probs)):
+            tracked, offsets, values = _ragged_trajectories(all_probs, topk)
+            assert offsets.shape == (n_pos + 1,)
+            assert values.shape == (n_layers, tracked.shape[0])
+            got_tracked, got_probs = split_ragged(tracked, values, offsets)
+            for a, b in zip(got_tracked, expected_tracked):
+                assert torch.equal(a, b)
+            for a, b in zip(got_probs, expected_probs):
+                assert torch.equal(a, b)
+
+    def test_collect_matches_loop(self, tiny_model):
+        prompt = "t5 t6 t7 t8"
+        data = collect_logit_lens(prompt, tiny_model, k=3, remote=False)
+        all_probs = []
+        with tiny_model.trace(prompt, remote=False):
+            for li in range(tiny_model.num_layers):
+                logits = tiny_model.lm_head(
+                    tiny_model.ln_final(tiny_model.layers_output[li]))
+                all_probs.append(torch.softmax(logits[0], dim=-1).save())
+        expected_tracked, expected_probs = loop_trajectories(all_probs, data["topk"])
+        for a, b in zip(data["tracked"], expected_tracked):
+            assert torch.equal(a, b)
+        for a, b in zip(data["probs"], expected_probs):
+            assert torch.allclose(a, b, atol=1e-6)
+
+
+class TestStreamingLens:
+    """Test the vocabulary-chunked, memory-bounded projection mode."""
+
+    @pytest.mark.parametrize("memory_budget", [1, 4096, 10**9])
+    def test_matches_full_softmax(self, tiny_model, memory_budget):
+        prompt = "t5 t6 t7 t8"
+        full = collect_logit_lens(prompt, tiny_model, k=4, remote=False)
+        streamed = collect_logit_lens(
+            prompt, tiny_model, k=4, remote=False, memory_budget=memory_budget
+        )
+        assert_same_result(streamed, full, atol=1e-6)
+        assert streamed["probs"][0].dtype == torch.float32
+
+    def test_no_autograd_graph(self, tiny_model):
+        # Each chunk's logits must be freed, not kept alive by a graph
+        plan = get_model_plan(tiny_model)
+        with tiny_model.trace("t5 t6 t7 t8", remote=False):
+            hidden = torch.stack([plan.layer_output(li)[0] for li in range(4)])
+            result = list(_streaming_lens(plan, hidden, 3, 4096)).save()
+        assert not any(t.requires_grad for t in result)
+
+
+class TestWindowedCollection:
+    """Test position-windowed collection and merging."""
+
+    PROMPT = " ".join(f"t{i}" for i in range(10, 27))
+
+    @pytest.mark.parametrize("window", [1, 5, 17, 100])
+    def test_merged_matches_full(self, tiny_model, window):
+        full = collect_logit_lens(self.PROMPT, tiny_model, k=3, remote=False)
+        parts = list(iter_logit_lens(
+            self.PROMPT, tiny_model, k=3, remote=False, window=window
+        ))
+        assert parts[0]["positions"] == [0, min(window, 17)]
+        assert parts[-1]["positions"][1] == 17
+        assert_same_result(merge_logit_lens(parts), full, atol=1e-6)
+
+    def test_streaming_windows(self, tiny_model):
+        full = collect_logit_lens(self.PROMPT, tiny_model, k=3, remote=False)
+        parts = iter_logit_lens(
+            self.PROMPT, tiny_model, k=3, remote=False, window=4, memory_budget=2048
+        )
+        assert_same_result(merge_logit_lens(parts), full, atol=1e-6)
+
+    def test_hidden_states_hold_no_graph(self, tiny_model):
+        # The generator keeps the hidden states between windows; a graph on
+        # them would keep the whole forward pass alive
+        parts = iter_logit_lens(self.PROMPT, tiny_model, k=3, remote=False, window=4)
+        next(parts)
+        assert not parts.gi_frame.f_locals["hidden"].requires_grad
+        parts.close()
+
+
+class TestRawLanguageModel:
+    """Raw nnsight LanguageModels collect through a ModelPlan from MODEL_CONFIGS."""
+
+    def test_collect_matches_standardized(self, tiny_model, raw_model):
+        prompt = "t5 t6 t7 t8"
+        expected = collect_logit_lens(prompt, tiny_model, k=3, remote=False)
+        for options in ({}, {"fused": True}, {"memory_budget": 4096}):
+            result = collect_logit_lens(prompt, raw_model, k=3, remote=False, **options)
+            assert_same_result(result, expected)
+
+    def test_batch_matches_standardized(self, tiny_model, raw_model):
+        prompts = ["t5 t6", "t7 t8 t9 t10"]
+        expected = collect_logit_lens_batch(prompts, tiny_model, k=2, remote=False)
+        results = collect_logit_lens_batch(prompts, raw_model, k=2, remote=False)
+        for a, b in zip(results, expected):
+            assert_same_result(a, b)
+
+
+class TestAdaptiveLayers:
+    """Adaptive refinement computes a subset of layers, exactly as a fixed run would."""
+
+    PROMPT = "t5 t6 t7 t8 t9"
+
+    def test_zero_tolerance_refines_to_fixed_run(self, tiny_model):
+        adaptive = collect_logit_lens(self.PROMPT, tiny_model, k=3, remote=False,
+                                      adaptive=True, adaptive_stride=3,
+                                      adaptive_tolerance=0.0)
+        fixed = collect_logit_lens(self.PROMPT, tiny_model, k=3, remote=False,
+                                   layers=adaptive["layers"])
+        assert_same_result(adaptive, fixed)
+        assert adaptive["layers"][0] == 0 and adaptive["layers"][-1] == 3
+        assert adaptive["layers"] == sorted(set(adaptive["layers"]))
+
+    def test_large_tolerance_keeps_coarse_layers_when_stable(self, tiny_model, monkeypatch):
+        import logitlenskit.collect as collect
+
+        # Identical predictions at every layer: nothing to refine
+        monkeypatch.setattr(collect.ModelPlan, "layer_output",
+                            lambda self, i: self.model.layers_output[0])
+        result = collect_logit_lens(self.PROMPT, tiny_model, k=3, remote=False,
+                                    adaptive=True, adaptive_stride=2)
+        assert result["layers"] == [0, 2, 3]
+
+    def test_budget(self, tiny_model):
+        result = collect_logit_lens(self.PROMPT, tiny_model, k=3, remote=False,
+                                    adaptive=True, adaptive_stride=3,
+                                    adaptive_tolerance=0.0, layer_budget=3)
+        assert len(result["layers"]) == 3
+        assert result["topk"].shape[0] == 3
+        assert all(p.shape[0] == 3 for p in result["probs"])
+        with pytest.raises(ValueError):
+            collect_logit_lens(self.PROMPT, tiny_model, remote=False, adaptive=True,
+                               adaptive_stride=1, layer_budget=2)
+
+    def test_candidate_layers(self, tiny_model):
+        result = collect_logit_lens(self.PROMPT, tiny_model, k=3, remote=False,
+                                    layers=[1, 2, 3], adaptive=True, adaptive_stride=2,
+                                    adaptive_tolerance=0.0)
+        assert set(result["layers"]) <= {1, 2, 3}
+        assert {1, 3} <= set(result["layers"])
+
+
+class TestPositions:
+    """positions= projects a subset of tokens and keeps the full input."""
+
+    PROMPT = "t5 t6 t7 t8 t9 t10"
+
+    @pytest.mark.parametrize("positions, expected", [
+        (-1, [5]),
+        (slice(1, 3), [1, 2]),
+        ([4, 0, 4], [0, 4]),
+        ([True, False, True, False, False, True], [0, 2, 5]),
+        (torch.tensor([1, -2]), [1, 4]),
+        (np.int64(-1), [5]),
+        (np.array([1, -2]), [1, 4]),
+        (np.array([True, False, True, False, False, True]), [0, 2, 5]),
+    ])
+    @pytest.mark.parametrize("options", [{}, {"fused": True}, {"memory_budget": 4096}])
+    def test_matches_full_run(self, tiny_model, positions, expected, options):
+        full = collect_logit_lens(self.PROMPT, tiny_model, k=3, remote=False)
+        result = collect_logit_lens(self.PROMPT, tiny_model, k=3, remote=False,
+                                    positions=positions, **options)
+
+        assert result["input"] == full["input"]
+        assert result["topk"].shape == full["topk"].shape
+        for pos in range(len(full["input"])):
+            if pos in expected:
+                assert torch.equal(result["topk"][:, pos], full["topk"][:, pos])
+                assert torch.equal(result["tracked"][pos], full["tracked"][pos])
+                assert torch.allclose(result["probs"][pos], full["probs"][pos], atol=1e-6)
+            else:
+                assert (result["topk"][:, pos] == -1).all()
+                assert len(result["tracked"][pos]) == 0
+                assert result["probs"][pos].shape == (4, 0)
+
+    def test_widget_format(self, tiny_model):
+        from logitlenskit.display import to_js_format
+
+        result = collect_logit_lens(self.PROMPT, tiny_model, k=3, remote=False,
+                                    positions=-1)
+        js = to_js_format(result)
+        assert len(js["input"]) == 6
+        assert js["topk"][0][0] == [] and len(js["topk"][0][5]) == 3
+        assert js["tracked"][0] == {} and js["tracked"][5]
+
+    @pytest.mark.parametrize("positions", [
+        6, -7, [], slice(3, 3), [True, False], np.array([], dtype=bool), [0.5],
+    ])
+    def test_invalid(self, tiny_model, positions):
+        with pytest.raises(ValueError):
+            collect_logit_lens(self.PROMPT, tiny_model, remote=False, positions=positions)
+
+
+class TestGenerateLogitLens:
+    """Streamed generation matches greedy generate and a full lens run."""
+
+    PROMPT = "t5 t6 t9"
+
+    def test_parts(self, tiny_model):
+        parts = list(generate_logit_lens(self.PROMPT, tiny_model, max_new_tokens=4,
+                                         k=3, remote=False))
+        assert [part["positions"] for part in parts] == [[0, 3], [3, 4], [4, 5], [5, 6]]
+        assert parts[0]["input"] == ["t5", "t6", "t9"]
+        for previous, part in zip(parts, parts[1:]):
+            assert part["input"] == [previous["generated"]]
+            assert part["topk"].shape == (4, 1, 3)
+
+        with torch.no_grad():
+            output = tiny_model._model.generate(
+                torch.tensor([tiny_model.tokenizer.encode(self.PROMPT)]),
+                max_new_tokens=4, do_sample=False,
+            )
+        expected = tiny_model.tokenizer.convert_ids_to_tokens(output[0, 3:].tolist())
+        assert [part["generated"] for part in parts] == expected
+
+    def test_merged_matches_full(self, tiny_model):
+        parts = list(generate_logit_lens(self.PROMPT, tiny_model, max_new_tokens=4,
+                                         k=3, remote=False))
+        merged = merge_logit_lens(parts)
+        full = collect_logit_lens(" ".join(merged["input"]), tiny_model, k=3, remote=False)
+        assert_same_result(merged, full)
+
+    def test_traced_matches_stepwise(self, tiny_model):
+        plan = get_model_plan(tiny_model)
+        token_ids = tiny_model.tokenizer.encode(self.PROMPT)
+        stepwise = list(_generate_stepwise(tiny_model, plan, token_ids, [0, 3], 3, 4))
+        traced = _generate_traced(tiny_model, plan, token_ids, [0, 3], 3, 4, remote=False)
+        assert len(traced) == len(stepwise)
+        for (fed_a, result_a, next_a), (fed_b, result_b, next_b) in zip(stepwise, traced):
+            assert fed_a == fed_b and next_a == next_b
+            assert torch.equal(result_a["topk"], result_b["topk"])
+            assert torch.allclose(result_a["probs"], result_b["probs"], atol=1e-6)
+
+    def test_stops_at_eos(self, tiny_model, monkeypatch):
+        first = next(generate_logit_lens(self.PROMPT, tiny_model, max_new_tokens=1,
+                                         remote=False))
+        eos = tiny_model.tokenizer.convert_tokens_to_ids(first["generated"])
+        monkeypatch.setattr(type(tiny_model.tokenizer), "eos_token_id", eos, raising=False)
+        parts = list(generate_logit_lens(self.PROMPT, tiny_model, max_new_tokens=4,
+                                         remote=False))
+        assert len(parts) == 1
@@ -0,0 +1,278 @@
+"""Tests for display conversion functions."""
+
+import base64
+import io
+import json
+import re
+import shutil
+import subprocess
+import sys
+import types
+import zlib
+
+import numpy as np
+import pytest
+import torch
+
+from logitlenskit import display as display_module
+from logitlenskit.display import (
+    reset_widget_js, show_logit_lens, to_js_format, write_logit_lens, _round_half_even,
+)
+
+
+def legacy_to_js_format(data):
+    """Reference per-element conversion that to_js_format vectorizes."""
+    vocab = data["vocab"]
+    n_layers = len(data["layers"])
+    n_pos = len(data["input"])
+    topk_js = [
+        [[vocab[idx.item()] for idx in data["topk"][li, pos]]
+         for pos in range(n_pos)]
+        for li in range(n_layers)
+    ]
+    tracked_js = [
+        {
+            vocab[idx.item()]: [round(p, 5) for p in data["probs"][pos][:, i].tolist()]
+            for i, idx in enumerate(data["tracked"][pos])
+        }
+        for pos in range(n_pos)
+    ]
+    return {
+        "meta": {"version": 2, "model": data["model"]},
+        "input": data["input"],
+        "layers": data["layers"],
+        "topk": topk_js,
+        "tracked": tracked_js,
+    }
+
+
+def random_data(n_layers, n_pos, k, vocab_size, dtype=torch.float32, seed=0):
+    """Random collect_logit_lens()-format data."""
+    gen = torch.Generator().manual_seed(seed)
+    probs = torch.softmax(torch.randn(n_layers, n_pos, vocab_size, generator=gen) * 3, -1)
+    topk = probs.topk(k, dim=-1).indices.to(torch.int32)
+    tracked, traj = [], []
+    for pos in range(n_pos):
+        unique = torch.unique(topk[:, pos]).to(torch.int32)
+        tracked.append(unique)
+        traj.append(probs[:, pos, unique].to(dtype))
+    return {
+        "model": "random",
+        "input": [f"w{i}" for i in range(n_pos)],
+        "layers": list(range(n_layers)),
+        "topk": topk,
+        "tracked": tracked,
+        "probs": traj,
+        "vocab": {i: f" tok{i}" for i in range(vocab_size)},
+    }
+
+
+class TestToJsFormat:
+    """to_js_format output should be byte-identical to the per-element version."""
+
+    @pytest.mark.parametrize("dtype", [torch.float32, torch.float16, torch.bfloat16,
+                                       torch.float64])
+    def test_byte_identical(self, dtype):
+        data = random_data(6, 9, 4, 300, dtype=dtype)
+        assert json.dumps(to_js_format(data)) == json.dumps(legacy_to_js_format(data))
+
+    def test_duplicate_token_strings(self):
+        data = random_data(3, 4, 3, 50)
+        data["vocab"] = {i: f"s{i % 7}" for i in range(50)}
+        assert json.dumps(to_js_format(data)) == json.dumps(legacy_to_js_format(data))
+
+    def test_empty_positions(self):
+        data = random_data(2, 1, 2, 10)
+        data["topk"] = torch.zeros((2, 0, 2), dtype=torch.int32)
+        data["input"], data["tracked"], data["probs"] = [], [], []
+        assert to_js_format(data)["tracked"] == []
+
+    def test_negative_topk_padding_skipped(self):
+        data = random_data(2, 2, 3, 10)
+        data["topk"][0, 1, 2] = -1
+        js = to_js_format(data)
+        assert len(js["topk"][0][1]) == 2
+        assert len(js["topk"][1][1]) == 3
+
+
+class TestRoundHalfEven:
+    """Test vectorized rounding against Python's round()."""
+
+    def test_float32_matches_round(self):
+        rng = np.random.default_rng(0)
+        values = (rng.random(100_000) ** 4).astype(np.float32)
+        values[:3] = [0.015625, 0.5, 1.0]  # exact ties and endpoints
+        expected = [round(v, 5) for v in values.tolist()]
+        assert _round_half_even(values, 5).tolist() == expected
+
+    def test_float64_matches_round(self):
+        rng = np.random.default_rng(1)
+        values = rng.random(100_000)
+        values[:2] = [0.123455, 2.675e-05]  # near-ties in float64
+        expected = [round(v, 5) for v in values.tolist()]
+        assert _round_half_even(values, 5).tolist() == expected
+
+
+class TestWriteLogitLens:
+    """Test the streaming JSON/JSONP writer."""
+
+    @staticmethod
+    def compact(obj):
+        return json.dumps(obj, separators=(",", ":"))
+
+    def test_json_matches_to_js_format(self):
+        data = random_data(5, 7, 3, 200)
+        out = io.StringIO()
+        written = write_logit_lens(data, out)
+        assert out.getvalue() == self.compact(to_js_format(data))
+        assert written == len(out.getvalue().encode("utf-8"))
+
+    def test_jsonp_wrapper(self):
+        data = random_data(2, 3, 2, 20)
+        out = io.StringIO()
+        write_logit_lens(data, out, format="jsonp")
+        assert out.getvalue() == (
+            "var PREVIEW_DATA = " + self.compact(to_js_format(data)) + ";\n"
+        )
+
+    def test_binary_target_and_js_input(self):
+        js = to_js_format(random_data(3, 4, 2, 30))
+        js["input"][0] = "caf\u00e9"
+        out = io.BytesIO()
+        written = write_logit_lens(js, out, format="jsonp", var_name="DATA")
+        assert written == len(out.getvalue())
+        assert out.getvalue().decode("utf-8") == "var DATA = " + self.compact(js) + ";\n"
+
+    def test_path_target(self, tmp_path):
+        data = random_data(2, 2, 2, 10)
+        path = tmp_path / "data.json"
+        write_logit_lens(data, path)
+        assert json.loads(path.read_text()) == to_js_format(data)
+
+    def test_unknown_format(self):
+        with pytest.raises(ValueError, match="Unknown format"):
+            write_logit_lens(random_data(1, 1, 1, 5), io.StringIO(), format="xml")
+
+
+class TestShowLogitLens:
+    """The bundled widget script is inlined once per session."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_session(self):
+        reset_widget_js()
+        yield
+        reset_widget_js()
+
+    def test_inlined_once(self):
+        data = random_data(3, 4, 2, 20)
+        first = show_logit_lens(data, container_id="a").data
+        second = show_logit_lens(data, container_id="b").data
+        script = display_module._widget_js()
+        assert script in first and script not in second
+        assert 'LogitLensWidget("#b", data, uiState)' in second
+        assert len(second) < len(first) - len(script) / 2
+
+    def test_inline_js_argument(self):
+        data = random_data(3, 4, 2, 20)
+        script = display_module._widget_js()
+        assert script not in show_logit_lens(data, inline_js=False).data
+        assert script in show_logit_lens(data).data
+        assert script in show_logit_lens(data, inline_js=True).data
+
+    def test_reset(self):
+        data = random_data(3, 4, 2, 20)
+        show_logit_lens(data)
+        reset_widget_js()
+        assert display_module._widget_js() in show_logit_lens(data).data
+
+    def test_colab_always_inlines(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "google.colab", types.ModuleType("google.colab"))
+        data = random_data(3, 4, 2, 20)
+        show_logit_lens(data)
+        assert display_module._widget_js() in show_logit_lens(data).data
+
+    def test_bundled_script(self):
+        script = display_module._widget_js()
+        assert "var LogitLensWidget" in script
+        assert "</" not in script
+
+
+# Runs a page's scripts in order with a stub page; prints the data rendered
+NODE_RENDER = """
+const html = require("fs").readFileSync(0, "utf8");
+const scripts = [...html.matchAll(/<script>([\\s\\S]*?)<\\/script>/g)].map(m => m[1]);
+if (process.argv[1] === "fallback") delete globalThis.DecompressionStream;
+globalThis.document = {getElementById: () => ({})};
+globalThis.LogitLensWidget = (selector, data) => console.log(JSON.stringify(data));
+for (const script of scripts) (0, eval)(script);
+"""
+
+
+class TestCompressedEmbedding:
+    """Large widget data is embedded as base64 zlib."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_session(self):
+        reset_widget_js()
+        yield
+        reset_widget_js()
+
+    def embedded(self, html):
+        match = re.search(r'logitLensInflate\("([A-Za-z0-9+/=]+)"\)', html)
+        return match and json.loads(zlib.decompress(base64.b64decode(match.group(1))))
+
+    def test_threshold(self):
+        small = random_data(2, 3, 2, 20)
+        large = random_data(24, 64, 5, 500)
+        assert self.embedded(show_logit_lens(small, inline_js=False).data) is None
+        html = show_logit_lens(large, inline_js=False).data
+        assert self.embedded(html) == to_js_format(large)
+        assert len(html) < len(json.dumps(to_js_format(large))) / 2
+
+    def test_compress_argument(self):
+        small = random_data(2, 3, 2, 20)
+        large = random_data(24, 64, 5, 500)
+        assert self.embedded(show_logit_lens(small, inline_js=False, compress=True).data)
+        assert self.embedded(show_logit_lens(large, inline_js=False, compress=False).data) is None
+
+    def test_decoder_inlined_once(self):
+        data = random_data(2, 3, 2, 20)
+        decoder = display_module._inflate_js()
+        assert decoder not in show_logit_lens(data, inline_js=False, compress=False).data
+        first = show_logit_lens(data, inline_js=False, compress=True).data
+        second = show_logit_lens(data, inline_js=False, compress=True).data
+        assert decoder in first and decoder not in second
+        assert decoder in show_logit_lens(data, inline_js=True, compress=True).data
+        reset_widget_js()
+        assert decoder in show_logit_lens(data, inline_js=False, compress=True).data
+
+    def test_script_safe(self):
+        data = random_data(2, 3, 2, 20)
+        data["input"][0] = "</script><b>"
+        html = show_logit_lens(data, inline_js=False, compress=False).data
+        assert "</script><b>" not in html
+
+    @pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+    @pytest.mark.parametrize("mode", ["native", "fallback"])
+    @pytest.mark.parametrize("compress", [False, True])
+    def test_renders_in_node(self, mode, compress):
+        data = random_data(6, 8, 3, 50)
+        data["input"][0] = "caf\u00e9 </script>"
+        html = show_logit_lens(data, inline_js=False, compress=compress).data
+        out = subprocess.run(["node", "-e", NODE_RENDER, mode], input=html,
+                             capture_output=True, text=True, check=True)
+        assert json.loads(out.stdout) == to_js_format(data)
+
+    @pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+    @pytest.mark.parametrize("mode", ["native", "fallback"])
+    def test_later_widgets_use_page_decoder(self, mode):
+        first, second = random_data(6, 8, 3, 50), random_data(5, 4, 2, 30)
+        page = (show_logit_lens(first, inline_js=False, compress=True).data
+                + show_logit_lens(second, inline_js=False, compress=True).data)
+        out = subprocess.run(["node", "-e", NODE_RENDER, mode], input=page,
+                             capture_output=True, text=True, check=True)
+        # Decoding is asynchronous: widgets may finish in either order
+        rendered = sorted(out.stdout.splitlines(), key=len)
+        assert [json.loads(line) for line in rendered] == [
+            to_js_format(second), to_js_format(first),
+        ]
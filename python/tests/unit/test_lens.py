@@ -0,0 +1,211 @@
+"""Tests for folded lens heads: equivalence with norm + lm_head per architecture."""
+
+import pytest
+import torch
+
+from logitlenskit.collect import (
+    collect_logit_lens,
+    collect_logit_lens_batch,
+    iter_logit_lens,
+    merge_logit_lens,
+)
+from logitlenskit.lens import LensHead, clear_lens_heads, get_lens_head
+from logitlenskit.models import get_model_plan
+
+transformers = pytest.importorskip("transformers")
+nnsight = pytest.importorskip("nnsight")
+
+VOCAB = 100
+ARCH_CONFIGS = {
+    "llama": ("LlamaConfig", "LlamaForCausalLM"),
+    "mistral": ("MistralConfig", "MistralForCausalLM"),
+    "qwen2": ("Qwen2Config", "Qwen2ForCausalLM"),
+    "gemma": ("GemmaConfig", "GemmaForCausalLM"),
+    "gpt2": ("GPT2Config", "GPT2LMHeadModel"),
+    "gpt_neox": ("GPTNeoXConfig", "GPTNeoXForCausalLM"),
+    "phi": ("PhiConfig", "PhiForCausalLM"),
+}
+
+
+def build_arch(arch, tokenizer):
+    """Tiny random model of one architecture with non-trivial norm parameters."""
+    config_cls, model_cls = (getattr(transformers, n) for n in ARCH_CONFIGS[arch])
+    torch.manual_seed(0)
+    if arch == "gpt2":
+        config = config_cls(n_layer=2, n_embd=32, n_head=4, vocab_size=VOCAB, n_positions=64)
+    else:
+        config = config_cls(
+            hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+            num_attention_heads=4, num_key_value_heads=4, vocab_size=VOCAB,
+            max_position_embeddings=64, head_dim=8, tie_word_embeddings=False,
+        )
+    hf_model = model_cls(config).eval()
+    model = nnsight.LanguageModel(hf_model, tokenizer=tokenizer)
+
+    norm = get_model_plan(model).norm_module()
+    with torch.no_grad():
+        norm.weight.normal_(0.0, 0.5)
+        if getattr(norm, "bias", None) is not None:
+            norm.bias.normal_(0.0, 0.5)
+    head = get_model_plan(model).unembedding()[1]
+    if head is not None:
+        with torch.no_grad():
+            head.normal_(0.0, 0.5)
+    return model
+
+
+@pytest.fixture(scope="module", params=list(ARCH_CONFIGS))
+def arch_model(request, tiny_model):
+    return request.param, build_arch(request.param, tiny_model.tokenizer)
+
+
+class TestLensHead:
+    """Folded projection must match lm_head(norm(h)) for every architecture."""
+
+    def test_logits_match(self, arch_model):
+        arch, model = arch_model
+        plan = get_model_plan(model)
+        head = LensHead(plan)
+        hidden = torch.randn(2, 5, 32) * 3 + 1
+        with torch.no_grad():
+            expected = plan.lm_head(plan.norm(hidden))
+            folded = head.lm_head(head.norm(hidden))
+        assert torch.allclose(folded, expected, atol=1e-4, rtol=1e-4), arch
+
+    def test_collect_matches(self, arch_model):
+        arch, model = arch_model
+        prompt = "t5 t6 t7 t8 t9"
+        expected = collect_logit_lens(prompt, model, k=3, remote=False)
+        result = collect_logit_lens(prompt, model, k=3, remote=False, lens_head=True)
+        assert torch.equal(result["topk"], expected["topk"]), arch
+        for a, b in zip(result["probs"], expected["probs"]):
+            assert torch.allclose(a, b, atol=1e-5), arch
+
+    def test_streaming_and_batch_use_folded_head(self, tiny_model):
+        prompts = ["t5 t6 t7", "t8 t9"]
+        expected = collect_logit_lens_batch(prompts, tiny_model, k=3, remote=False)
+        results = collect_logit_lens_batch(prompts, tiny_model, k=3, remote=False,
+                                           lens_head=True)
+        streamed = collect_logit_lens(prompts[0], tiny_model, k=3, remote=False,
+                                      lens_head=True, memory_budget=2048)
+        for got in (results[0], streamed):
+            assert torch.equal(got["topk"], expected[0]["topk"])
+            for a, b in zip(got["probs"], expected[0]["probs"]):
+                assert torch.allclose(a, b, atol=1e-5)
+
+    def test_cached_per_model_and_dtype(self, tiny_model):
+        clear_lens_heads()
+        head = get_lens_head(tiny_model)
+        assert get_lens_head(tiny_model) is head
+        assert head.dtype == torch.float32
+        half = get_lens_head(tiny_model, dtype=torch.bfloat16)
+        assert half is not head and half.weight.dtype == torch.bfloat16
+        assert get_lens_head(tiny_model, dtype=torch.bfloat16) is half
+
+    def test_remote_rejected(self, tiny_model):
+        with pytest.raises(ValueError):
+            collect_logit_lens("t5", tiny_model, remote=True, lens_head=True)
+
+    def test_unfoldable_norm(self):
+        from logitlenskit.lens import _norm_params
+        with pytest.raises(ValueError):
+            _norm_params(torch.nn.Identity())
+
+
+class TestPrecision:
+    """Reduced-precision lens heads and the accuracy report."""
+
+    @pytest.mark.parametrize("precision", ["fp32", "bf16", "fp16", "int8"])
+    def test_collect_close_to_fp32(self, tiny_model, precision):
+        prompt = "t5 t6 t7 t8 t9 t10"
+        expected = collect_logit_lens(prompt, tiny_model, k=3, remote=False)
+        result = collect_logit_lens(prompt, tiny_model, k=3, remote=False,
+                                    precision=precision)
+        assert result["topk"].shape == expected["topk"].shape
+        agree = (result["topk"][..., 0] == expected["topk"][..., 0]).float().mean()
+        assert agree >= 0.9, precision
+        if precision == "fp32":
+            assert torch.equal(result["topk"], expected["topk"])
+
+    @pytest.mark.parametrize("precision", ["bf16", "fp16"])
+    def test_streaming(self, tiny_model, precision):
+        prompt = "t5 t6 t7 t8 t9 t10"
+        expected = collect_logit_lens(prompt, tiny_model, k=3, remote=False,
+                                      precision=precision)
+        result = collect_logit_lens(prompt, tiny_model, k=3, remote=False,
+                                    precision=precision, memory_budget=4096)
+        parts = list(iter_logit_lens(prompt, tiny_model, k=3, remote=False, window=2,
+                                     precision=precision, memory_budget=4096))
+        for data in (result, merge_logit_lens(parts)):
+            agree = (data["topk"][..., 0] == expected["topk"][..., 0]).float().mean()
+            assert agree >= 0.9, precision
+
+    def test_half_precision_model(self, tiny_model):
+        hf_model = type(tiny_model._model)(tiny_model._model.config).eval()
+        hf_model.load_state_dict(tiny_model._model.state_dict())
+        model = nnsight.LanguageModel(hf_model.to(torch.bfloat16),
+                                      tokenizer=tiny_model.tokenizer)
+        expected = collect_logit_lens("t5 t6 t7", model, k=3, remote=False)
+        for options in ({"memory_budget": 4096}, {"lens_head": True, "memory_budget": 4096}):
+            result = collect_logit_lens("t5 t6 t7", model, k=3, remote=False, **options)
+            agree = (result["topk"][..., 0] == expected["topk"][..., 0]).float().mean()
+            assert agree >= 0.9, options
+
+    def test_int8_head(self, tiny_model):
+        head = get_lens_head(tiny_model, "int8")
+        assert head.weight.dtype == torch.int8
+        fp32 = get_lens_head(tiny_model, "fp32")
+        normed = fp32.norm(torch.randn(7, 32))
+        logits = head.lm_head(normed)
+        assert logits.dtype == torch.float32 and logits.shape == (7, 100)
+        assert torch.allclose(logits, fp32.lm_head(normed), atol=0.05)
+        with pytest.raises(ValueError):
+            head.unembedding()
+
+    def test_int8_kernel_fallback_is_per_call(self, tiny_model, monkeypatch):
+        head = get_lens_head(tiny_model, "int8")
+        fp32 = get_lens_head(tiny_model, "fp32")
+        normed = fp32.norm(torch.randn(3, 32))
+        int_mm = torch._int_mm
+        calls = []
+
+        def cuda_like_int_mm(a, b):
+            # Constraints of the CUDA kernel, enforced on CPU
+            calls.append(a.shape)
+            if a.shape[1] % 8 or b.shape[1] % 8:
+                raise RuntimeError("dims must be multiples of 8")
+            if len(calls) == 1:
+                raise RuntimeError("rejected once")
+            return int_mm(a, b)
+
+        monkeypatch.setattr(torch, "_int_mm", cuda_like_int_mm)
+        first = head.lm_head(normed)   # Falls back to the dequantized GEMM
+        second = head.lm_head(normed)  # Back on the int8 kernel
+        assert len(calls) == 2 and calls[1][1] % 8 == 0
+        for logits in (first, second):
+            assert logits.shape == (3, 100)
+            assert torch.allclose(logits, fp32.lm_head(normed), atol=0.05)
+
+    def test_dequantized_fallback(self, tiny_model):
+        head = get_lens_head(tiny_model, "int8")
+        normed = head.norm(torch.randn(5, 32))
+        x = normed.float()
+        assert torch.allclose(head._dequantized_logits(x), head._int8_logits(x), atol=0.05)
+
+    def test_report(self, tiny_model):
+        from logitlenskit.lens import precision_report
+
+        report = precision_report(["t5 t6 t7", "t8 t9"], tiny_model, k=3)
+        assert set(report) == {"fp32", "bf16", "fp16", "int8"}
+        assert report["fp32"]["topk_agreement"] == 1.0
+        assert report["fp32"]["max_trajectory_error"] == 0.0
+        for name in ("bf16", "fp16", "int8"):
+            stats = report[name]
+            assert 0.5 <= stats["topk_agreement"] <= 1.0
+            assert 0.5 <= stats["top1_agreement"] <= 1.0
+            assert 0.0 < stats["max_trajectory_error"] < 0.05
+            assert stats["mean_trajectory_error"] <= stats["max_trajectory_error"]
+
+    def test_unknown_precision(self, tiny_model):
+        with pytest.raises(ValueError):
+            collect_logit_lens("t5", tiny_model, remote=False, precision="fp8")
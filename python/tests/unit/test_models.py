@@ -1,5 +1,7 @@
 """Tests for model registry and accessor functions."""
 
+from types import SimpleNamespace
+
 import pytest
 from unittest.mock import Mock, MagicMock
 
@@ -10,6 +12,8 @@ from logitlenskit.models import (
     apply_module_or_callable,
     detect_model_type,
     get_model_config,
+    ModelPlan,
+    get_model_plan,
 )
 
 
@@ -160,3 +164,98 @@ class TestGetModelConfig:
         model = Mock()
         cfg = get_model_config(model, model_type="pythia")
         assert cfg == MODEL_CONFIGS["gpt_neox"]
+
+
+def raw_model(model_type="llama", n_layers=3, lm_head=None):
+    """Plain-object stand-in for a raw nnsight LanguageModel."""
+    layers = [SimpleNamespace(output=(f"hidden{i}", "cache")) for i in range(n_layers)]
+    return SimpleNamespace(
+        config=SimpleNamespace(model_type=model_type, num_hidden_layers=n_layers,
+                               architectures=[]),
+        model=SimpleNamespace(layers=layers, norm=Mock(side_effect=lambda h: f"norm({h})")),
+        lm_head=lm_head if lm_head is not None else Mock(side_effect=lambda h: f"head({h})"),
+    )
+
+
+class TestModelPlan:
+    """Test compiled model plans."""
+
+    def test_resolves_raw_model(self):
+        model = raw_model()
+        plan = ModelPlan(model)
+        assert plan.model_type == "llama"
+        assert plan.n_layers == 3
+        assert plan.layer_output(2) == "hidden2"
+        assert plan.lm_head(plan.norm(plan.layer_output(0))) == "head(norm(hidden0))"
+
+    def test_paths_resolved_once(self):
+        model = raw_model()
+        plan = ModelPlan(model)
+        # Replacing the attributes afterwards does not affect the plan
+        model.model = None
+        assert plan.norm("h") == "norm(h)"
+
+    def test_callable_accessors_classified_once(self, monkeypatch):
+        import logitlenskit.models as models
+
+        calls = []
+        signature = models.inspect.signature
+        monkeypatch.setattr(models.inspect, "signature",
+                            lambda fn: calls.append(fn) or signature(fn))
+
+        def norm(m, h):
+            return f"fn({h})"
+
+        monkeypatch.setitem(MODEL_CONFIGS, "custom", {
+            "layers": "model.layers",
+            "norm": norm,
+            "lm_head": lambda m: m.lm_head,
+            "n_layers": lambda m: 2,
+        })
+        plan = ModelPlan(raw_model(), model_type="custom")
+        for _ in range(5):
+            assert plan.lm_head(plan.norm("h")) == "head(fn(h))"
+        assert plan.n_layers == 2
+        assert calls.count(norm) == 1
+
+    def test_weight_matrix_lm_head(self, monkeypatch):
+        import torch
+
+        weight = torch.randn(4, 10)  # [d_model, vocab], applied as hidden @ weight
+        model = raw_model()
+        model.model.embed = weight
+        monkeypatch.setitem(MODEL_CONFIGS, "tied", {
+            "layers": "model.layers",
+            "norm": "model.norm",
+            "lm_head": lambda m: m.model.embed,
+            "n_layers": "config.num_hidden_layers",
+        })
+        plan = ModelPlan(model, model_type="tied")
+        hidden = torch.randn(2, 4)
+        assert torch.allclose(plan.lm_head(hidden), hidden @ weight)
+        unembed, bias = plan.unembedding()
+        assert unembed.shape == (10, 4) and bias is None
+
+    def test_function_lm_head_has_no_unembedding(self, monkeypatch):
+        monkeypatch.setitem(MODEL_CONFIGS, "fn_head", {
+            "layers": "model.layers",
+            "norm": "model.norm",
+            "lm_head": lambda m, h: h,
+            "n_layers": "config.num_hidden_layers",
+        })
+        with pytest.raises(ValueError):
+            ModelPlan(raw_model(), model_type="fn_head").unembedding()
+
+    def test_cached_per_instance(self):
+        class Model(SimpleNamespace):
+            __hash__ = object.__hash__
+
+        model = Model(**vars(raw_model()))
+        plan = get_model_plan(model)
+        assert get_model_plan(model) is plan
+        assert get_model_plan(Model(**vars(raw_model()))) is not plan
+
+    def test_standardized_model(self, tiny_model):
+        plan = get_model_plan(tiny_model)
+        assert plan.model_type == "nnterp"
+        assert plan.n_layers == tiny_model.num_layers
@@ -0,0 +1,110 @@
+"""Tests for payload planning."""
+
+import json
+
+import pytest
+import torch
+
+from logitlenskit.collect import collect_logit_lens
+from logitlenskit.display import to_js_format
+from logitlenskit.planner import plan_for_prompt, plan_payload, predict_payload
+
+
+PROMPT = "t5 t6 t7 t8 t9 t10 t11 t12"
+
+
+class TestPredictPayload:
+    """Predictions match measured sizes once the tracked count is known."""
+
+    @pytest.mark.parametrize("k, layers, dtype", [
+        (3, None, "float32"),
+        (5, [0, 2, 3], "float16"),
+    ])
+    def test_matches_collection(self, tiny_model, k, layers, dtype):
+        data = collect_logit_lens(PROMPT, tiny_model, k=k, layers=layers, remote=False,
+                                  probs_dtype=dtype, profile=True)
+        n_pos, n_layers = len(data["input"]), len(data["layers"])
+        tracked = sum(len(t) for t in data["tracked"]) / n_pos
+
+        predicted = predict_payload(n_pos, n_layers, k, 100, dtype,
+                                    tracked_ratio=tracked / k)
+        assert predicted["transmitted_bytes"] == data["profile"].bytes["saved"]
+
+        json_bytes = len(json.dumps(to_js_format(data), separators=(",", ":")))
+        assert predicted["json_bytes"] == pytest.approx(json_bytes, rel=0.25)
+
+    def test_seconds(self):
+        predicted = predict_payload(10, 4, 5, bandwidth=1000.0, latency=2.0)
+        assert predicted["seconds"] == pytest.approx(2.0 + predicted["transmitted_bytes"] / 1000)
+
+    def test_unknown_dtype(self):
+        with pytest.raises(ValueError):
+            predict_payload(10, 4, 5, probs_dtype="int4")
+
+
+class TestPlanPayload:
+    """The planner keeps the largest collection that meets every budget."""
+
+    def test_unbounded_keeps_everything(self):
+        plan = plan_payload(100, 12, k=5)
+        assert plan["fits"]
+        assert plan["layers"] == list(range(12))
+        assert plan["k"] == 5 and plan["probs_dtype"] == "float32"
+
+    @pytest.mark.parametrize("budget", [
+        {"max_bytes": 200_000},
+        {"max_json_bytes": 400_000},
+        {"max_seconds": 0.52, "bandwidth": 5e6, "latency": 0.5},
+    ])
+    def test_meets_budget(self, budget):
+        full = plan_payload(500, 32, k=10)
+        plan = plan_payload(500, 32, k=10, **budget)
+        assert plan["fits"]
+        predicted = plan["predicted"]
+        assert predicted["transmitted_bytes"] <= budget.get("max_bytes", float("inf"))
+        assert predicted["json_bytes"] <= budget.get("max_json_bytes", float("inf"))
+        assert predicted["seconds"] <= budget.get("max_seconds", float("inf"))
+        assert predicted["transmitted_bytes"] < full["predicted"]["transmitted_bytes"]
+        assert plan["layers"][-1] == 31
+        assert plan["layers"] == sorted(set(plan["layers"]))
+
+    def test_prefers_float16_to_dropping_cells(self):
+        full = plan_payload(200, 16, k=5)
+        plan = plan_payload(200, 16, k=5,
+                            max_bytes=full["predicted"]["transmitted_bytes"] * 0.7)
+        assert plan["probs_dtype"] == "float16"
+        assert plan["layers"] == list(range(16)) and plan["k"] == 5
+
+    def test_impossible_budget(self):
+        plan = plan_payload(1000, 48, k=5, max_bytes=10)
+        assert not plan["fits"]
+        assert plan["k"] == 1 and plan["layers"] == [0, 47]
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            plan_payload(0, 12)
+        with pytest.raises(ValueError):
+            plan_payload(10, 12, k=3, min_k=4)
+
+    def test_plan_runs(self, tiny_model):
+        plan = plan_for_prompt(PROMPT, tiny_model, max_bytes=3000)
+        assert plan["fits"]
+        data = collect_logit_lens(PROMPT, tiny_model, remote=False, **plan["kwargs"])
+        assert data["layers"] == plan["layers"]
+        assert data["topk"].shape[-1] == plan["k"]
+        assert data["probs"][0].dtype == getattr(torch, plan["probs_dtype"])
+
+
+class TestProbsDtype:
+
+    def test_float16(self, tiny_model):
+        full = collect_logit_lens(PROMPT, tiny_model, remote=False)
+        half = collect_logit_lens(PROMPT, tiny_model, remote=False, probs_dtype="float16")
+        assert torch.equal(full["topk"], half["topk"])
+        for a, b in zip(full["probs"], half["probs"]):
+            assert b.dtype == torch.float16
+            assert torch.allclose(a, b.float(), atol=1e-3)
+
+    def test_unknown(self, tiny_model):
+        with pytest.raises(ValueError):
+            collect_logit_lens(PROMPT, tiny_model, remote=False, probs_dtype="int8")
@@ -0,0 +1,105 @@
+"""Tests for prefix-sharing incremental collection."""
+
+import pytest
+import torch
+
+from logitlenskit.collect import collect_logit_lens
+from logitlenskit.prefix import PrefixCache
+
+
+BASE = "t5 t6 t7 t8 t9 t10 t11"
+
+
+def assert_same(a, b):
+    assert a["input"] == b["input"]
+    assert torch.equal(a["topk"], b["topk"])
+    for ta, tb in zip(a["tracked"], b["tracked"]):
+        assert torch.equal(ta, tb)
+    for pa, pb in zip(a["probs"], b["probs"]):
+        assert torch.allclose(pa, pb, atol=1e-6)
+    assert a["vocab"] == b["vocab"]
+
+
+class TestIncrementalCollection:
+    """Prefix-cached results must equal full recomputes."""
+
+    @pytest.mark.parametrize("options", [{}, {"fused": True}, {"memory_budget": 4096}])
+    def test_matches_full_run(self, tiny_model, options):
+        prefixes = PrefixCache()
+        prompts = [BASE, BASE + " t12 t13", BASE + " t14", "t5 t6 t7", "t40 t41",
+                   BASE + " t12 t13 t15"]
+        for prompt in prompts:
+            result = collect_logit_lens(prompt, tiny_model, k=3, remote=False,
+                                        prefix_cache=prefixes, **options)
+            expected = collect_logit_lens(prompt, tiny_model, k=3, remote=False, **options)
+            assert_same(result, expected)
+
+        stats = prefixes.stats()
+        assert stats["misses"] == 2  # BASE and "t40 t41"
+        assert stats["tokens_reused"] == 7 + 7 + 3 + 9
+        assert stats["tokens_computed"] == 7 + 2 + 1 + 0 + 2 + 1
+
+    @pytest.mark.parametrize("options", [{}, {"memory_budget": 4096}])
+    def test_entries_hold_no_autograd_graph(self, tiny_model, options):
+        prefixes = PrefixCache()
+        for prompt in (BASE, BASE + " t12 t13"):
+            result = collect_logit_lens(prompt, tiny_model, k=3, remote=False,
+                                        prefix_cache=prefixes, **options)
+            assert all(p.grad_fn is None for p in result["probs"])
+        for entry in prefixes._entries.values():
+            assert all(t.grad_fn is None for t in entry.result.values())
+            cache = entry.past_key_values
+            assert all(layer.keys.grad_fn is None and layer.values.grad_fn is None
+                       for layer in cache.layers)
+
+    def test_settings_are_separate(self, tiny_model):
+        prefixes = PrefixCache()
+        collect_logit_lens(BASE, tiny_model, k=3, remote=False, prefix_cache=prefixes)
+        result = collect_logit_lens(BASE + " t12", tiny_model, k=2, remote=False,
+                                    prefix_cache=prefixes)
+        assert result["topk"].shape[-1] == 2
+        assert prefixes.stats()["misses"] == 2
+
+    def test_rejects_remote_and_position_options(self, tiny_model):
+        prefixes = PrefixCache()
+        for options in ({"remote": True}, {"remote": False, "adaptive": True},
+                        {"remote": False, "positions": -1}):
+            with pytest.raises(ValueError):
+                collect_logit_lens(BASE, tiny_model, prefix_cache=prefixes, **options)
+
+
+class TestEviction:
+    """Entries are bounded in bytes and evicted least recently used first."""
+
+    def test_bound(self, tiny_model):
+        prefixes = PrefixCache()
+        collect_logit_lens(BASE, tiny_model, remote=False, prefix_cache=prefixes)
+        entry_bytes = prefixes.stats()["size_bytes"]
+
+        prefixes = PrefixCache(max_bytes=int(entry_bytes * 2.5))
+        for prompt in ["t5 t6 t7 t8 t9 t10 t11", "t20 t21 t22 t23 t24 t25 t26",
+                       "t30 t31 t32 t33 t34 t35 t36"]:
+            collect_logit_lens(prompt, tiny_model, remote=False, prefix_cache=prefixes)
+        stats = prefixes.stats()
+        assert stats["entries"] == 2
+        assert stats["evictions"] == 1
+        assert stats["size_bytes"] <= prefixes.max_bytes
+
+        # The oldest prompt is gone; its prefix is recomputed
+        collect_logit_lens("t5 t6 t12", tiny_model, remote=False, prefix_cache=prefixes)
+        assert prefixes.stats()["misses"] == 4
+
+    def test_replacing_a_prompt(self, tiny_model):
+        prefixes = PrefixCache()
+        collect_logit_lens(BASE + " t12", tiny_model, remote=False, prefix_cache=prefixes)
+        size = prefixes.stats()["size_bytes"]
+        collect_logit_lens(BASE + " t12", tiny_model, remote=False, prefix_cache=prefixes)
+        assert prefixes.stats()["entries"] == 1
+        assert prefixes.stats()["size_bytes"] == size
+
+    def test_clear(self, tiny_model):
+        prefixes = PrefixCache()
+        collect_logit_lens(BASE, tiny_model, remote=False, prefix_cache=prefixes)
+        prefixes.clear()
+        assert prefixes.stats()["entries"] == 0
+        assert prefixes.lookup(None, [5]) == (0, None)
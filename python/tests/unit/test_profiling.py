@@ -0,0 +1,104 @@
+"""Tests for per-stage profiling of collection and display."""
+
+import io
+
+import pytest
+import torch
+
+from logitlenskit.cache import ResultCache
+from logitlenskit.collect import collect_logit_lens
+from logitlenskit.display import show_logit_lens, write_logit_lens
+from logitlenskit.profiling import Profile, make_profile, tensor_bytes
+
+
+LOCAL_STAGES = {"tokenize", "trace", "forward", "projection", "topk", "unique_gather",
+                "split", "vocab_decode"}
+
+
+class TestCollectProfile:
+    """collect_logit_lens(profile=...) records stages and attaches a Profile."""
+
+    @pytest.mark.parametrize("options", [{}, {"fused": True}])
+    def test_local_stages(self, tiny_model, options):
+        data = collect_logit_lens("t5 t6 t7", tiny_model, remote=False, profile=True,
+                                  **options)
+        prof = data["profile"]
+        assert isinstance(prof, Profile)
+        assert LOCAL_STAGES <= set(prof.seconds)
+        assert all(seconds >= 0 for seconds in prof.seconds.values())
+        assert prof.seconds["trace"] >= prof.seconds["projection"]
+
+        saved = tensor_bytes([data["topk"], data["tracked"], data["probs"]])
+        assert prof.bytes["saved"] >= saved
+
+    def test_off_by_default(self, tiny_model):
+        data = collect_logit_lens("t5 t6 t7", tiny_model, remote=False)
+        assert "profile" not in data
+
+    def test_same_result(self, tiny_model):
+        plain = collect_logit_lens("t5 t6 t7", tiny_model, remote=False)
+        profiled = collect_logit_lens("t5 t6 t7", tiny_model, remote=False, profile=True)
+        assert torch.equal(plain["topk"], profiled["topk"])
+        for a, b in zip(plain["probs"], profiled["probs"]):
+            assert torch.equal(a, b)
+
+    def test_sink(self, tiny_model):
+        events = []
+        data = collect_logit_lens("t5 t6 t7", tiny_model, remote=False,
+                                  profile=lambda name, value: events.append((name, value)))
+        names = {name for name, _ in events}
+        assert "projection.seconds" in names and "saved.bytes" in names
+        total = sum(value for name, value in events if name == "projection.seconds")
+        assert total == pytest.approx(data["profile"].seconds["projection"])
+
+    def test_cache_hit(self, tiny_model, tmp_path):
+        cache = ResultCache(tmp_path)
+        collect_logit_lens("t5 t6", tiny_model, remote=False, cache=cache)
+        data = collect_logit_lens("t5 t6", tiny_model, remote=False, cache=cache,
+                                  profile=True)
+        assert set(data["profile"].seconds) == {"tokenize", "cache_lookup"}
+
+
+class TestDisplayProfile:
+    """Display functions add their stages to the result's Profile."""
+
+    def test_show(self, tiny_model):
+        data = collect_logit_lens("t5 t6 t7", tiny_model, remote=False, profile=True)
+        html = show_logit_lens(data)
+        prof = data["profile"]
+        assert {"to_js_format", "html_embed"} <= set(prof.seconds)
+        assert prof.bytes["html"] == len(html.data.encode("utf-8"))
+        assert 0 < prof.bytes["json"] < prof.bytes["html"]
+
+    def test_write(self, tiny_model):
+        data = collect_logit_lens("t5 t6 t7", tiny_model, remote=False, profile=True)
+        out = io.StringIO()
+        written = write_logit_lens(data, out)
+        assert data["profile"].bytes["json"] == written
+        assert "write" in data["profile"].seconds
+
+
+class TestMakeProfile:
+
+    def test_arguments(self):
+        assert make_profile(False) is None
+        assert make_profile(None) is None
+        assert isinstance(make_profile(True), Profile)
+        prof = Profile()
+        assert make_profile(prof) is prof
+        sink = make_profile(print)
+        assert sink.sink is print
+        with pytest.raises(ValueError):
+            make_profile("yes")
+
+    def test_accumulates(self):
+        prof = Profile()
+        with prof.stage("a"):
+            pass
+        with prof.stage("a"):
+            pass
+        prof.add_bytes("b", 3)
+        prof.add_bytes("b", 4)
+        report = prof.report()
+        assert report["bytes"] == {"b": 7}
+        assert set(report["seconds"]) == {"a"}
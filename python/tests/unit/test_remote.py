@@ -0,0 +1,85 @@
+"""Remote requests must not need logitlenskit installed on the server."""
+
+import sys
+
+import pytest
+
+from conftest import assert_same_result
+from logitlenskit.collect import (
+    collect_logit_lens,
+    collect_logit_lens_batch,
+    generate_logit_lens,
+    iter_logit_lens,
+    merge_logit_lens,
+)
+
+
+PROMPT = "t5 t6 t7 t8 t9"
+
+
+@pytest.fixture
+def ndif_server(monkeypatch):
+    """
+    Make ``remote="local"`` traces load their request without logitlenskit.
+
+    nnsight's local simulation serializes each request, then deserializes
+    it with user modules removed from sys.modules before running it. It
+    keeps ``.../src`` paths, from which logitlenskit would be re-imported,
+    so the package is also made unimportable while the request loads.
+    """
+    from nnsight.intervention.backends.local_simulation import LocalSimulationBackend
+
+    block = LocalSimulationBackend._block_user_modules
+
+    def block_logitlenskit(self):
+        blocked = block(self)
+        for name in [name for name in blocked["modules"] if name.startswith("logitlenskit.")]:
+            sys.modules[name] = None
+        sys.modules["logitlenskit"] = None
+        return blocked
+
+    monkeypatch.setattr(LocalSimulationBackend, "_block_user_modules", block_logitlenskit)
+
+
+class TestSerializedRequests:
+    """Remote trace bodies run from a request loaded without logitlenskit."""
+
+    @pytest.mark.parametrize("options", [
+        {},
+        {"fused": True},
+        {"memory_budget": 4096},
+        {"adaptive": True, "adaptive_stride": 2},
+        {"positions": [0, 3]},
+        {"probs_dtype": "float16"},
+        {"profile": True},
+    ])
+    def test_collect(self, tiny_model, ndif_server, options):
+        result = collect_logit_lens(PROMPT, tiny_model, k=3, remote="local", **options)
+        expected = collect_logit_lens(PROMPT, tiny_model, k=3, remote=False, **options)
+        assert_same_result(result, expected)
+
+    def test_raw_model(self, raw_model, ndif_server):
+        result = collect_logit_lens(PROMPT, raw_model, k=3, remote="local")
+        expected = collect_logit_lens(PROMPT, raw_model, k=3, remote=False)
+        assert_same_result(result, expected)
+
+    def test_iter(self, tiny_model, ndif_server):
+        parts = list(iter_logit_lens(PROMPT, tiny_model, k=3, remote="local", window=2))
+        expected = collect_logit_lens(PROMPT, tiny_model, k=3, remote=False)
+        assert_same_result(merge_logit_lens(parts), expected)
+
+    def test_batch(self, tiny_model, ndif_server):
+        prompts = [PROMPT, "t9 t10"]
+        results = collect_logit_lens_batch(prompts, tiny_model, k=3, remote="local")
+        for result, expected in zip(results, collect_logit_lens_batch(prompts, tiny_model,
+                                                                      k=3, remote=False)):
+            assert_same_result(result, expected)
+
+    def test_generate(self, tiny_model, ndif_server):
+        steps = list(generate_logit_lens(PROMPT, tiny_model, max_new_tokens=3, k=3,
+                                         remote="local"))
+        expected = list(generate_logit_lens(PROMPT, tiny_model, max_new_tokens=3, k=3,
+                                            remote=False))
+        assert [s["generated"] for s in steps] == [s["generated"] for s in expected]
+        for step, step_expected in zip(steps, expected):
+            assert_same_result(step, step_expected)
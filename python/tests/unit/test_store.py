@@ -0,0 +1,157 @@
+"""Tests for the memory-mapped columnar store."""
+
+import numpy as np
+import pytest
+import torch
+
+from logitlenskit.store import LensStore
+
+
+def make_result(n_pos=3, n_layers=2, k=2, seed=0, model="test/model"):
+    gen = torch.Generator().manual_seed(seed)
+    counts = torch.randint(1, 5, (n_pos,), generator=gen).tolist()
+    return {
+        "model": model,
+        "input": [f"w{seed}_{i}é" for i in range(n_pos)],
+        "layers": list(range(n_layers)),
+        "topk": torch.randint(0, 20, (n_layers, n_pos, k), generator=gen, dtype=torch.int32),
+        "tracked": [torch.randperm(20, generator=gen)[:c].to(torch.int32) for c in counts],
+        "probs": [torch.rand(n_layers, c, generator=gen) for c in counts],
+        "vocab": {i: f"tok{i}" for i in range(20)},
+    }
+
+
+def assert_same(a, b, atol=0.0):
+    assert a["model"] == b["model"]
+    assert a["input"] == b["input"]
+    assert a["layers"] == b["layers"]
+    assert torch.equal(a["topk"], b["topk"])
+    assert len(a["tracked"]) == len(b["tracked"])
+    for ta, tb, pa, pb in zip(a["tracked"], b["tracked"], a["probs"], b["probs"]):
+        assert torch.equal(ta, tb)
+        assert torch.allclose(pa.float(), pb.float(), atol=atol)
+    for i, s in b["vocab"].items():
+        assert a["vocab"][i] == s
+
+
+class TestLensStore:
+    """Test LensStore append, lookup, zero-copy views and concurrency."""
+
+    def test_round_trip(self, tmp_path):
+        results = [make_result(n_pos=n, n_layers=3, k=2, seed=n) for n in (1, 4, 7)]
+        with LensStore(tmp_path / "s", mode="a") as store:
+            for i, r in enumerate(results):
+                assert store.append(r, key=f"p{i}") == i
+
+        store = LensStore(tmp_path / "s")
+        assert len(store) == 3
+        assert store.keys() == ["p0", "p1", "p2"]
+        for i, r in enumerate(results):
+            assert_same(store[i], r)
+            assert_same(store[f"p{i}"], r)
+        assert_same(store[-1], results[-1])
+
+    def test_row_arrays_are_memory_mapped_views(self, tmp_path):
+        with LensStore(tmp_path, mode="a") as store:
+            store.append(make_result(seed=1))
+            store.append(make_result(seed=2))
+        store = LensStore(tmp_path)
+        arrays = store.row_arrays(1)
+        assert arrays["topk"].shape == (2, 3, 2)
+        assert np.shares_memory(arrays["probs"], store.column("probs"))
+        assert np.shares_memory(arrays["tracked"], store.column("tracked"))
+        # Torch tensors in get() share the mapped memory too
+        row = store.get(1)
+        assert row["topk"].data_ptr() == arrays["topk"].__array_interface__["data"][0]
+
+    def test_float16_probs(self, tmp_path):
+        result = make_result()
+        with LensStore(tmp_path, mode="a", probs_dtype="float16") as store:
+            store.append(result)
+        row = LensStore(tmp_path)[0]
+        assert row["probs"][0].dtype == torch.float16
+        assert_same(row, result, atol=1e-3)
+
+    def test_reader_refresh_sees_committed_rows(self, tmp_path):
+        writer = LensStore(tmp_path, mode="a")
+        writer.append(make_result(seed=1), key="a")
+        reader = LensStore(tmp_path)
+        assert len(reader) == 1
+
+        writer.append(make_result(seed=2), key="b")
+        assert len(reader) == 1
+        reader.refresh()
+        assert len(reader) == 2
+        assert_same(reader["b"], make_result(seed=2))
+        writer.close()
+
+    def test_append_does_not_reread_store(self, tmp_path, monkeypatch):
+        from logitlenskit import store as store_module
+
+        results = [make_result(seed=i) for i in range(5)]
+        with LensStore(tmp_path, mode="a") as store:
+            store.append(results[0], key="p0")
+            calls = []
+            mapped = store_module._map
+            monkeypatch.setattr(store_module, "_map", lambda *a: calls.append(a) or mapped(*a))
+            monkeypatch.setattr(store, "refresh", lambda: pytest.fail("append refreshed"))
+            for i in (1, 2, 3):
+                store.append(results[i], key=f"p{i}" if i != 2 else None)
+            assert calls == []
+
+            # The writer reads its own rows, re-mapping once
+            assert len(store) == 4
+            assert store.keys() == ["p0", "p1", None, "p3"]
+            assert_same(store["p3"], results[3])
+            assert_same(store[2], results[2])
+            n_maps = len(calls)
+            store.append(results[4], key="p4")
+            assert len(calls) == n_maps
+            assert_same(store["p4"], results[4])
+
+        reader = LensStore(tmp_path)
+        assert reader.keys() == ["p0", "p1", None, "p3", "p4"]
+        for i, r in enumerate(results):
+            assert_same(reader[i], r)
+
+    def test_single_writer(self, tmp_path):
+        writer = LensStore(tmp_path, mode="a")
+        with pytest.raises(RuntimeError):
+            LensStore(tmp_path, mode="a")
+        writer.close()
+        LensStore(tmp_path, mode="a").close()
+
+    def test_uncommitted_append_is_truncated(self, tmp_path):
+        with LensStore(tmp_path, mode="a") as store:
+            store.append(make_result(seed=1), key="a")
+        # Simulate a crash after column data was written but before the index
+        for name in ("topk", "tracked", "probs", "input"):
+            with open(tmp_path / f"{name}.bin", "ab") as f:
+                f.write(b"\x01" * 12)
+        with open(tmp_path / "keys.jsonl", "a") as f:
+            f.write('"b"\n')
+
+        assert len(LensStore(tmp_path)) == 1
+        with LensStore(tmp_path, mode="a") as store:
+            store.append(make_result(seed=2), key="b")
+        store = LensStore(tmp_path)
+        assert store.keys() == ["a", "b"]
+        assert_same(store["a"], make_result(seed=1))
+        assert_same(store["b"], make_result(seed=2))
+
+    def test_errors(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            LensStore(tmp_path / "missing")
+        with pytest.raises(ValueError):
+            LensStore(tmp_path, mode="w")
+        with LensStore(tmp_path, mode="a") as store:
+            store.append(make_result(), key="a")
+            with pytest.raises(KeyError):
+                store.append(make_result(), key="a")
+            with pytest.raises(ValueError):
+                store.append(make_result(model="other/model"))
+        store = LensStore(tmp_path)
+        with pytest.raises(ValueError):
+            store.append(make_result())
+        with pytest.raises(IndexError):
+            store[5]
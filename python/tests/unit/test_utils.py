@@ -3,7 +3,10 @@
 import pytest
 from unittest.mock import Mock
 
-from logitlenskit.utils import get_value
+import numpy as np
+import torch
+
+from logitlenskit.utils import _to_numpy, get_value, split_ragged
 
 
 class TestGetValue:
@@ -31,3 +34,37 @@ class TestGetValue:
         proxy = Mock()
         proxy.value = {"key": [1, 2, 3]}
         assert get_value(proxy) == {"key": [1, 2, 3]}
+
+
+class TestSplitRagged:
+    """Test split_ragged helper."""
+
+    def test_splits_by_offsets(self):
+        tracked = torch.tensor([3, 7, 1, 2, 9])
+        values = torch.arange(10.0).reshape(2, 5)
+        ids, probs = split_ragged(tracked, values, torch.tensor([0, 2, 2, 5]))
+
+        assert [t.tolist() for t in ids] == [[3, 7], [], [1, 2, 9]]
+        assert probs[0].tolist() == [[0.0, 1.0], [5.0, 6.0]]
+        assert probs[1].shape == (2, 0)
+        assert probs[2].tolist() == [[2.0, 3.0, 4.0], [7.0, 8.0, 9.0]]
+
+    def test_list_offsets(self):
+        ids, probs = split_ragged(torch.tensor([4]), torch.tensor([[0.5]]), [0, 1])
+        assert ids[0].tolist() == [4]
+        assert probs[0].tolist() == [[0.5]]
+
+
+class TestToNumpy:
+    """Test _to_numpy helper."""
+
+    def test_bfloat16_tensor(self):
+        values = torch.tensor([0.5, 0.25], dtype=torch.bfloat16, requires_grad=True)
+        array = _to_numpy(values)
+        assert array.dtype == np.float32
+        assert array.tolist() == [0.5, 0.25]
+
+    def test_array_passthrough(self):
+        array = np.arange(3)
+        assert _to_numpy(array) is array
+        assert _to_numpy([1, 2]).tolist() == [1, 2]
@@ -0,0 +1,105 @@
+"""Tests for the shared token decode cache."""
+
+import gc
+
+import pytest
+
+from logitlenskit.vocab import VocabCache, clear_vocab_caches, get_vocab_cache
+
+
+class CountingTokenizer:
+    """Tokenizer stand-in that counts decode calls."""
+
+    def __init__(self, name_or_path="", size=50):
+        self.name_or_path = name_or_path
+        self.size = size
+        self.decoded = []
+
+    def __len__(self):
+        return self.size
+
+    def decode(self, ids):
+        self.decoded.extend(ids)
+        return "".join(f"<{i}>" if i % 7 else f" é{i}" for i in ids)
+
+    def batch_decode(self, sequences):
+        return [self.decode(ids) for ids in sequences]
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    clear_vocab_caches()
+    yield
+    clear_vocab_caches()
+
+
+class TestVocabCache:
+    """Test VocabCache decoding and caching."""
+
+    def test_decodes_like_tokenizer(self):
+        tok = CountingTokenizer()
+        assert VocabCache(tok).decode([3, 7, 3]) == ["<3>", " é7", "<3>"]
+
+    def test_misses_decoded_once(self):
+        tok = CountingTokenizer()
+        cache = VocabCache(tok)
+        cache.decode([1, 2, 2, 3])
+        cache.decode([2, 3, 4])
+        assert sorted(tok.decoded) == [1, 2, 3, 4]
+
+    def test_decode_map(self):
+        cache = VocabCache(CountingTokenizer())
+        assert cache.decode_map([5, 1, 5]) == {1: "<1>", 5: "<5>"}
+
+    def test_save_and_load_table(self, tmp_path):
+        path = tmp_path / "vocab.table"
+        VocabCache(CountingTokenizer(size=30)).save(path)
+
+        for mmap in (True, False):
+            tok = CountingTokenizer(size=30)
+            cache = VocabCache(tok).load(path, mmap=mmap)
+            assert cache.decode(range(30)) == [tok.decode([i]) for i in range(30)]
+            tok.decoded.clear()
+            cache.decode([0, 14, 29])
+            assert tok.decoded == []
+
+    def test_load_rejects_other_files(self, tmp_path):
+        path = tmp_path / "junk"
+        path.write_bytes(b"x" * 64)
+        with pytest.raises(ValueError, match="Not a logit lens vocab table"):
+            VocabCache(CountingTokenizer()).load(path)
+
+
+class TestGetVocabCache:
+    """Test sharing of caches across calls."""
+
+    def test_same_tokenizer_same_cache(self):
+        tok = CountingTokenizer()
+        assert get_vocab_cache(tok) is get_vocab_cache(tok)
+
+    def test_shared_by_name(self):
+        a = CountingTokenizer("org/model")
+        b = CountingTokenizer("org/model")
+        get_vocab_cache(a).decode([1, 2])
+        get_vocab_cache(b).decode([1, 2])
+        assert get_vocab_cache(a) is get_vocab_cache(b)
+        assert b.decoded == []
+
+    def test_unnamed_not_shared(self):
+        assert get_vocab_cache(CountingTokenizer()) is not get_vocab_cache(CountingTokenizer())
+
+    def test_unnamed_cache_does_not_keep_tokenizer_alive(self):
+        import weakref
+        tok = CountingTokenizer()
+        get_vocab_cache(tok).decode([1])
+        ref = weakref.ref(tok)
+        del tok
+        gc.collect()
+        assert ref() is None
+
+    def test_table_path_loaded(self, tmp_path):
+        path = tmp_path / "vocab.table"
+        VocabCache(CountingTokenizer(size=10)).save(path)
+        tok = CountingTokenizer(size=10)
+        get_vocab_cache(tok, table_path=path).decode(range(10))
+        assert tok.decoded == []